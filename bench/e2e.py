@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark against the local mock API
+
+Each scenario runs in its own process against one MockBilibiliServer
+and reports requests/s, p50/p99 request latency, the peak RSS of that
+process, and the connections opened and bytes received:
+
+    sync    BilibiliScraper.scrape_up_master for one UID after another
+    async   AsyncBilibiliScraper.scrape_up_master for one UID after another
+    batch   BatchScraper on a worker pool
+    cli     main.py --uid-file (batch mode, NDJSON export)
+
+Latencies are measured around BilibiliScraper._request in the Python
+scenarios; for the CLI they are the server-side handling times.
+
+Usage:
+    python -m bench.e2e                          # 1, 100 and 10000 UIDs
+    python -m bench.e2e --quick                  # 1 and 100 UIDs
+    python -m bench.e2e --uids 100 --scenarios sync batch --latency 0.005 --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.mock_server import MockBilibiliServer
+
+SCENARIOS = ('sync', 'async', 'batch', 'cli')
+DEFAULT_UIDS = (1, 100, 10000)
+FIRST_UID = 100000
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of values (None for no values)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def make_uids(count: int) -> List[str]:
+    """Distinct UIDs for a run"""
+    return [str(FIRST_UID + i) for i in range(count)]
+
+
+def _time_requests(scraper, latencies: List[float]):
+    """Record the duration of every request sent by scraper"""
+    request = scraper._request
+
+    def timed_request(url, params=None):
+        started = time.perf_counter()
+        try:
+            return request(url, params)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    scraper._request = timed_request
+
+
+def run_worker(scenario: str, api_base: str, uid_count: int, workers: int) -> Dict:
+    """Run one Python scenario in this process and return its measurements"""
+    import contextlib
+    import io
+
+    from billbillbug.async_scraper import AsyncBilibiliScraper
+    from billbillbug.batch import BatchScraper
+    from billbillbug.scraper import BilibiliScraper
+
+    uids = make_uids(uid_count)
+    latencies: List[float] = []
+    succeeded = 0
+    started = time.perf_counter()
+
+    # The scrapers report progress with print(); keep it out of the measurements
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        if scenario == 'sync':
+            scraper = BilibiliScraper(delay=0, api_base=api_base)
+            _time_requests(scraper, latencies)
+            for uid in uids:
+                succeeded += bool(scraper.scrape_up_master(uid))
+                output.seek(0)
+                output.truncate()
+            retries = scraper.retry.stats()['retries']
+
+        elif scenario == 'async':
+            async def scrape_all():
+                async with AsyncBilibiliScraper(delay=0, concurrency=workers, api_base=api_base) as scraper:
+                    _time_requests(scraper, latencies)
+                    done = 0
+                    for uid in uids:
+                        done += bool(await scraper.scrape_up_master(uid))
+                        output.seek(0)
+                        output.truncate()
+                    return done, scraper.retry.stats()['retries']
+            succeeded, retries = asyncio.run(scrape_all())
+
+        elif scenario == 'batch':
+            scraper = BilibiliScraper(delay=0, api_base=api_base)
+            _time_requests(scraper, latencies)
+            report = BatchScraper(scraper, workers=workers).run(uids)
+            succeeded = report['stats']['succeeded']
+            retries = report['stats']['retries']
+
+        else:
+            raise ValueError(f"Unknown scenario: {scenario}")
+
+    return {
+        'elapsed': time.perf_counter() - started,
+        'succeeded': succeeded,
+        'retries': retries,
+        'latencies': latencies,
+    }
+
+
+def _spawn(command: List[str]):
+    """Run a command and return (exit code, stdout, peak RSS in MB or None)"""
+    proc = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    stdout = proc.stdout.read()
+    proc.stdout.close()
+    if hasattr(os, 'wait4'):
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        return proc.returncode, stdout, usage.ru_maxrss / scale
+    return proc.wait(), stdout, None
+
+
+def run_scenario(server: MockBilibiliServer, scenario: str, uid_count: int, workers: int) -> Dict:
+    """Run a scenario in a child process and collect client and server metrics"""
+    server.reset_stats()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if scenario == 'cli':
+            uid_file = os.path.join(tmp, 'uids.txt')
+            with open(uid_file, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(make_uids(uid_count)))
+            command = [
+                sys.executable, os.path.join(ROOT, 'main.py'), '--uid-file', uid_file,
+                '--workers', str(workers), '--format', 'ndjson', '--output', os.path.join(tmp, 'out'),
+                '--delay', '0', '--api-base', server.url, '--no-wbi-cache', '--quiet',
+            ]
+        else:
+            command = [
+                sys.executable, '-m', 'bench.e2e', '--worker', scenario, '--api-base', server.url,
+                '--uids', str(uid_count), '--workers', str(workers),
+            ]
+
+        started = time.perf_counter()
+        code, stdout, peak_rss = _spawn(command)
+        wall = time.perf_counter() - started
+
+    stats = server.stats()
+    if scenario == 'cli':
+        elapsed, latencies, source = wall, list(server.latencies), 'server'
+        succeeded = uid_count if code == 0 else None
+        retries = None
+    else:
+        if code != 0:
+            raise RuntimeError(f"Scenario {scenario} failed with exit code {code}")
+        worker = json.loads(stdout)
+        elapsed, latencies, source = worker['elapsed'], worker['latencies'], 'client'
+        succeeded = worker['succeeded']
+        retries = worker['retries']
+
+    return {
+        'scenario': scenario,
+        'uids': uid_count,
+        'succeeded': succeeded,
+        'requests': stats['requests'],
+        'elapsed': round(elapsed, 3),
+        'requests_per_sec': round(stats['requests'] / elapsed, 1) if elapsed else None,
+        'p50_ms': _ms(percentile(latencies, 0.50)),
+        'p99_ms': _ms(percentile(latencies, 0.99)),
+        'latency_source': source,
+        'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+        'throttled': stats['throttled'],
+        'errors': stats['errors'],
+        'bad_signatures': stats['bad_signatures'],
+        'retries': retries,
+        'connections': stats['connections'],
+        'bytes_per_request': round(stats['bytes_sent'] / stats['requests']) if stats['requests'] else None,
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def print_table(results: List[Dict]):
+    """Print the results as a text table"""
+    columns = ('scenario', 'uids', 'requests', 'elapsed', 'requests_per_sec', 'p50_ms', 'p99_ms',
+               'peak_rss_mb', 'throttled', 'errors', 'bad_signatures', 'retries', 'connections', 'bytes_per_request')
+    header = ('scenario', 'uids', 'reqs', 'secs', 'req/s', 'p50 ms', 'p99 ms', 'rss MB', '412/799', '5xx', 'badsig',
+              'retries', 'conns', 'B/req')
+    rows = [header] + [tuple('-' if r[c] is None else str(r[c]) for c in columns) for r in results]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    for row in rows:
+        print('  '.join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+def main():
+    """Run the benchmark suite"""
+    parser = argparse.ArgumentParser(description='End-to-end scraper benchmark against a local mock API')
+    parser.add_argument('--uids', type=int, nargs='+', default=list(DEFAULT_UIDS),
+                        help='UID counts to run (default: 1 100 10000)')
+    parser.add_argument('--quick', action='store_true', help='Only run 1 and 100 UIDs')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS),
+                        help='Scenarios to run (default: all)')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='Worker threads / async concurrency (default: 8)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mock server latency in seconds')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with -412/-799')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with HTTP 500')
+    parser.add_argument('--videos-per-user', type=int, default=30,
+                        help='Videos per mock user (default: 30)')
+    parser.add_argument('--json', dest='json_file', help='Also write the results to this JSON file')
+    parser.add_argument('--worker', choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument('--api-base', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # Child process: run one scenario and report on stdout
+        result = run_worker(args.worker, args.api_base, args.uids[0], args.workers)
+        sys.stdout.write(json.dumps(result))
+        return
+
+    uid_counts = [count for count in DEFAULT_UIDS if count <= 100] if args.quick else args.uids
+    results = []
+    with MockBilibiliServer(latency=args.latency, throttle_rate=args.throttle_rate,
+                            error_rate=args.error_rate, videos_per_user=args.videos_per_user) as server:
+        print(f"Mock API: {server.url} (latency {args.latency}s, throttle {args.throttle_rate}, "
+              f"errors {args.error_rate}, {args.videos_per_user} videos/user)")
+        for uid_count in uid_counts:
+            for scenario in args.scenarios:
+                print(f"Running {scenario} with {uid_count} UIDs...", file=sys.stderr)
+                results.append(run_scenario(server, scenario, uid_count, args.workers))
+
+    print_table(results)
+    if args.json_file:
+        with open(args.json_file, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+        print(f"Results written to {args.json_file}")
+
+
+if __name__ == '__main__':
+    main()
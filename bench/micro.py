@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the formatting, signing and export hot paths
+
+Every case runs on synthetic datasets of 10k/100k/1M videos. Wall time
+is the best and median of several runs; allocations are measured in a
+separate run under tracemalloc (peak traced bytes and the number of
+blocks the case leaves allocated), so tracing does not distort the
+timings.
+
+Usage:
+    python -m bench.micro --quick --json before.json        # 10k videos only
+    python -m bench.micro --sizes 100000 --cases format_video_data export_to_csv
+    python -m bench.micro --compare before.json after.json  # Flag regressions
+    python -m bench.micro --quick --compare before.json     # Run now and compare
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.mock_server import IMG_KEY, SUB_KEY, MockBilibiliServer
+from billbillbug.columnar import pa
+from billbillbug.exporter import DataExporter
+from billbillbug.scraper import BilibiliScraper
+from billbillbug.wbi import WbiSigner
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+MID = 486272
+
+
+def make_dataset(size: int) -> Dict:
+    """Raw API videos and the matching scrape result for `size` videos"""
+    raw_videos = [MockBilibiliServer._video(MID, i) for i in range(size)]
+    user_info = {
+        'mid': MID, 'name': '示例UP主', 'sex': '男', 'face': 'https://i2.hdslb.com/bfs/face/example.jpg',
+        'sign': '这是一个示例UP主的签名', 'level': 6, 'birthday': '2000-01-01', 'coins': 12345,
+        'fans': 123456, 'friend': 987, 'attention': 234,
+    }
+    scraper = make_scraper()
+    return {
+        'raw': raw_videos,
+        'user_info': user_info,
+        'data': {
+            'user_info': user_info,
+            'videos': scraper.format_video_data(raw_videos, user_info),
+            'total_videos': size,
+            'scrape_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        },
+    }
+
+
+def make_scraper() -> BilibiliScraper:
+    """Scraper with fixed WBI keys, so signing never touches the network"""
+    return BilibiliScraper(delay=0, signer=WbiSigner(lambda: (IMG_KEY, SUB_KEY)))
+
+
+# Each case takes (dataset, output directory) and does the measured work
+
+def _case_format_video_data(dataset, out_dir):
+    make_scraper().format_video_data(dataset['raw'], dataset['user_info'])
+
+
+def _case_format_video_table(dataset, out_dir):
+    make_scraper().format_video_table(dataset['raw'], dataset['user_info'])
+
+
+def _case_format_timestamp(dataset, out_dir):
+    format_timestamp = make_scraper()._format_timestamp
+    for video in dataset['raw']:
+        format_timestamp(video['created'])
+
+
+def _case_sign_wbi_params(dataset, out_dir):
+    # One signature per video, i.e. the cost of signing that many requests
+    scraper = make_scraper()
+    for video in dataset['raw']:
+        scraper._sign_wbi_params({'mid': MID, 'ps': 50, 'pn': video['aid'] % 1000, 'order': 'pubdate'})
+
+
+def _exporter_case(method: str, extension: str, **options) -> Callable:
+    def case(dataset, out_dir):
+        getattr(DataExporter, method)(dataset['data'], os.path.join(out_dir, f"{method}.{extension}"), **options)
+    return case
+
+
+CASES = {
+    'format_video_data': _case_format_video_data,
+    'format_video_table': _case_format_video_table,
+    '_format_timestamp': _case_format_timestamp,
+    '_sign_wbi_params': _case_sign_wbi_params,
+    'export_to_json': _exporter_case('export_to_json', 'json'),
+    'export_to_csv': _exporter_case('export_to_csv', 'csv'),
+    'export_to_json_compact': _exporter_case('export_to_json', 'json', compact=True),
+    'export_to_ndjson': _exporter_case('export_to_ndjson', 'ndjson'),
+    'export_to_ndjson_compact': _exporter_case('export_to_ndjson', 'ndjson', compact=True),
+    'export_to_parquet': _exporter_case('export_to_parquet', 'parquet'),
+    'export_to_feather': _exporter_case('export_to_feather', 'feather'),
+    'export_to_sqlite': _exporter_case('export_to_sqlite', 'db'),
+    'export_user_info_csv': _exporter_case('export_user_info_csv', 'csv'),
+    'export_summary_txt': _exporter_case('export_summary_txt', 'txt'),
+}
+PYARROW_CASES = ('export_to_parquet', 'export_to_feather')
+
+
+def measure(case: Callable, dataset: Dict, repeat: int) -> Dict:
+    """Time a case `repeat` times, then trace its allocations once"""
+    timings = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as out_dir:
+            started = time.perf_counter()
+            case(dataset, out_dir)
+            timings.append(time.perf_counter() - started)
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        tracemalloc.start()
+        try:
+            case(dataset, out_dir)
+            _, peak = tracemalloc.get_traced_memory()
+            # Blocks still allocated once the case has returned (caches, leaks)
+            blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'min_s': round(min(timings), 6),
+        'median_s': round(statistics.median(timings), 6),
+        'peak_alloc_bytes': peak,
+        'retained_blocks': blocks,
+    }
+
+
+def run_suite(sizes: List[int], case_names: List[str], repeat: int = 3, verbose: bool = True) -> Dict:
+    """
+    Run the selected cases on every dataset size
+
+    Returns:
+        Result document with 'meta' and 'results' keys
+    """
+    results = []
+    for size in sizes:
+        dataset = make_dataset(size)
+        for name in case_names:
+            if name in PYARROW_CASES and pa is None:
+                continue
+            if verbose:
+                print(f"{name} x {size}...", file=sys.stderr)
+            # Exporters report the files they write with print()
+            with contextlib.redirect_stdout(io.StringIO()):
+                measured = measure(CASES[name], dataset, repeat)
+            results.append(dict(case=name, size=size, **measured))
+        del dataset
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Short hash of the checked-out commit (None outside a git checkout)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(base: Dict, new: Dict, threshold: float = 0.10, alloc_threshold: float = 0.10) -> List[Dict]:
+    """
+    Compare two result documents
+
+    Args:
+        base: Results of the reference commit
+        new: Results to check
+        threshold: Allowed relative slowdown of the best time
+        alloc_threshold: Allowed relative growth of the allocation peak
+
+    Returns:
+        One row per case/size present in both documents, with time and
+        allocation ratios and a 'regression' flag
+    """
+    base_results = {(r['case'], r['size']): r for r in base['results']}
+    rows = []
+    for result in new['results']:
+        before = base_results.get((result['case'], result['size']))
+        if before is None:
+            continue
+        time_ratio = result['min_s'] / before['min_s'] if before['min_s'] else 1.0
+        alloc_ratio = (result['peak_alloc_bytes'] / before['peak_alloc_bytes']
+                       if before['peak_alloc_bytes'] else 1.0)
+        rows.append({
+            'case': result['case'],
+            'size': result['size'],
+            'time_ratio': round(time_ratio, 3),
+            'alloc_ratio': round(alloc_ratio, 3),
+            'regression': time_ratio > 1 + threshold or alloc_ratio > 1 + alloc_threshold,
+        })
+    return rows
+
+
+def _table(rows: List[tuple]):
+    widths = [max(len(str(row[i])) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print('  '.join(str(value).rjust(width) for value, width in zip(row, widths)))
+
+
+def print_results(document: Dict):
+    """Print a result document as a table"""
+    rows = [('case', 'size', 'min s', 'median s', 'peak alloc MB', 'retained blocks')]
+    for r in document['results']:
+        rows.append((r['case'], r['size'], f"{r['min_s']:.4f}", f"{r['median_s']:.4f}",
+                     f"{r['peak_alloc_bytes'] / 1048576:.1f}", r['retained_blocks']))
+    _table(rows)
+
+
+def print_comparison(rows: List[Dict], base: Dict, new: Dict):
+    """Print a comparison produced by compare()"""
+    print(f"Comparing {base['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    table = [('case', 'size', 'time', 'alloc', '')]
+    for row in rows:
+        table.append((row['case'], row['size'], f"{row['time_ratio']:.2f}x", f"{row['alloc_ratio']:.2f}x",
+                      'REGRESSION' if row['regression'] else ''))
+    _table(table)
+
+
+def main():
+    """Run the micro-benchmarks or compare saved results"""
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for formatting, signing and export')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='Dataset sizes in videos (default: 10000 100000 1000000)')
+    parser.add_argument('--quick', action='store_true', help='Only use the 10000 video dataset')
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES),
+                        help='Cases to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case (default: 3)')
+    parser.add_argument('--json', dest='json_file', help='Write the results to this JSON file')
+    parser.add_argument('--compare', nargs='+', metavar='RESULTS',
+                        help='BASE [NEW] result files; without NEW the suite is run now')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative slowdown reported as a regression (default: 0.10)')
+    parser.add_argument('--alloc-threshold', type=float, default=0.10,
+                        help='Relative allocation growth reported as a regression (default: 0.10)')
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes one or two result files")
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[1], 'r', encoding='utf-8') as f:
+            document = json.load(f)
+    else:
+        sizes = [DEFAULT_SIZES[0]] if args.quick else args.sizes
+        document = run_suite(sizes, args.cases, args.repeat)
+        print_results(document)
+        if args.json_file:
+            with open(args.json_file, 'w', encoding='utf-8') as f:
+                json.dump(document, f, indent=2)
+            print(f"Results written to {args.json_file}")
+
+    if args.compare:
+        with open(args.compare[0], 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        rows = compare(base, document, args.threshold, args.alloc_threshold)
+        print_comparison(rows, base, document)
+        if any(row['regression'] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
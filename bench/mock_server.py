@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Bilibili API
+
+Implements the three endpoints the scraper uses (nav, x/space/acc/info and
+x/space/wbi/arc/search) with deterministic data, checks WBI signatures
+with an implementation independent of billbillbug.wbi, and can inject
+latency, rate-limit responses (-412/-799) and server errors. Responses
+are gzip-compressed for clients that accept it, like the real API.
+
+Run standalone:
+    python -m bench.mock_server --port 8000 --latency 0.02 --throttle-rate 0.01
+    python main.py --uid 1 --api-base http://127.0.0.1:8000 --no-wbi-cache
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Keys served by the nav endpoint
+IMG_KEY = "7cd084941338484aae1ad9425b84077c"
+SUB_KEY = "4932caff0ff746eab6f01bf08b70ac45"
+
+# Key permutation from the API documentation (deliberately not imported from the package)
+_MIXIN_TAB = [
+    46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49,
+    33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40,
+    61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
+    36, 20, 34, 44, 52
+]
+
+# Publish time of the newest video of every mock user
+_NEWEST_CREATED = 1700000000
+
+
+def expected_w_rid(params: Dict[str, str], img_key: str = IMG_KEY, sub_key: str = SUB_KEY) -> str:
+    """Compute the w_rid a correctly signed request must carry"""
+    raw = img_key + sub_key
+    mixin_key = ''.join(raw[i] for i in _MIXIN_TAB)[:32]
+    filtered = []
+    for key in sorted(params):
+        if key == 'w_rid':
+            continue
+        value = ''.join(c for c in params[key] if c not in "!'()*")
+        filtered.append((key, value))
+    return hashlib.md5((urllib.parse.urlencode(filtered) + mixin_key).encode()).hexdigest()
+
+
+class MockBilibiliServer:
+    """
+    Threaded HTTP server imitating the Bilibili API
+
+    Every user has `videos_per_user` videos. The server runs in a daemon
+    thread; use it as a context manager or call start()/stop().
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 throttle_rate: float = 0.0, error_rate: float = 0.0, videos_per_user: int = 30,
+                 seed: int = 0, compress: bool = True):
+        """
+        Initialize the server
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Seconds added to every response
+            throttle_rate: Fraction of requests answered with -412 (HTTP 412) or -799
+            error_rate: Fraction of requests answered with HTTP 500
+            videos_per_user: Number of videos every user has published
+            seed: Seed for the injected failures
+            compress: gzip responses when the client sends Accept-Encoding: gzip
+        """
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.videos_per_user = videos_per_user
+        self.compress = compress
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.reset_stats()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.httpd.request_queue_size = 1024
+
+    @property
+    def url(self) -> str:
+        """Base URL to pass as api_base"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        """Serve requests in a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-bilibili', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Shut the server down"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def reset_stats(self):
+        """Clear the request counters"""
+        with self._lock:
+            self.requests = {}  # endpoint -> count
+            self.throttled = 0
+            self.errors = 0
+            self.bad_signatures = 0
+            self.connections = 0  # TCP connections accepted
+            self.bytes_sent = 0  # Response bodies as sent (after compression)
+            self.latencies: List[float] = []  # Server-side handling time per request
+
+    def stats(self) -> Dict:
+        """Return a snapshot of the request counters"""
+        with self._lock:
+            return {
+                'requests': sum(self.requests.values()),
+                'by_endpoint': dict(self.requests),
+                'throttled': self.throttled,
+                'errors': self.errors,
+                'bad_signatures': self.bad_signatures,
+                'connections': self.connections,
+                'bytes_sent': self.bytes_sent,
+            }
+
+    def _count(self, attribute: str):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def _roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    # Endpoint implementations return (HTTP status, JSON body)
+
+    def _nav(self, params: Dict[str, str]):
+        return 200, {
+            'code': -101,
+            'message': '账号未登录',
+            'data': {
+                'isLogin': False,
+                'wbi_img': {
+                    'img_url': f"https://i0.hdslb.com/bfs/wbi/{IMG_KEY}.png",
+                    'sub_url': f"https://i0.hdslb.com/bfs/wbi/{SUB_KEY}.png",
+                },
+            },
+        }
+
+    def _user_info(self, params: Dict[str, str]):
+        mid = self._mid(params)
+        if mid is None:
+            return 200, {'code': -400, 'message': '请求错误'}
+        return 200, {
+            'code': 0,
+            'message': '0',
+            'data': {
+                'mid': mid,
+                'name': f"mock_up_{mid}",
+                'sex': '保密',
+                'face': f"https://i0.hdslb.com/bfs/face/{mid}.jpg",
+                'sign': f"Mock UP master {mid}",
+                'level': mid % 7,
+                'birthday': '01-01',
+                'coins': mid % 1000,
+                'fans': mid * 7 % 100000,
+                'friend': mid % 500,
+                'attention': mid % 300,
+            },
+        }
+
+    def _video_search(self, params: Dict[str, str]):
+        if params.get('w_rid') != expected_w_rid(params):
+            self._count('bad_signatures')
+            return 200, {'code': -352, 'message': '风控校验失败'}
+        mid = self._mid(params)
+        if mid is None:
+            return 200, {'code': -400, 'message': '请求错误'}
+
+        page = max(1, int(params.get('pn', 1)))
+        page_size = max(1, min(50, int(params.get('ps', 30))))
+        start = (page - 1) * page_size
+        end = min(start + page_size, self.videos_per_user)
+        return 200, {
+            'code': 0,
+            'message': '0',
+            'data': {
+                'list': {'vlist': [self._video(mid, i) for i in range(start, end)]},
+                'page': {'pn': page, 'ps': page_size, 'count': self.videos_per_user},
+            },
+        }
+
+    def _video_detail(self, params: Dict[str, str]):
+        bvid = params.get('bvid', '')
+        if not bvid.startswith('BV') or not bvid[2:].isdigit():
+            return 200, {'code': -400, 'message': '请求错误'}
+        aid = int(bvid[2:])
+        mid, index = divmod(aid, 100000)
+        view = dict(self._video(mid, index), stat={
+            'aid': aid,
+            'view': aid % 100000,
+            'danmaku': aid % 700,
+            'reply': aid % 1000,
+            'favorite': aid % 5000,
+            'coin': aid % 3000,
+            'share': aid % 200,
+            'like': aid % 9000,
+        })
+        tags = [{'tag_id': index % 10 + i, 'tag_name': f"tag{index % 10 + i}"} for i in range(3)]
+        return 200, {'code': 0, 'message': '0', 'data': {'View': view, 'Tags': tags}}
+
+    @staticmethod
+    def _mid(params: Dict[str, str]) -> Optional[int]:
+        try:
+            return int(params['mid'])
+        except (KeyError, ValueError):
+            return None
+
+    @staticmethod
+    def _video(mid: int, index: int) -> Dict:
+        """Video `index` of a user, newest first"""
+        aid = mid * 100000 + index
+        return {
+            'title': f"Mock video {index} of {mid}",
+            'bvid': f"BV{aid:010d}",
+            'aid': aid,
+            'pic': f"https://i0.hdslb.com/bfs/archive/{aid}.jpg",
+            'author': f"mock_up_{mid}",
+            'mid': mid,
+            'play': aid % 100000,
+            'video_review': aid % 1000,
+            'favorites': aid % 5000,
+            'created': _NEWEST_CREATED - index * 3600,
+            'length': f"{index % 60:02d}:{index % 59:02d}",
+            'description': f"Description of video {index}",
+        }
+
+    def _dispatch(self, path: str, params: Dict[str, str]):
+        routes = {
+            '/x/web-interface/nav': self._nav,
+            '/x/space/acc/info': self._user_info,
+            '/x/space/wbi/arc/search': self._video_search,
+            '/x/web-interface/view/detail': self._video_detail,
+        }
+        handler = routes.get(path)
+        if handler is None:
+            return 404, {'code': -404, 'message': '啥都木有'}
+
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+        if self.latency:
+            time.sleep(self.latency)
+        if self._roll(self.error_rate):
+            self._count('errors')
+            return 500, {'code': -500, 'message': '服务器错误'}
+        if self._roll(self.throttle_rate):
+            self._count('throttled')
+            if self._roll(0.5):
+                return 412, {'code': -412, 'message': '请求被拦截'}
+            return 200, {'code': -799, 'message': '请求过于频繁，请稍后再试'}
+        return handler(params)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+            def setup(self):
+                # One handler instance serves every request of a keep-alive connection
+                super().setup()
+                server._count('connections')
+
+            def do_GET(self):
+                started = time.perf_counter()
+                parsed = urllib.parse.urlsplit(self.path)
+                params = dict(urllib.parse.parse_qsl(parsed.query, keep_blank_values=True))
+                status, body = server._dispatch(parsed.path, params)
+
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                gzipped = server.compress and 'gzip' in self.headers.get('Accept-Encoding', '')
+                if gzipped:
+                    payload = gzip.compress(payload, compresslevel=5)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                if gzipped:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+                with server._lock:
+                    server.latencies.append(time.perf_counter() - started)
+                    server.bytes_sent += len(payload)
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+        return Handler
+
+
+def main():
+    """Run the mock server in the foreground"""
+    parser = argparse.ArgumentParser(description='Local mock of the Bilibili API')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='Port to bind (default: 8000)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with -412/-799')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with HTTP 500')
+    parser.add_argument('--videos-per-user', type=int, default=30,
+                        help='Number of videos per user (default: 30)')
+    args = parser.parse_args()
+
+    server = MockBilibiliServer(args.host, args.port, args.latency, args.throttle_rate,
+                                args.error_rate, args.videos_per_user)
+    print(f"Mock Bilibili API listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(server.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -6,7 +6,9 @@ __version__ = "0.1.0"
 __author__ = "BillBillBug Team"
 __description__ = "A toolkit for scraping Bilibili data"
 
-from .scraper import BilibiliScraper
+from .scraper import BilibiliScraper, IncompleteCrawlError
+from .async_scraper import AsyncBilibiliScraper
 from .exporter import DataExporter
+from .table import VideoTable
 
-__all__ = ['BilibiliScraper', 'DataExporter']
\ No newline at end of file
+__all__ = ['BilibiliScraper', 'AsyncBilibiliScraper', 'DataExporter', 'VideoTable', 'IncompleteCrawlError']
\ No newline at end of file
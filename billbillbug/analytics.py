@@ -0,0 +1,255 @@
+"""
+Video statistics for BillBillBug summaries
+
+Uses NumPy for percentiles and top-N selection when it is installed
+(pip install numpy) and falls back to pure Python otherwise.
+"""
+
+import heapq
+from array import array
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None
+
+
+# Counters of a formatted video row
+METRICS = ('play', 'video_review', 'favorites')
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+def _count(value) -> Optional[int]:
+    """Convert a counter to int; placeholders such as '--' become None"""
+    if type(value) is int:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _percentile(ordered: Sequence[int], q: float) -> float:
+    """Linearly interpolated percentile of sorted values (NumPy's default method)"""
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class VideoStats:
+    """
+    Streaming statistics over formatted video rows
+
+    Rows are consumed once, in chunks: each chunk is split into counter
+    columns kept in compact int64 arrays (for totals and percentiles),
+    merged into bounded top-N lists per metric, and bucketed per upload
+    day; days are folded into month and weekday aggregates at the end.
+    Feed it any number of UP masters, e.g. one add_many() call per
+    scrape result, then call result().
+    """
+
+    CHUNK_SIZE = 65536
+
+    def __init__(self, top_n: int = 10, percentiles: Sequence[float] = DEFAULT_PERCENTILES):
+        """
+        Initialize the accumulator
+
+        Args:
+            top_n: Number of top videos kept per metric
+            percentiles: Percentiles to report for every metric
+        """
+        self.top_n = top_n
+        self.percentiles = tuple(percentiles)
+        self.videos = 0
+        self.totals = dict.fromkeys(METRICS, 0)
+        self._values = {metric: array('q') for metric in METRICS}
+        self._top = {metric: [] for metric in METRICS}  # (value, -row number, row), best first
+        self._days: Dict[str, List[int]] = {}  # 'YYYY-MM-DD' -> [uploads, views]
+        self._uploaders = set()
+
+    def add(self, video: Dict[str, Any]):
+        """Add one formatted video row"""
+        self.add_many((video,))
+
+    def add_many(self, videos: Iterable[Dict[str, Any]]) -> 'VideoStats':
+        """
+        Add formatted video rows
+
+        Args:
+            videos: Any iterable of rows (consumed once)
+
+        Returns:
+            self, for chaining
+        """
+        rows = iter(videos)
+        while True:
+            chunk = list(islice(rows, self.CHUNK_SIZE))
+            if not chunk:
+                return self
+            self._add_chunk(chunk)
+
+    def _add_chunk(self, chunk: List[Dict[str, Any]]):
+        """Update every statistic with one chunk of rows"""
+        first_row = self.videos
+        self.videos += len(chunk)
+
+        play_column = None
+        for metric in METRICS:
+            column = [video.get(metric) for video in chunk]
+            try:
+                values = array('q', column)  # Fast path: every value is an int
+                present = None
+            except (TypeError, OverflowError):
+                present = [i for i, value in enumerate(column) if _count(value) is not None]
+                values = array('q', [_count(column[i]) for i in present])
+                column = [_count(value) or 0 for value in column]
+            if metric == 'play':
+                play_column = column
+
+            self.totals[metric] += sum(values)
+            self._values[metric].extend(values)
+
+            # Top-N of the chunk, merged with the running top-N; earlier rows win ties
+            best = self._largest(values, self.top_n)
+            if present is not None:
+                best = [present[i] for i in best]
+            candidates = self._top[metric] + [(column[i], -(first_row + i), chunk[i]) for i in best]
+            self._top[metric] = heapq.nlargest(self.top_n, candidates, key=lambda entry: entry[:2])
+
+        # Bucket uploads and views per day ('' for rows without a publish time)
+        days = [
+            created[:10] if type(created) is str else
+            datetime.fromtimestamp(created).strftime('%Y-%m-%d') if created else ''
+            for created in (video.get('created') for video in chunk)
+        ]
+        if np is not None:
+            keys, inverse = np.unique(np.array(days), return_inverse=True)
+            uploads = np.bincount(inverse).tolist()
+            views = np.bincount(inverse, weights=np.array(play_column, dtype=np.int64)).tolist()
+            buckets = zip(keys.tolist(), uploads, views)
+        else:
+            totals = {}
+            for day, day_views in zip(days, play_column):
+                bucket = totals.get(day)
+                if bucket is None:
+                    bucket = totals[day] = [0, 0]
+                bucket[0] += 1
+                bucket[1] += day_views
+            buckets = ((day, uploads, views) for day, (uploads, views) in totals.items())
+
+        for day, uploads, views in buckets:
+            if not day:
+                continue
+            bucket = self._days.setdefault(day, [0, 0])
+            bucket[0] += uploads
+            bucket[1] += int(views)
+
+        self._uploaders.update(video.get('mid') for video in chunk)
+
+    @staticmethod
+    def _largest(values: array, n: int) -> List[int]:
+        """Positions of the n largest values (the first ones on ties)"""
+        if np is None or not 0 < n < len(values):
+            return heapq.nlargest(n, range(len(values)), key=values.__getitem__)
+        data = np.frombuffer(values, dtype=np.int64)
+        kth = np.partition(data, len(data) - n)[len(data) - n]
+        above = np.flatnonzero(data > kth)
+        ties = np.flatnonzero(data == kth)[:n - len(above)]
+        return np.concatenate([above, ties]).tolist()
+
+    def _calendar(self):
+        """Fold the per-day buckets into month and weekday aggregates"""
+        months: Dict[str, List[int]] = {}
+        weekdays = [[0, 0] for _ in WEEKDAYS]
+        for day, (uploads, views) in self._days.items():
+            try:
+                weekday = date(int(day[:4]), int(day[5:7]), int(day[8:10])).weekday()
+            except ValueError:
+                continue
+            month = months.setdefault(day[:7], [0, 0])
+            month[0] += uploads
+            month[1] += views
+            weekdays[weekday][0] += uploads
+            weekdays[weekday][1] += views
+        return months, weekdays
+
+    def _percentiles(self, metric: str) -> Dict[str, float]:
+        values = self._values[metric]
+        if not values:
+            return {}
+        if np is not None:
+            results = np.percentile(np.frombuffer(values, dtype=np.int64), self.percentiles)
+            return {f"p{q:g}": float(result) for q, result in zip(self.percentiles, results)}
+        ordered = sorted(values)
+        return {f"p{q:g}": float(_percentile(ordered, q)) for q in self.percentiles}
+
+    def top(self, metric: str = 'play', n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Top videos for a metric, highest first (earlier rows win ties)
+
+        Args:
+            metric: One of METRICS
+            n: Number of videos (at most top_n)
+        """
+        ranked = [row for _, _, row in self._top[metric]]
+        return ranked[:n] if n is not None else ranked
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Build the structured summary
+
+        Returns:
+            Dictionary with 'videos', 'uploaders', 'totals', 'means',
+            'percentiles', 'engagement', 'monthly', 'weekday' and 'top'
+        """
+        videos = self.videos
+        plays = self.totals['play']
+        months, weekdays = self._calendar()
+        return {
+            'videos': videos,
+            'uploaders': len(self._uploaders - {None, ''}),
+            'totals': dict(self.totals),
+            'means': {
+                metric: round(total / len(self._values[metric]), 2) if self._values[metric] else 0.0
+                for metric, total in self.totals.items()
+            },
+            'percentiles': {metric: self._percentiles(metric) for metric in METRICS},
+            'engagement': {
+                'comments_per_1k_views': round(self.totals['video_review'] * 1000 / plays, 3) if plays else 0.0,
+                'favorites_per_1k_views': round(self.totals['favorites'] * 1000 / plays, 3) if plays else 0.0,
+                'interactions_per_1k_views': (
+                    round((self.totals['video_review'] + self.totals['favorites']) * 1000 / plays, 3)
+                    if plays else 0.0
+                ),
+            },
+            'monthly': [
+                {'month': month, 'uploads': uploads, 'views': views}
+                for month, (uploads, views) in sorted(months.items())
+            ],
+            'weekday': [
+                {'weekday': name, 'uploads': uploads, 'views': views}
+                for name, (uploads, views) in zip(WEEKDAYS, weekdays)
+            ],
+            'top': {metric: self.top(metric) for metric in METRICS},
+        }
+
+
+def analyze(videos: Iterable[Dict[str, Any]], top_n: int = 10,
+            percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+    """
+    Compute the summary statistics of formatted video rows
+
+    Args:
+        videos: Formatted video rows (from one or many UP masters)
+        top_n: Number of top videos reported per metric
+        percentiles: Percentiles to report for every metric
+
+    Returns:
+        Structured summary, see VideoStats.result
+    """
+    return VideoStats(top_n, percentiles).add_many(videos).result()
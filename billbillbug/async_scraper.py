@@ -0,0 +1,297 @@
+"""
+Asynchronous Bilibili video scraper module
+Fetches the pages of a video listing concurrently instead of one at a time
+"""
+
+import asyncio
+import contextlib
+import math
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from .checkpoint import CrawlCheckpoint
+from .scraper import BilibiliScraper, IncompleteCrawlError
+
+
+class AsyncBilibiliScraper(BilibiliScraper):
+    """
+    asyncio-based Bilibili video scraper
+
+    Exposes the same public methods as BilibiliScraper, but the network
+    methods are coroutines. Requests are still made with the shared
+    transport; they run on a dedicated thread pool so that up to
+    `concurrency` pages are in flight at the same time.
+    """
+
+    def __init__(self, delay: float = 1.0, concurrency: int = 4, **kwargs):
+        """
+        Initialize the scraper
+
+        Args:
+            delay: Minimum interval between requests in seconds (for rate limiting)
+            concurrency: Maximum number of requests in flight at once
+            **kwargs: Other BilibiliScraper options (rate_limiter, cache, transport, ...)
+        """
+        super().__init__(delay=delay, **kwargs)
+        self.concurrency = max(1, concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency,
+            thread_name_prefix='billbillbug'
+        )
+
+        # Make sure the connection pool can hold one connection per worker
+        if self.transport.pool_size < self.concurrency:
+            self.transport.set_pool_size(self.concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Release the worker threads and the HTTP connections"""
+        self._executor.shutdown(wait=False)
+        super().close()
+
+    async def _run(self, func, *args):
+        """Run a blocking scraper call on the worker pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def get_user_videos(self, uid: str, page: int = 1, page_size: int = 50) -> Dict:
+        """
+        Get video list from a specific UP master
+
+        Args:
+            uid: UP master's UID
+            page: Page number (starts from 1)
+            page_size: Number of videos per page (max 50)
+
+        Returns:
+            Dictionary containing video list and metadata
+        """
+        return await self._run(super().get_user_videos, uid, page, page_size)
+
+    async def get_user_info(self, uid: str) -> Dict:
+        """
+        Get basic information about a UP master
+
+        Args:
+            uid: UP master's UID
+
+        Returns:
+            Dictionary containing user information
+        """
+        return await self._run(super().get_user_info, uid)
+
+    async def _get_page(self, uid: str, page: int, semaphore: Optional[asyncio.Semaphore] = None,
+                        checkpoint: Optional[CrawlCheckpoint] = None) -> Dict:
+        """Fetch a single page while holding a concurrency slot (or restore it from a checkpoint)"""
+        data = checkpoint.get(page) if checkpoint else None
+        if data is not None:
+            print(f"Page {page} restored from checkpoint")
+            return data
+
+        async with semaphore or contextlib.nullcontext():
+            print(f"Fetching page {page}...")
+            data = await self.get_user_videos(uid, page=page)
+        if checkpoint and data and data.get('list', {}).get('vlist'):
+            checkpoint.save(page, data)
+        return data
+
+    async def get_all_user_videos(self, uid: str, max_videos: Optional[int] = None,
+                                  known_bvids: Optional[Set[str]] = None,
+                                  checkpoint: Optional[CrawlCheckpoint] = None) -> List[Dict]:
+        """
+        Get all videos from a UP master (with concurrent pagination)
+
+        The first page is fetched on its own to learn the total video
+        count. All remaining pages are then requested concurrently and
+        stitched back together in page order, so the result is identical
+        to BilibiliScraper.get_all_user_videos. With known_bvids the
+        pages are fetched one at a time instead, because the crawl is
+        expected to stop after the first few pages.
+
+        Args:
+            uid: UP master's UID
+            max_videos: Maximum number of videos to fetch (None for all)
+            known_bvids: Already collected bvids; pagination stops at the first one
+            checkpoint: Optional CrawlCheckpoint; checkpointed pages are not
+                requested again and fetched pages are appended to it
+
+        Returns:
+            List of video dictionaries
+        """
+        all_videos = []
+
+        print(f"Fetching videos for UID: {uid}")
+        data = await self._get_page(uid, 1, checkpoint=checkpoint)
+
+        more = self._extend_page(all_videos, data, uid, 1, known_bvids)
+        if not more:
+            print(f"Total videos fetched: {len(all_videos)}")
+            return all_videos[:max_videos] if max_videos else all_videos
+
+        # Work out how many pages are left from the reported total
+        total = data.get('page', {}).get('count', len(all_videos))
+        if max_videos:
+            total = min(total, max_videos)
+        last_page = math.ceil(total / self.PAGE_SIZE) if not known_bvids else 1
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pages = range(2, last_page + 1)
+        results = await asyncio.gather(*(self._get_page(uid, page, semaphore, checkpoint) for page in pages))
+
+        # Stitch pages together in order, stopping where the sync path would stop
+        page = 1
+        for page, data in zip(pages, results):
+            if max_videos and len(all_videos) >= max_videos:
+                more = False
+                break
+            more = self._extend_page(all_videos, data, uid, page, known_bvids)
+            if not more:
+                break
+
+        # The count may have grown since the first page; finish off sequentially
+        while more and not (max_videos and len(all_videos) >= max_videos):
+            page += 1
+            data = await self._get_page(uid, page, checkpoint=checkpoint)
+            more = self._extend_page(all_videos, data, uid, page, known_bvids)
+
+        if max_videos:
+            all_videos = all_videos[:max_videos]
+
+        print(f"Total videos fetched: {len(all_videos)}")
+        return all_videos
+
+    async def iter_video_pages(self, uid: str, max_videos: Optional[int] = None,
+                               known_bvids: Optional[Set[str]] = None) -> AsyncIterator[List[Dict]]:
+        """
+        Iterate over the raw video list of a UP master one page at a time
+
+        Pages are requested in windows of `concurrency` pages and yielded
+        in listing order, so memory stays bounded by the window size.
+
+        Args:
+            uid: UP master's UID
+            max_videos: Maximum number of videos to fetch (None for all)
+            known_bvids: Already collected bvids; pagination stops at the first one
+
+        Yields:
+            Non-empty lists of raw video dictionaries, in listing order
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        window = 1 if known_bvids else self.concurrency
+        fetched = 0
+        page = 1
+
+        print(f"Fetching videos for UID: {uid}")
+
+        while True:
+            pages = range(page, page + (1 if page == 1 else window))
+            results = await asyncio.gather(*(self._get_page(uid, p, semaphore) for p in pages))
+
+            for page, data in zip(pages, results):
+                videos = []
+                more = self._extend_page(videos, data, uid, page, known_bvids)
+
+                if max_videos and fetched + len(videos) >= max_videos:
+                    yield videos[:max_videos - fetched]
+                    return
+
+                fetched += len(videos)
+                if videos:
+                    yield videos
+                if not more:
+                    return
+
+            page += 1
+
+    async def iter_user_videos(self, uid: str, user_info: Dict = None, max_videos: Optional[int] = None,
+                               known_bvids: Optional[Set[str]] = None) -> AsyncIterator[Dict]:
+        """
+        Stream formatted videos of a UP master as pages arrive
+
+        Args:
+            uid: UP master's UID
+            user_info: Optional user information added to every row
+            max_videos: Maximum number of videos to fetch (None for all)
+            known_bvids: Already collected bvids; only newer videos are fetched
+
+        Yields:
+            Formatted video dictionaries, newest first
+        """
+        async for videos in self.iter_video_pages(uid, max_videos, known_bvids):
+            for video in self.format_video_data(videos, user_info):
+                yield video
+
+    def _extend_page(self, all_videos: List[Dict], data: Dict, uid: str, page: int,
+                     known_bvids: Optional[Set[str]] = None) -> bool:
+        """Append one page of results; return True if more pages may follow"""
+        if not data or 'list' not in data:
+            # A page that failed before the last one leaves a hole in the list
+            raise IncompleteCrawlError(uid, page)
+
+        videos = data['list']['vlist']
+        if not videos:
+            print("No videos in current page")
+            return False
+
+        new_videos = self._take_new_videos(videos, known_bvids)
+        all_videos.extend(new_videos)
+        print(f"Found {len(new_videos)} videos on page {page}")
+
+        if len(new_videos) < len(videos):
+            print("Reached previously collected videos")
+            return False
+        return len(videos) >= self.PAGE_SIZE
+
+    async def scrape_up_master(self, uid: str, max_videos: Optional[int] = None,
+                               known_bvids: Optional[Set[str]] = None,
+                               checkpoint: Optional[CrawlCheckpoint] = None) -> Dict:
+        """
+        Scrape complete information for a UP master
+
+        Args:
+            uid: UP master's UID
+            max_videos: Maximum number of videos to fetch
+            known_bvids: Already collected bvids; only newer videos are fetched
+            checkpoint: Optional CrawlCheckpoint to resume from and append to
+
+        Returns:
+            Dictionary containing user info and formatted video list
+            (a VideoTable when the scraper is compact)
+
+        Raises:
+            IncompleteCrawlError: If a page of the video list could not be fetched
+        """
+        print(f"Starting scrape for UP master UID: {uid}")
+
+        # Get user information
+        user_info = await self.get_user_info(uid)
+        if not user_info:
+            print("Failed to get user information")
+            return {}
+
+        print(f"UP Master: {user_info.get('name', 'Unknown')}")
+
+        # Get all videos
+        videos = await self.get_all_user_videos(uid, max_videos, known_bvids, checkpoint)
+        if not videos:
+            print("No videos found")
+            return {'user_info': user_info, 'videos': []}
+
+        # Format video data
+        if self.compact:
+            formatted_videos = self.format_video_table(videos, user_info)
+        else:
+            formatted_videos = self.format_video_data(videos, user_info)
+
+        return {
+            'user_info': user_info,
+            'videos': formatted_videos,
+            'total_videos': len(formatted_videos),
+            'scrape_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
@@ -0,0 +1,151 @@
+"""
+Batch scraping for many UP masters at once
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, TextIO
+
+from .checkpoint import CheckpointStore
+from .scraper import BilibiliScraper
+from .state import CrawlState
+
+
+def read_uids(stream: TextIO) -> List[str]:
+    """
+    Read UIDs from a text stream, one per line
+
+    Blank lines and lines starting with '#' are ignored, and duplicate
+    UIDs are only kept once (in order of first appearance).
+
+    Args:
+        stream: Open text stream (file or stdin)
+
+    Returns:
+        List of UID strings
+    """
+    uids = []
+    seen = set()
+    for line in stream:
+        uid = line.strip()
+        if not uid or uid.startswith('#') or uid in seen:
+            continue
+        seen.add(uid)
+        uids.append(uid)
+    return uids
+
+
+class BatchScraper:
+    """Scrape many UP masters on a pool of worker threads"""
+
+    def __init__(self, scraper: Optional[BilibiliScraper] = None, workers: int = 4,
+                 state: Optional[CrawlState] = None, checkpoints: Optional[CheckpointStore] = None):
+        """
+        Initialize the batch scraper
+
+        All workers share one BilibiliScraper, and therefore one HTTP
+        connection pool and one WBI key cache.
+
+        Args:
+            scraper: Scraper to share between workers (created if None)
+            workers: Number of worker threads
+            state: Optional crawl state; only videos newer than the recorded
+                ones are fetched for each UID
+            checkpoints: Optional checkpoint store; every UID's pages are
+                checkpointed so an interrupted batch can be resumed
+        """
+        self.scraper = scraper or BilibiliScraper()
+        self.workers = max(1, workers)
+        self.state = state
+        self.checkpoints = checkpoints
+
+        # One pooled connection per worker
+        if self.scraper.transport.pool_size < self.workers:
+            self.scraper.transport.set_pool_size(self.workers)
+
+    def _scrape_one(self, uid: str, max_videos: Optional[int]) -> Dict:
+        """Scrape one UID, capturing any failure in the result"""
+        started = time.perf_counter()
+        result = {'uid': uid, 'status': 'ok', 'data': {}, 'error': ''}
+
+        try:
+            known_bvids = self.state.known_bvids(uid) if self.state else None
+            if self.checkpoints:
+                checkpoint = self.checkpoints.open(uid)
+                try:
+                    data = self.scraper.scrape_up_master(uid, max_videos, known_bvids, checkpoint=checkpoint)
+                finally:
+                    checkpoint.close()
+            else:
+                data = self.scraper.scrape_up_master(uid, max_videos, known_bvids)
+            if not data:
+                result['status'] = 'error'
+                result['error'] = 'Failed to get user information'
+            else:
+                result['data'] = data
+                if not data.get('videos'):
+                    result['status'] = 'empty'
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = f"{type(e).__name__}: {e}"
+
+        result['elapsed'] = round(time.perf_counter() - started, 3)
+        return result
+
+    def run(self, uids: Iterable[str], max_videos: Optional[int] = None,
+            on_result: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Scrape every UID in the batch
+
+        Args:
+            uids: UIDs to scrape
+            max_videos: Maximum number of videos to fetch per UID
+            on_result: Optional callback invoked with each result as it completes
+
+        Returns:
+            Dictionary with per-UID results (in input order) and aggregate stats
+        """
+        uids = list(uids)
+        results = {}
+        requests_before = self.scraper.request_count
+        retries_before = self.scraper.retry.stats()
+        transport_before = self.scraper.transport.stats()
+        started = time.perf_counter()
+
+        # Keep the shared WBI keys fresh for the whole batch
+        self.scraper.signer.start_background_refresh()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='billbillbug') as pool:
+                futures = {pool.submit(self._scrape_one, uid, max_videos): uid for uid in uids}
+                for future in as_completed(futures):
+                    result = future.result()
+                    results[result['uid']] = result
+                    if on_result:
+                        on_result(result)
+        finally:
+            self.scraper.signer.stop_background_refresh()
+
+        elapsed = time.perf_counter() - started
+        requests_made = self.scraper.request_count - requests_before
+        retries = self.scraper.retry.stats()
+        transport = self.scraper.transport.stats()
+        ordered = [results[uid] for uid in uids]
+
+        return {
+            'results': ordered,
+            'stats': {
+                'total_uids': len(uids),
+                'succeeded': sum(1 for r in ordered if r['status'] != 'error'),
+                'failed': sum(1 for r in ordered if r['status'] == 'error'),
+                'elapsed': round(elapsed, 3),
+                'requests': requests_made,
+                'uids_per_min': round(len(uids) / elapsed * 60, 2) if elapsed else 0.0,
+                'requests_per_sec': round(requests_made / elapsed, 2) if elapsed else 0.0,
+                'bytes_received': transport['wire_bytes'] - transport_before['wire_bytes'],
+                'connections': transport['connections'] - transport_before['connections'],
+                'retries': retries['retries'] - retries_before['retries'],
+                'gave_up': retries['gave_up'] - retries_before['gave_up'],
+                'retry_wasted_seconds': round(retries['wasted_seconds'] - retries_before['wasted_seconds'], 3),
+                'breaker_trips': retries['breaker_trips'] - retries_before['breaker_trips'],
+            }
+        }
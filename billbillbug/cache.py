@@ -0,0 +1,186 @@
+"""
+On-disk HTTP response cache for BillBillBug
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+import zlib
+from typing import Dict, Optional
+
+import requests
+
+from . import fastjson
+
+
+class CacheMiss(requests.RequestException):
+    """Raised in replay mode when a response is not in the cache"""
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of decoded API responses
+
+    Entries are keyed on the endpoint path plus the sorted request
+    parameters, leaving out the volatile WBI signature fields, so a signed
+    request made an hour later still hits the same entry. Bodies are
+    stored zlib-compressed. The cache holds at most `max_entries`
+    responses and evicts the least recently used ones first.
+    """
+
+    # Fields that change on every signed request
+    VOLATILE_PARAMS = frozenset(['wts', 'w_rid'])
+
+    # API codes worth caching (-101 is the normal "not logged in" nav answer)
+    CACHEABLE_CODES = (0, -101)
+
+    # Default time-to-live per endpoint, in seconds
+    DEFAULT_TTLS = {
+        'x/web-interface/nav': 3600,
+        'x/space/acc/info': 6 * 3600,
+        'x/space/wbi/arc/search': 3600,
+        'x/web-interface/view/detail': 6 * 3600,
+    }
+
+    def __init__(self, path: str, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 3600,
+                 max_entries: int = 100000, replay: bool = False):
+        """
+        Open (or create) the cache database
+
+        Args:
+            path: SQLite database file
+            ttls: Per-endpoint TTLs in seconds, merged over DEFAULT_TTLS
+            default_ttl: TTL for endpoints without an explicit entry
+            max_entries: Maximum number of cached responses
+            replay: Serve every request from the cache, ignoring TTLs, and
+                raise CacheMiss instead of touching the network
+        """
+        self.path = path
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(path) if os.path.dirname(path) else '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                body BLOB NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at);
+        """)
+        self._size = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self):
+        """Close the database"""
+        self._conn.close()
+
+    @staticmethod
+    def _endpoint(url: str) -> str:
+        """Return the endpoint path of an API URL, e.g. 'x/space/acc/info'"""
+        return urllib.parse.urlsplit(url).path.strip('/')
+
+    @classmethod
+    def make_key(cls, url: str, params: Optional[dict] = None) -> str:
+        """
+        Build the cache key for a request
+
+        Args:
+            url: Request URL
+            params: Query parameters (signed or unsigned)
+
+        Returns:
+            Endpoint path plus normalized query string
+        """
+        items = sorted(
+            (str(k), str(v)) for k, v in (params or {}).items()
+            if k not in cls.VOLATILE_PARAMS
+        )
+        return cls._endpoint(url) + '?' + urllib.parse.urlencode(items)
+
+    def get(self, url: str, params: Optional[dict] = None) -> Optional[dict]:
+        """
+        Look up a cached response
+
+        Args:
+            url: Request URL
+            params: Query parameters
+
+        Returns:
+            Decoded JSON body, or None if missing or expired
+
+        Raises:
+            CacheMiss: In replay mode, when the response is not cached
+        """
+        key = self.make_key(url, params)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute('SELECT body, stored_at FROM responses WHERE key = ?', (key,)).fetchone()
+            fresh = row is not None and (
+                self.replay or now - row[1] < self.ttls.get(self._endpoint(url), self.default_ttl)
+            )
+            if not fresh:
+                self.misses += 1
+                if self.replay:
+                    raise CacheMiss(f"Not in cache: {key}")
+                return None
+
+            self.hits += 1
+            with self._conn:
+                self._conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+
+        return fastjson.loads(zlib.decompress(row[0]))
+
+    def set(self, url: str, params: Optional[dict], data: dict):
+        """
+        Store a response
+
+        Only responses with a successful API code are cached.
+
+        Args:
+            url: Request URL
+            params: Query parameters
+            data: Decoded JSON body
+        """
+        if data.get('code') not in self.CACHEABLE_CODES:
+            return
+
+        key = self.make_key(url, params)
+        body = zlib.compress(fastjson.dumps(data).encode('utf-8'))
+        now = time.time()
+
+        with self._lock, self._conn:
+            existed = self._conn.execute('SELECT 1 FROM responses WHERE key = ?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, endpoint, body, stored_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, self._endpoint(url), body, now, now)
+            )
+            if not existed:
+                self._size += 1
+            if self._size > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries, leaving 10% headroom (lock held)"""
+        target = int(self.max_entries * 0.9)
+        self._conn.execute(
+            'DELETE FROM responses WHERE key IN '
+            '(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)',
+            (self._size - target,)
+        )
+        self._size = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and the current number of entries"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': self._size}
@@ -0,0 +1,156 @@
+"""
+Resumable crawl checkpoints for BillBillBug
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+from . import fastjson
+
+
+class CrawlCheckpoint:
+    """
+    Append-only log of the video list pages fetched for one UP master
+
+    Every successfully fetched page is appended to a newline-delimited
+    JSON file as soon as it arrives (flushed immediately and fsynced
+    every `sync_every` pages), so a crawl that dies on page 180 of 200
+    can be resumed: pages already in the log are replayed instead of
+    requested again. The first line records the UID and when the crawl
+    started; a torn last line from a crash is ignored.
+    """
+
+    def __init__(self, path: str, uid: str, resume: bool = True, max_age: float = 86400,
+                 sync_every: int = 10):
+        """
+        Open the checkpoint
+
+        Args:
+            path: Checkpoint file
+            uid: UP master's UID
+            resume: Reuse pages from an existing checkpoint for this UID
+                (otherwise it is discarded)
+            max_age: Seconds after which an old checkpoint is not resumed, since
+                new uploads shift every later page of the listing
+            sync_every: Pages between fsync calls
+        """
+        self.path = path
+        self.uid = str(uid)
+        self.max_age = max_age
+        self.sync_every = max(1, sync_every)
+        self.pages: Dict[int, Dict] = {}  # page number -> API response data
+        self.resumed_pages = 0
+        self._file = None
+        self._unsynced = 0
+        self._lock = threading.Lock()
+
+        if resume:
+            self._load()
+        if not self.pages and os.path.exists(path):
+            os.remove(path)
+
+    def _load(self):
+        """Read pages from an existing checkpoint if it belongs to this crawl"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                header = fastjson.loads(f.readline())
+                if header.get('uid') != self.uid or time.time() - header.get('started', 0) > self.max_age:
+                    return
+                for line in f:
+                    try:
+                        record = fastjson.loads(line)
+                    except ValueError:
+                        break  # Torn write at the end of the log
+                    self.pages[record['page']] = record['data']
+        except (OSError, ValueError, KeyError, AttributeError):
+            return
+        self.resumed_pages = len(self.pages)
+        if self.pages:
+            print(f"Resuming UID {self.uid} from checkpoint ({len(self.pages)} pages)")
+
+    @property
+    def last_page(self) -> int:
+        """Last page of the unbroken run of checkpointed pages starting at page 1"""
+        page = 0
+        while page + 1 in self.pages:
+            page += 1
+        return page
+
+    def get(self, page: int) -> Optional[Dict]:
+        """Return the checkpointed response data of a page, or None"""
+        return self.pages.get(page)
+
+    def save(self, page: int, data: Dict):
+        """
+        Append a fetched page to the checkpoint
+
+        Args:
+            page: Page number
+            data: Response data from BilibiliScraper.get_user_videos
+        """
+        with self._lock:
+            if self._file is None:
+                new_file = not os.path.exists(self.path)
+                os.makedirs(os.path.dirname(self.path) if os.path.dirname(self.path) else '.', exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+                if new_file:
+                    self._file.write(fastjson.dumps({'uid': self.uid, 'started': time.time()}) + '\n')
+
+            self._file.write(fastjson.dumps({'page': page, 'data': data}) + '\n')
+            self._file.flush()
+            self.pages[page] = data
+
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def close(self):
+        """Flush and close the checkpoint file, keeping it for a later resume"""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def complete(self):
+        """Discard the checkpoint once its pages have made it into the final export"""
+        self.close()
+        self.pages = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CheckpointStore:
+    """Directory holding one CrawlCheckpoint per UID"""
+
+    def __init__(self, directory: str, resume: bool = False, max_age: float = 86400):
+        """
+        Initialize the store
+
+        Args:
+            directory: Directory for the checkpoint files
+            resume: Reuse existing checkpoints instead of starting over
+            max_age: Seconds after which a checkpoint is too old to resume
+        """
+        self.directory = directory
+        self.resume = resume
+        self.max_age = max_age
+
+    def path(self, uid: str) -> str:
+        """Checkpoint file of a UID"""
+        return os.path.join(self.directory, f"{re.sub(r'[^0-9A-Za-z_-]', '_', str(uid))}.ndjson")
+
+    def open(self, uid: str) -> CrawlCheckpoint:
+        """Open the checkpoint of a UID"""
+        return CrawlCheckpoint(self.path(uid), uid, resume=self.resume, max_age=self.max_age)
+
+    def discard(self, uid: str):
+        """Remove the checkpoint of a UID whose crawl has been exported"""
+        path = self.path(uid)
+        if os.path.exists(path):
+            os.remove(path)
@@ -3,14 +3,42 @@ Command line interface for BillBillBug
 """
 
 import argparse
+import asyncio
+import contextlib
 import sys
 import os
-from .scraper import BilibiliScraper
+import time
+from datetime import datetime
+from . import fastjson
+from .scraper import BilibiliScraper, IncompleteCrawlError
+from .async_scraper import AsyncBilibiliScraper
+from .batch import BatchScraper, read_uids
+from .enrich import VideoEnricher
+from .delta import SnapshotIndex
+from .timeseries import StatsStore
+from .ratelimit import TokenBucket, FileTokenBucket
+from .state import CrawlState, load_previous_videos, merge_videos
+from .cache import ResponseCache
+from .checkpoint import CheckpointStore
+from .scheduler import CrawlScheduler
+from .retry import CircuitBreaker, RetryPolicy
+from .server import ScraperService, make_server
+from .instrumentation import Hooks, Profiler
+from .transport import HttpxTransport, RequestsTransport, httpx
+from .sinks import CSVSink, JSONArraySink, NDJSONSink
+from .compress import Compression
+from .wbi import DEFAULT_KEY_FILE
+from .columnar import ArrowSink
 from .exporter import DataExporter
+from .analytics import VideoStats
 
 
 def main():
     """Main CLI function"""
+    if sys.argv[1:2] == ['serve']:
+        serve(sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(
         description="BillBillBug - Bilibili UP master video scraper",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -19,15 +47,44 @@ Examples:
   %(prog)s --uid 123456                    # Scrape all videos for UID 123456
   %(prog)s --uid 123456 --max-videos 50    # Scrape first 50 videos
   %(prog)s --uid 123456 --format json      # Export to JSON format
+  %(prog)s --uid 123456 --format sqlite    # Upsert into <output>/bilibili.db
+  %(prog)s --uid 123456 --stream --format ndjson --output -
+                                           # Stream rows to stdout as pages arrive
+  %(prog)s --uid 123456 --format json --json-compact  # Unindented JSON (faster with orjson)
   %(prog)s --uid 123456 --output ./data/   # Save to specific directory
   %(prog)s --uid 123456 --delay 2          # Add 2-second delay between requests
+  %(prog)s --uid 123456 --async --concurrency 8  # Fetch pages concurrently
+  %(prog)s --uid-file uids.txt --workers 16 --http2  # Multiplex requests over HTTP/2
+  %(prog)s --uid 123456 --retries 5 --breaker-cooldown 60
+                                           # Retry harder and pause longer when throttled
+  %(prog)s --uid-file uids.txt --workers 8 # Scrape many UIDs in one process
+  cat uids.txt | %(prog)s --uid-file -     # Read UIDs from stdin
+  %(prog)s --uid-file uids.txt --rate 5 --burst 10 --rate-file /tmp/bb.bucket
+                                           # Share a 5 req/s budget across processes
+  %(prog)s --uid 123456 --incremental      # Only fetch videos newer than the last run
+  %(prog)s --uid 123456 --resume           # Continue a crawl that was interrupted
+  %(prog)s --uid 123456 --cache            # Reuse cached API responses
+  %(prog)s --uid 123456 --replay           # Re-run entirely from the cache, offline
+  %(prog)s serve --port 8765               # Run as a daemon answering scrape requests
         """
     )
     
-    parser.add_argument(
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument(
         '--uid', 
-        required=True,
-        help='Bilibili UP master UID (required)'
+        help='Bilibili UP master UID'
+    )
+    
+    target.add_argument(
+        '--uid-file',
+        help='File with one UID per line for batch mode ("-" reads stdin)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=4,
+        help='Number of worker threads in batch mode (default: 4)'
     )
     
     parser.add_argument(
@@ -38,9 +95,43 @@ Examples:
     
     parser.add_argument(
         '--format',
-        choices=['json', 'csv', 'both'],
+        choices=['json', 'csv', 'ndjson', 'parquet', 'feather', 'sqlite', 'both'],
         default='both',
-        help='Output format (default: both)'
+        help='Output format; both = json + csv (default: both)'
+    )
+    
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Write rows page by page in constant memory (--output - writes csv/ndjson/json to stdout; '
+             'json is streamed as an array of rows)'
+    )
+    
+    parser.add_argument(
+        '--json-compact',
+        action='store_true',
+        help='Write JSON and NDJSON without indentation or spaces after separators'
+    )
+    
+    parser.add_argument(
+        '--compress',
+        choices=['gzip', 'zstd'],
+        help='Compress JSON, NDJSON and CSV output while it is written (.gz or .zst; zstd needs '
+             'pip install zstandard)'
+    )
+    
+    parser.add_argument(
+        '--compress-level',
+        type=int,
+        help='Compression level (default: 6 for gzip, 3 for zstd)'
+    )
+    
+    parser.add_argument(
+        '--compress-threads',
+        type=int,
+        default=0,
+        help='zstd compression threads for large outputs (0: compress on the writing thread, '
+             '-1: one per CPU; default: 0)'
     )
     
     parser.add_argument(
@@ -49,17 +140,177 @@ Examples:
         help='Output directory (default: ./output/)'
     )
     
+    _add_request_options(parser)
+    
     parser.add_argument(
-        '--delay',
+        '--async',
+        dest='use_async',
+        action='store_true',
+        help='Fetch video pages concurrently with the asyncio engine'
+    )
+    
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=4,
+        help='Maximum concurrent page requests in --async mode (default: 4)'
+    )
+    
+    parser.add_argument(
+        '--enrich',
+        action='store_true',
+        help='Fetch likes, coins, shares, replies, danmaku and tags for every video and add them as columns '
+             '(one request per video; with --cache, fresh details are not requested again)'
+    )
+    
+    parser.add_argument(
+        '--enrich-workers',
+        type=int,
+        default=8,
+        help='Concurrent detail requests for --enrich (default: 8)'
+    )
+    
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Only fetch videos published since the last run and merge them into the previous JSON export'
+    )
+    
+    parser.add_argument(
+        '--state-db',
+        help='Crawl state database for --incremental (default: <output>/crawl_state.db)'
+    )
+    
+    parser.add_argument(
+        '--delta',
+        choices=['ndjson', 'csv'],
+        help='Also write videos_<uid>.delta.<format> with only the videos inserted, updated or removed '
+             'since the previous run (an op column and the changed fields)'
+    )
+    
+    parser.add_argument(
+        '--delta-index',
+        help='Snapshot index for --delta (default: <output>/snapshot_index.db)'
+    )
+    
+    parser.add_argument(
+        '--timeseries',
+        metavar='DIR',
+        help='Append the counters of every crawled video to a time-series store in DIR, '
+             'for growth tracking across runs (requires numpy)'
+    )
+    
+    parser.add_argument(
+        '--schedule-db',
+        help='Track the --uid-file UIDs in an adaptive re-crawl schedule and only crawl the due ones; '
+             'active and popular UP masters come due sooner'
+    )
+    
+    parser.add_argument(
+        '--schedule-limit',
+        type=int,
+        help='Crawl at most this many due UIDs per round, most overdue first'
+    )
+    
+    parser.add_argument(
+        '--schedule-loop',
+        action='store_true',
+        help='Keep running, crawling UIDs as they come due (with --schedule-db)'
+    )
+    
+    parser.add_argument(
+        '--schedule-stats',
+        action='store_true',
+        help='Print the queue depth and staleness of --schedule-db and exit'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue an interrupted crawl from its last checkpointed page'
+    )
+    
+    parser.add_argument(
+        '--checkpoint-dir',
+        help='Directory for crawl checkpoints (default: <output>/.checkpoints)'
+    )
+    
+    parser.add_argument(
+        '--cache',
+        action='store_true',
+        help='Cache API responses on disk and reuse them while fresh'
+    )
+    
+    parser.add_argument(
+        '--cache-db',
+        help='Response cache database (default: <output>/http_cache.db)'
+    )
+    
+    parser.add_argument(
+        '--cache-ttl',
         type=float,
-        default=1.0,
-        help='Delay between API requests in seconds (default: 1.0)'
+        help='Override the time-to-live of cached responses, in seconds'
+    )
+    
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=100000,
+        help='Maximum number of cached responses (default: 100000)'
+    )
+    
+    parser.add_argument(
+        '--replay',
+        action='store_true',
+        help='Serve every request from the response cache without touching the network'
+    )
+    
+    parser.add_argument(
+        '--wbi-cache',
+        default=DEFAULT_KEY_FILE,
+        help=f'File for persisting WBI signing keys between runs (default: {DEFAULT_KEY_FILE})'
+    )
+    
+    parser.add_argument(
+        '--no-wbi-cache',
+        action='store_true',
+        help='Do not persist WBI signing keys'
+    )
+    
+    parser.add_argument(
+        '--fields',
+        help="Comma-separated video fields to build and export (bvid is always kept), e.g. "
+             "bvid,aid,play,created; 'raw' writes the unformatted API videos"
+    )
+    
+    parser.add_argument(
+        '--compact',
+        action='store_true',
+        help='Hold scraped videos in compact columnar tables (much less memory in large batches)'
+    )
+    
+    parser.add_argument(
+        '--api-base',
+        help='API host to query instead of https://api.bilibili.com (e.g. a local mock server)'
     )
     
     parser.add_argument(
         '--summary',
         action='store_true',
-        help='Generate a summary report in addition to data export'
+        help='Generate TXT and JSON summary reports in addition to data export '
+             '(batch mode also writes summary_all.json across all UIDs)'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Print a breakdown of where the time went and request latency histograms at the end'
+    )
+    
+    parser.add_argument(
+        '--metrics-file',
+        help='Write request and stage metrics in Prometheus text format to this file '
+             '(e.g. for the node exporter textfile collector)'
     )
     
     parser.add_argument(
@@ -70,52 +321,355 @@ Examples:
     
     args = parser.parse_args()
     
-    # Create output directory if it doesn't exist
-    os.makedirs(args.output, exist_ok=True)
+    if args.uid_file and args.use_async:
+        parser.error("--async cannot be combined with --uid-file")
+    _check_request_options(parser, args)
+    if (args.schedule_limit or args.schedule_loop or args.schedule_stats) and not args.schedule_db:
+        parser.error("--schedule-limit, --schedule-loop and --schedule-stats require --schedule-db")
+    if args.schedule_db and not args.uid_file:
+        parser.error("--schedule-db requires --uid-file")
+    if args.incremental and args.format not in ['json', 'both']:
+        parser.error("--incremental keeps its dataset in the JSON export; use --format json or both")
+    try:
+        args.fields = BilibiliScraper.resolve_fields(args.fields)
+    except ValueError as e:
+        parser.error(f"--fields: {e}")
+    if args.incremental and isinstance(args.fields, list) and 'created' not in args.fields:
+        parser.error("--incremental needs the created field; add it to --fields")
+    if args.stream and args.fields == BilibiliScraper.RAW_FIELDS and args.format not in ['ndjson', 'json']:
+        parser.error("--fields raw can only be streamed as ndjson or json (csv needs a fixed header)")
+    if args.stream:
+        if args.format not in ['csv', 'ndjson', 'json', 'parquet', 'feather']:
+            parser.error("--stream supports --format csv, ndjson, json, parquet or feather")
+        if args.output == '-' and args.format not in ['csv', 'ndjson', 'json']:
+            parser.error("only csv, ndjson and json can be streamed to stdout")
+        if args.uid_file or args.incremental or args.summary or args.resume or args.delta or args.timeseries:
+            parser.error("--stream cannot be combined with --uid-file, --incremental, --summary, --resume, "
+                         "--delta or --timeseries")
+    elif args.output == '-':
+        parser.error("--output - requires --stream")
+    if args.compress and args.format in ['parquet', 'feather', 'sqlite'] and not args.delta:
+        parser.error("--compress applies to json, ndjson and csv output (parquet and feather are compressed already)")
+    if args.enrich and args.format == 'sqlite':
+        parser.error("--enrich columns are not stored by --format sqlite; use json, csv, ndjson, parquet or feather")
+    try:
+        args.compression = Compression(args.compress, args.compress_level, args.compress_threads)
+    except ImportError as e:
+        parser.error(str(e))
+    
+    args.profiler = Profiler() if args.profile or args.metrics_file else None
+    args.retry_policy = None
+    args.snapshot_index = None
+    args.timeseries_store = None
+    
+    if args.output == '-':
+        # Rows go to stdout, so all diagnostics go to stderr
+        rows_out = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            try:
+                _run(args, rows_out)
+            finally:
+                _report_profile(args)
+    else:
+        # Create output directory if it doesn't exist
+        os.makedirs(args.output, exist_ok=True)
+        try:
+            _run(args)
+        finally:
+            _report_profile(args)
+
+
+def serve(argv=None):
+    """Run the scraper daemon (python main.py serve ...)"""
+    parser = argparse.ArgumentParser(
+        prog='main.py serve',
+        description="BillBillBug daemon - answer scrape requests from a warm scraper over HTTP",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Endpoints:
+  GET  /users/<uid>                        User information
+  GET  /users/<uid>/videos?page=1          One page of the raw video list
+  GET  /users/<uid>/scrape?max_videos=100  User information and formatted videos
+  POST /jobs {"uid": ..., "max_videos": ...}  Queue a scrape; poll GET /jobs/<id>
+  GET  /stats                              Cache and request counters
+
+Examples:
+  %(prog)s --port 8765 --rate 5
+  %(prog)s --unix-socket /run/billbillbug.sock
+  curl --unix-socket /run/billbillbug.sock http://localhost/users/123456
+        """
+    )
+    
+    parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='Interface to listen on (default: 127.0.0.1)'
+    )
+    
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8765,
+        help='TCP port to listen on (default: 8765)'
+    )
+    
+    parser.add_argument(
+        '--unix-socket',
+        help='Listen on this Unix socket instead of a TCP port'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=4,
+        help='Threads running queued scrape jobs (default: 4)'
+    )
+    
+    parser.add_argument(
+        '--ttl',
+        type=float,
+        default=60.0,
+        help='Seconds responses are served from memory (default: 60; 0 disables)'
+    )
     
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=4096,
+        help='Responses kept in memory (default: 4096)'
+    )
+    
+    _add_request_options(parser)
+    
+    parser.add_argument(
+        '--wbi-cache',
+        default=DEFAULT_KEY_FILE,
+        help=f'File for persisting WBI signing keys between runs (default: {DEFAULT_KEY_FILE})'
+    )
+    
+    parser.add_argument(
+        '--api-base',
+        help='API host to query instead of https://api.bilibili.com'
+    )
+    
+    parser.add_argument(
+        '--quiet',
+        action='store_true',
+        help='Do not log scraper progress'
+    )
+    
+    args = parser.parse_args(argv)
+    _check_request_options(parser, args)
+    
+    # Request handlers and job workers share one scraper and connection pool
+    pool_size = args.workers * 2
+    transport = HttpxTransport(pool_size=pool_size) if args.http2 else RequestsTransport(pool_size=pool_size)
+    scraper = BilibiliScraper(
+        delay=args.delay,
+        rate_limiter=_make_rate_limiter(args),
+        wbi_key_file=args.wbi_cache,
+        api_base=args.api_base,
+        retry=_make_retry_policy(args),
+        transport=transport,
+    )
+    service = ScraperService(scraper, cache_size=args.cache_size, ttl=args.ttl, workers=args.workers)
+    server = make_server(service, args.host, args.port, args.unix_socket)
+    
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull if args.quiet else sys.stdout):
+        service.warm_up()
+        # Refresh the keys before they expire, so no request waits on the nav call
+        scraper.signer.start_background_refresh()
+        address = args.unix_socket or f"http://{args.host}:{server.server_address[1]}"
+        print(f"BillBillBug serving on {address}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            scraper.signer.stop_background_refresh()
+            server.server_close()
+            service.close()
+            if args.unix_socket and os.path.exists(args.unix_socket):
+                os.remove(args.unix_socket)
+
+
+def _add_request_options(parser):
+    """Add the options controlling how requests are sent (shared with serve)"""
+    parser.add_argument(
+        '--delay',
+        type=float,
+        default=1.0,
+        help='Delay between API requests in seconds (default: 1.0)'
+    )
+    
+    parser.add_argument(
+        '--rate',
+        type=float,
+        help='Request budget in requests per second (overrides --delay)'
+    )
+    
+    parser.add_argument(
+        '--burst',
+        type=float,
+        default=1.0,
+        help='Number of requests allowed in a burst with --rate (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--rate-file',
+        help='Share the --rate budget with other processes through this state file'
+    )
+    
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=3,
+        help='Retries of a request that failed with a server error, timeout or throttling (default: 3)'
+    )
+    
+    parser.add_argument(
+        '--retry-backoff',
+        type=float,
+        default=0.5,
+        help='Base of the exponential backoff between retries in seconds (default: 0.5)'
+    )
+    
+    parser.add_argument(
+        '--breaker-threshold',
+        type=float,
+        default=0.5,
+        help='Pause all requests when this fraction of recent requests is throttled; 0 disables (default: 0.5)'
+    )
+    
+    parser.add_argument(
+        '--breaker-cooldown',
+        type=float,
+        default=30.0,
+        help='Seconds to pause all requests when the throttle threshold is crossed (default: 30)'
+    )
+    
+    parser.add_argument(
+        '--http2',
+        action='store_true',
+        help="Send requests over HTTP/2 with httpx, multiplexed on one connection (pip install 'httpx[http2]')"
+    )
+
+
+def _check_request_options(parser, args):
+    """Reject inconsistent request options"""
+    if args.rate_file and not args.rate:
+        parser.error("--rate-file requires --rate")
+    if args.http2 and httpx is None:
+        parser.error("--http2 requires httpx: pip install 'httpx[http2]'")
+    if args.retries < 0:
+        parser.error("--retries must not be negative")
+    if not 0 <= args.breaker_threshold <= 1:
+        parser.error("--breaker-threshold must be between 0 and 1")
+
+
+def _report_profile(args):
+    """Print the --profile report and write the --metrics-file"""
+    if not args.profiler:
+        return
+    if args.profile:
+        print()
+        print(args.profiler.report())
+    if args.metrics_file:
+        extra = {}
+        if args.retry_policy:
+            retries = args.retry_policy.stats()
+            extra = {
+                'retries_total': ('Retried request attempts', retries['retries']),
+                'gave_up_total': ('Requests that failed after the last attempt', retries['gave_up']),
+                'throttled_total': ('Attempts throttled by the API', retries['throttled']),
+                'breaker_trips_total': ('Times the circuit breaker paused all requests', retries['breaker_trips']),
+            }
+        path = args.profiler.write_prometheus(args.metrics_file, extra)
+        print(f"Metrics written to: {path}")
+
+
+def _run(args, rows_out=None):
+    """Scrape and export according to the parsed command line"""
     if not args.quiet:
         print("=== BillBillBug - Bilibili Video Scraper ===")
-        print(f"Target UID: {args.uid}")
+        if args.uid_file:
+            print(f"UID file: {args.uid_file}")
+            print(f"Workers: {args.workers}")
+        else:
+            print(f"Target UID: {args.uid}")
         print(f"Max videos: {args.max_videos if args.max_videos else 'All'}")
         print(f"Output format: {args.format}")
         print(f"Output directory: {args.output}")
-        print(f"Request delay: {args.delay}s")
+        if args.incremental:
+            print("Mode: incremental")
+        if args.delta:
+            print(f"Delta export: {args.delta}")
+        if args.replay:
+            print("Mode: offline replay from cache")
+        if args.rate:
+            print(f"Request rate: {args.rate} req/s (burst {args.burst:g})")
+        else:
+            print(f"Request delay: {args.delay}s")
+        if args.use_async:
+            print(f"Concurrency: {args.concurrency}")
         print("=" * 50)
     
-    # Initialize scraper
-    scraper = BilibiliScraper(delay=args.delay)
-    
     # Scrape data
     try:
-        data = scraper.scrape_up_master(args.uid, args.max_videos)
+        if args.schedule_stats:
+            with CrawlScheduler(args.schedule_db) as scheduler:
+                print(fastjson.dumps(scheduler.stats(), indent=2))
+            return
+        
+        if args.delta:
+            args.snapshot_index = SnapshotIndex(args.delta_index or os.path.join(args.output, 'snapshot_index.db'))
+        if args.timeseries:
+            args.timeseries_store = StatsStore(args.timeseries)
+        
+        if args.schedule_loop:
+            _run_schedule(args)
+            return
+        
+        if args.uid_file:
+            _run_batch(args)
+            return
+        
+        if args.stream:
+            _run_stream(args, rows_out)
+            return
+        
+        state = _open_state(args, [args.uid])
+        known_bvids = state.known_bvids(args.uid) if state else None
+        checkpoint = _checkpoint_store(args).open(args.uid)
+        
+        try:
+            if args.use_async:
+                data = asyncio.run(_scrape_async(args, known_bvids, checkpoint))
+            else:
+                scraper = BilibiliScraper(**_scraper_options(args))
+                data = scraper.scrape_up_master(args.uid, args.max_videos, known_bvids, checkpoint)
+                if args.enrich:
+                    data = VideoEnricher(scraper, args.enrich_workers).enrich(data)
+        finally:
+            checkpoint.close()
         
         if not data:
             print("Failed to scrape data. Please check the UID and try again.")
             sys.exit(1)
+        
+        if state:
+            data = _merge_incremental(data, args.uid, args)
             
         # Export data
-        exporter = DataExporter()
-        exported_files = []
+        exported_files = _export_data(_make_exporter(args), data, args.uid, args)
         
-        if args.format in ['json', 'both']:
-            json_file = os.path.join(args.output, f"videos_{args.uid}.json")
-            exporter.export_to_json(data, json_file)
-            exported_files.append(json_file)
+        if state:
+            _record_state(state, data, args.uid, args)
+            state.close()
+            print(f"New videos since last run: {data['new_videos']}")
         
-        if args.format in ['csv', 'both']:
-            csv_file = os.path.join(args.output, f"videos_{args.uid}.csv")
-            exporter.export_to_csv(data, csv_file)
-            exported_files.append(csv_file)
-            
-            # Also export user info
-            user_csv_file = os.path.join(args.output, f"user_{args.uid}.csv")
-            exporter.export_user_info_csv(data, user_csv_file)
-            exported_files.append(user_csv_file)
-        
-        if args.summary:
-            summary_file = os.path.join(args.output, f"summary_{args.uid}.txt")
-            exporter.export_summary_txt(data, summary_file)
-            exported_files.append(summary_file)
+        # The pages are in the export now
+        checkpoint.complete()
         
         if not args.quiet:
             print("\n=== Scraping Complete ===")
@@ -127,6 +681,14 @@ Examples:
         
     except KeyboardInterrupt:
         print("\nOperation cancelled by user.")
+        if not args.stream:
+            print("Fetched pages were checkpointed; run again with --resume to continue.")
+        sys.exit(1)
+    except IncompleteCrawlError as e:
+        # Nothing was exported, and the checkpoint keeps the pages before the failed one
+        print(f"Error occurred: {e}")
+        if not args.stream:
+            print("Fetched pages were checkpointed; run again with --resume to continue.")
         sys.exit(1)
     except Exception as e:
         print(f"Error occurred: {e}")
@@ -134,6 +696,413 @@ Examples:
             import traceback
             traceback.print_exc()
         sys.exit(1)
+    finally:
+        if args.snapshot_index:
+            args.snapshot_index.close()
+        if args.timeseries_store is not None:
+            args.timeseries_store.close()
+
+
+def _scraper_options(args):
+    """Collect the scraper constructor options selected on the command line"""
+    # Kept for the metrics report
+    args.retry_policy = _make_retry_policy(args)
+    return {
+        'delay': args.delay,
+        'rate_limiter': _make_rate_limiter(args),
+        'cache': _make_cache(args),
+        'wbi_key_file': None if args.no_wbi_cache else args.wbi_cache,
+        'api_base': args.api_base,
+        'compact': args.compact,
+        'retry': args.retry_policy,
+        'transport': _make_transport(args),
+        'hooks': Hooks([args.profiler]) if args.profiler else None,
+        'fields': args.fields,
+    }
+
+
+def _make_scraper(args):
+    """Build the scraper selected on the command line"""
+    return BilibiliScraper(**_scraper_options(args))
+
+
+def _close_scraper(scraper):
+    """Release the scraper's connections and its response cache"""
+    scraper.close()
+    if scraper.cache is not None:
+        scraper.cache.close()
+
+
+def _make_exporter(args):
+    """Build the exporter, reporting to the --profile profiler"""
+    return DataExporter(hooks=Hooks([args.profiler]) if args.profiler else None)
+
+
+def _make_transport(args):
+    """Build the HTTP transport, with a connection for every concurrent request"""
+    pool_size = max(args.workers if args.uid_file else 1, args.concurrency if args.use_async else 1)
+    if args.http2:
+        return HttpxTransport(pool_size=pool_size)
+    return RequestsTransport(pool_size=pool_size)
+
+
+def _make_retry_policy(args):
+    """Build the retry policy selected on the command line"""
+    breaker = None
+    if args.breaker_threshold:
+        breaker = CircuitBreaker(threshold=args.breaker_threshold, cooldown=args.breaker_cooldown)
+    return RetryPolicy(max_attempts=args.retries + 1, backoff=args.retry_backoff, breaker=breaker)
+
+
+def _checkpoint_store(args):
+    """Open the checkpoint directory selected on the command line"""
+    directory = args.checkpoint_dir or os.path.join(args.output, '.checkpoints')
+    return CheckpointStore(directory, resume=args.resume)
+
+
+def _make_cache(args):
+    """Open the response cache for --cache/--replay (None otherwise)"""
+    if not (args.cache or args.replay):
+        return None
+    ttls = dict.fromkeys(ResponseCache.DEFAULT_TTLS, args.cache_ttl) if args.cache_ttl is not None else None
+    return ResponseCache(
+        args.cache_db or os.path.join(args.output, 'http_cache.db'),
+        ttls=ttls,
+        default_ttl=args.cache_ttl if args.cache_ttl is not None else 3600,
+        max_entries=args.cache_size,
+        replay=args.replay
+    )
+
+
+def _make_rate_limiter(args):
+    """Build the rate limiter selected on the command line (None means use --delay)"""
+    if not args.rate:
+        return None
+    if args.rate_file:
+        return FileTokenBucket(args.rate_file, rate=args.rate, capacity=args.burst)
+    return TokenBucket(rate=args.rate, capacity=args.burst)
+
+
+def _open_state(args, uids):
+    """Open the crawl state for --incremental (None otherwise)"""
+    if not args.incremental:
+        return None
+    state = CrawlState(args.state_db or os.path.join(args.output, 'crawl_state.db'))
+    
+    # Without a previous export there is nothing to merge into, so crawl in full
+    for uid in uids:
+        if not os.path.exists(os.path.join(args.output, f"videos_{uid}.json{args.compression.suffix}")):
+            state.forget(uid)
+    return state
+
+
+def _merge_incremental(data, uid, args):
+    """Merge newly crawled videos into the previous JSON export for a UID"""
+    previous = load_previous_videos(os.path.join(args.output, f"videos_{uid}.json{args.compression.suffix}"))
+    videos = merge_videos(data.get('videos', []), previous)
+    return dict(
+        data,
+        videos=videos,
+        total_videos=len(videos),
+        new_videos=len(data.get('videos', [])),
+        scrape_time=data.get('scrape_time') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    )
+
+
+def _crawl_complete(data, args):
+    """Whether data holds every video of its UID, not just the first --max-videos"""
+    # A page that failed after all retries raises IncompleteCrawlError before any export
+    fetched = data.get('new_videos', len(data.get('videos', [])))
+    return not (args.max_videos and fetched >= args.max_videos)
+
+
+def _record_state(state, data, uid, args):
+    """Record the exported videos of a UID, unless the crawl stopped before the videos already known"""
+    if _crawl_complete(data, args):
+        state.record_videos(uid, data['videos'])
+    else:
+        # Recorded bvids end the next crawl, so the videos this one skipped would never be fetched
+        print(f"UID {uid}: stopped at --max-videos; crawl state unchanged, so later runs fetch the rest")
+
+
+def _export_fields(args):
+    """Columns of the exported videos for --fields (None keeps the fields of the rows)"""
+    if not isinstance(args.fields, list):
+        return None
+    return args.fields + (list(VideoEnricher.DETAIL_FIELDS) if args.enrich else [])
+
+
+def _export_data(exporter, data, uid, args):
+    """Export scraped data for one UID in the requested formats"""
+    exported_files = []
+    # Also projects the rows an incremental merge took from the previous export
+    fields = _export_fields(args)
+    
+    if args.format in ['json', 'both']:
+        json_file = os.path.join(args.output, f"videos_{uid}.json{args.compression.suffix}")
+        exporter.export_to_json(data, json_file, compact=args.json_compact, fields=fields,
+                                compression=args.compression)
+        exported_files.append(json_file)
+    
+    if args.format == 'ndjson':
+        ndjson_file = os.path.join(args.output, f"videos_{uid}.ndjson{args.compression.suffix}")
+        exporter.export_to_ndjson(data, ndjson_file, compact=args.json_compact, fields=fields,
+                                  compression=args.compression)
+        exported_files.append(ndjson_file)
+    
+    if args.format == 'parquet':
+        parquet_file = os.path.join(args.output, f"videos_{uid}.parquet")
+        if exporter.export_to_parquet(data, parquet_file, fields=fields):
+            exported_files.append(parquet_file)
+    
+    if args.format == 'feather':
+        feather_file = os.path.join(args.output, f"videos_{uid}.feather")
+        if exporter.export_to_feather(data, feather_file, fields=fields):
+            exported_files.append(feather_file)
+    
+    if args.format == 'sqlite':
+        # One database for every UID; repeated crawls update rows in place
+        db_file = os.path.join(args.output, "bilibili.db")
+        exporter.export_to_sqlite(data, db_file, fields=fields)
+        exported_files.append(db_file)
+    
+    if args.format in ['csv', 'both']:
+        csv_file = os.path.join(args.output, f"videos_{uid}.csv{args.compression.suffix}")
+        exporter.export_to_csv(data, csv_file, fields=fields, compression=args.compression)
+        exported_files.append(csv_file)
+        
+        # Also export user info
+        user_csv_file = os.path.join(args.output, f"user_{uid}.csv{args.compression.suffix}")
+        exporter.export_user_info_csv(data, user_csv_file, compression=args.compression)
+        exported_files.append(user_csv_file)
+    
+    if args.delta:
+        # Videos a capped crawl did not reach are unseen, not deleted
+        delta_file = os.path.join(args.output, f"videos_{uid}.delta.{args.delta}{args.compression.suffix}")
+        exporter.export_delta(data, delta_file, args.snapshot_index, complete=_crawl_complete(data, args),
+                              compact=args.json_compact, compression=args.compression)
+        exported_files.append(delta_file)
+    
+    if args.timeseries_store is not None:
+        # An incremental merge puts the freshly crawled videos first; the rest carry old counters
+        videos = data.get('videos', [])
+        if 'new_videos' in data:
+            videos = list(videos)[:data['new_videos']]
+        args.timeseries_store.append(videos)
+    
+    if args.summary:
+        summary_file = os.path.join(args.output, f"summary_{uid}.txt")
+        exporter.export_summary_txt(data, summary_file)
+        exported_files.append(summary_file)
+        
+        summary_json_file = os.path.join(args.output, f"summary_{uid}.json")
+        exporter.export_summary_json(data, summary_json_file)
+        exported_files.append(summary_json_file)
+    
+    return exported_files
+
+
+def _run_stream(args, rows_out=None):
+    """Scrape one UID and write each page of rows as soon as it arrives"""
+    scraper = BilibiliScraper(**_scraper_options(args))
+    user_info = scraper.get_user_info(args.uid)
+    if not user_info:
+        print("Failed to scrape data. Please check the UID and try again.")
+        sys.exit(1)
+    
+    if rows_out is not None:
+        target = rows_out
+    else:
+        target = os.path.join(args.output, f"videos_{args.uid}.{args.format}{args.compression.suffix}")
+    
+    fields = scraper.row_fields()
+    if fields is not None and args.enrich:
+        fields += list(VideoEnricher.DETAIL_FIELDS)
+    enricher = VideoEnricher(scraper, args.enrich_workers) if args.enrich else None
+    if args.format in ArrowSink.FORMATS:
+        sink = ArrowSink(target, fields, args.format)
+    elif args.format == 'json':
+        sink = JSONArraySink(target, fields, compact=args.json_compact, compression=args.compression)
+    elif args.format == 'ndjson':
+        sink = NDJSONSink(target, fields, compact=args.json_compact, compression=args.compression)
+    else:
+        sink = CSVSink(target, fields, compression=args.compression)
+    
+    with sink:
+        for videos in scraper.iter_video_pages(args.uid, args.max_videos):
+            rows = scraper.format_video_data(videos, user_info)
+            sink.write_many(enricher.enrich_rows(rows) if enricher else rows)
+            sink.flush()
+    
+    if not args.quiet:
+        print("\n=== Scraping Complete ===")
+        print(f"UP Master: {user_info.get('name', 'Unknown')}")
+        print(f"Total videos scraped: {sink.count}")
+        if rows_out is None:
+            print(f"File created: {target}")
+
+
+def _run_batch(args, scraper=None):
+    """
+    Scrape every UID listed in --uid-file on a worker pool
+    
+    Args:
+        args: Parsed command line
+        scraper: Scraper shared across --schedule-loop rounds (default: one
+            built and closed for this batch)
+    """
+    if args.uid_file == '-':
+        uids = read_uids(sys.stdin)
+    else:
+        with open(args.uid_file, 'r', encoding='utf-8') as f:
+            uids = read_uids(f)
+    
+    if not uids:
+        print("No UIDs to scrape.")
+        if args.schedule_loop:
+            # UIDs may still be added to the file before the next round
+            return
+        sys.exit(1)
+    
+    if scraper is not None:
+        _scrape_batch(args, uids, scraper)
+        return
+    scraper = _make_scraper(args)
+    try:
+        _scrape_batch(args, uids, scraper)
+    finally:
+        _close_scraper(scraper)
+
+
+def _scrape_batch(args, uids, scraper):
+    """Scrape, export and report one batch of UIDs with the given scraper"""
+    scheduler = None
+    if args.schedule_db:
+        scheduler = CrawlScheduler(args.schedule_db)
+        added = scheduler.add(uids)
+        uids = scheduler.due(args.schedule_limit)
+        print(f"Schedule: {len(uids)} of {len(scheduler)} tracked UIDs due ({added} new)")
+        if not uids:
+            scheduler.close()
+            return
+    
+    exporter = _make_exporter(args)
+    state = _open_state(args, uids)
+    # Statistics across every UID in the batch, fed as results arrive
+    summary_stats = VideoStats() if args.summary else None
+    
+    def export_result(result):
+        # Export each UID as soon as it finishes; one bad UID must not stop the batch
+        data = result['data']
+        if data:
+            try:
+                if enricher:
+                    data = enricher.enrich(data)
+                if state:
+                    data = _merge_incremental(data, result['uid'], args)
+                _export_data(exporter, data, result['uid'], args)
+                if state:
+                    _record_state(state, data, result['uid'], args)
+                if summary_stats is not None:
+                    summary_stats.add_many(data['videos'])
+                checkpoints.discard(result['uid'])
+            except Exception as e:
+                # Merging, enrichment and the time-series append run here too
+                result['status'] = 'error'
+                result['error'] = f"Export failed: {type(e).__name__}: {e}"
+        if scheduler:
+            try:
+                scheduler.record(result['uid'], data if result['status'] != 'error' else None)
+            except Exception as e:
+                # e.g. a malformed 'created' date; the UID is rescheduled as a failed crawl
+                result['status'] = 'error'
+                result['error'] = f"Scheduling failed: {type(e).__name__}: {e}"
+                scheduler.record(result['uid'], None)
+        print(f"[{result['status']}] UID {result['uid']} ({result['elapsed']:.2f}s) {result['error']}")
+    
+    checkpoints = _checkpoint_store(args)
+    batch = BatchScraper(scraper, workers=args.workers, state=state, checkpoints=checkpoints)
+    # Details are remembered across UIDs, so collaboration videos are fetched once
+    enricher = VideoEnricher(scraper, args.enrich_workers) if args.enrich else None
+    report = batch.run(uids, args.max_videos, on_result=export_result)
+    if enricher:
+        report['stats']['enrichment'] = enricher.stats()
+    if state:
+        state.close()
+    
+    schedule_stats = None
+    if scheduler:
+        schedule_stats = scheduler.stats()
+        scheduler.close()
+    
+    # Keep a per-UID status report next to the exported data
+    report_file = os.path.join(args.output, "batch_report.json")
+    exporter.export_to_json({
+        'stats': report['stats'],
+        **({'schedule': schedule_stats} if schedule_stats else {}),
+        'results': [
+            {k: v for k, v in result.items() if k != 'data'}
+            for result in report['results']
+        ]
+    }, report_file)
+    
+    if summary_stats is not None:
+        exporter.export_to_json({
+            'uids': len(uids),
+            'statistics': summary_stats.result(),
+        }, os.path.join(args.output, "summary_all.json"))
+    
+    stats = report['stats']
+    if not args.quiet:
+        print("\n=== Batch Complete ===")
+        print(f"UIDs: {stats['total_uids']} ({stats['succeeded']} succeeded, {stats['failed']} failed)")
+        print(f"Elapsed: {stats['elapsed']:.2f}s")
+        print(f"Throughput: {stats['uids_per_min']} UIDs/min, {stats['requests_per_sec']} requests/s")
+        print(f"Transferred: {stats['bytes_received'] / 1048576:.2f} MB over {stats['connections']} connections")
+        if stats['retries'] or stats['gave_up']:
+            print(f"Retries: {stats['retries']} ({stats['retry_wasted_seconds']:.2f}s lost, "
+                  f"{stats['gave_up']} requests gave up, {stats['breaker_trips']} breaker trips)")
+        if 'enrichment' in stats:
+            enrichment = stats['enrichment']
+            print(f"Video details: {enrichment['fetched']} fetched, {enrichment['reused']} reused, "
+                  f"{enrichment['failed']} failed")
+        if schedule_stats:
+            print(f"Schedule: {schedule_stats['tracked']} tracked, {schedule_stats['due']} still due, "
+                  f"mean staleness {schedule_stats['staleness_seconds']['mean'] / 3600:.1f}h")
+        print(f"Report: {report_file}")
+        if any(result['error'].startswith(IncompleteCrawlError.__name__) for result in report['results']):
+            print("Pages of incomplete crawls were checkpointed; run again with --resume to continue.")
+    
+    if stats['failed'] and not args.schedule_loop:
+        sys.exit(1)
+
+
+def _run_schedule(args):
+    """Crawl due UIDs in rounds, sleeping until the next one comes due"""
+    # One scraper for every round: its connections, cache, WBI keys and
+    # rate limiter (and with it the requests-per-second budget) carry over
+    scraper = _make_scraper(args)
+    try:
+        while True:
+            # The UID file is re-read every round, so UIDs added to it get tracked
+            _run_batch(args, scraper)
+            with CrawlScheduler(args.schedule_db) as scheduler:
+                next_due = scheduler.next_due()
+            wait = min(300.0, max(1.0, next_due - time.time())) if next_due is not None else 300.0
+            if not args.quiet:
+                print(f"Next round in {wait:.0f}s")
+            time.sleep(wait)
+    finally:
+        _close_scraper(scraper)
+
+
+async def _scrape_async(args, known_bvids=None, checkpoint=None):
+    """Run a scrape with the asyncio engine"""
+    async with AsyncBilibiliScraper(concurrency=args.concurrency, **_scraper_options(args)) as scraper:
+        data = await scraper.scrape_up_master(args.uid, args.max_videos, known_bvids, checkpoint)
+        if args.enrich:
+            data = await scraper._run(VideoEnricher(scraper, args.enrich_workers).enrich, data)
+        return data
 
 
 if __name__ == '__main__':
@@ -0,0 +1,196 @@
+"""
+Columnar Parquet and Arrow IPC (Feather) export for BillBillBug
+
+Requires the optional pyarrow dependency (pip install pyarrow).
+"""
+
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional
+    pa = None
+    pq = None
+
+
+# Column types of a formatted video row; anything not listed is stored as a string
+INT_FIELDS = ('aid', 'mid', 'play', 'video_review', 'favorites', 'up_level', 'up_fans',
+              'like', 'coin', 'share', 'reply', 'danmaku')
+TIMESTAMP_FIELDS = ('created',)
+DICTIONARY_FIELDS = ('author', 'up_name', 'up_face', 'up_sign')
+
+
+def _require_pyarrow():
+    """Raise a helpful error when pyarrow is not installed"""
+    if pa is None:
+        raise ImportError("Parquet/Feather export requires pyarrow: pip install pyarrow")
+
+
+def video_schema(fields: List[str]) -> 'pa.Schema':
+    """
+    Build the typed Arrow schema for formatted video rows
+
+    Counters and ids are int64, `created` is a second-resolution timestamp
+    and the per-UP columns repeated on every row are dictionary-encoded.
+
+    Args:
+        fields: Column names, in output order
+
+    Returns:
+        pyarrow Schema
+    """
+    _require_pyarrow()
+    types = []
+    for field in fields:
+        if field in INT_FIELDS:
+            types.append(pa.field(field, pa.int64()))
+        elif field in TIMESTAMP_FIELDS:
+            types.append(pa.field(field, pa.timestamp('s')))
+        elif field in DICTIONARY_FIELDS:
+            types.append(pa.field(field, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            types.append(pa.field(field, pa.string()))
+    return pa.schema(types)
+
+
+def _to_int(value) -> Optional[int]:
+    """Convert a counter to int; placeholders such as '--' become null"""
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_timestamp(value) -> Optional[datetime]:
+    """Convert a formatted 'created' string (or raw epoch seconds) to a datetime"""
+    if not value:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
+
+def _to_str(value) -> Optional[str]:
+    """Convert a value to string, keeping missing values null"""
+    return None if value is None else str(value)
+
+
+class ArrowSink:
+    """
+    Write video rows to a Parquet or Arrow IPC (Feather v2) file in batches
+
+    Rows are buffered column by column and flushed as one record batch
+    every `batch_size` rows, so arbitrarily long row streams are written
+    in bounded memory. Dictionary columns keep one growing dictionary for
+    the whole file, so later batches only add dictionary deltas.
+    """
+
+    FORMATS = ('parquet', 'feather')
+
+    def __init__(self, filename: str, fields: List[str], file_format: str = 'parquet',
+                 compression: str = 'zstd', batch_size: int = 65536):
+        """
+        Open the output file
+
+        Args:
+            filename: Output file
+            fields: Column names (see BilibiliScraper.video_fields())
+            file_format: 'parquet' or 'feather'
+            compression: Codec name ('zstd', 'lz4', 'snappy', ... or None)
+            batch_size: Rows per record batch
+        """
+        _require_pyarrow()
+        if file_format not in self.FORMATS:
+            raise ValueError(f"Unsupported format: {file_format}")
+
+        self.filename = filename
+        self.fields = list(fields)
+        self.schema = video_schema(self.fields)
+        self.batch_size = batch_size
+        self.count = 0
+        self._columns = {field: [] for field in self.fields}
+        self._dictionaries = {field: {} for field in self.fields if field in DICTIONARY_FIELDS}
+        self._converters = [
+            (field, _to_int if field in INT_FIELDS else _to_timestamp if field in TIMESTAMP_FIELDS else _to_str)
+            for field in self.fields
+        ]
+
+        os.makedirs(os.path.dirname(filename) if os.path.dirname(filename) else '.', exist_ok=True)
+        if file_format == 'parquet':
+            self._writer = pq.ParquetWriter(filename, self.schema, compression=compression)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=compression, emit_dictionary_deltas=True)
+            self._writer = pa.ipc.new_file(filename, self.schema, options=options)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, row: Dict):
+        """Buffer one row, flushing a record batch when the buffer is full"""
+        for field, convert in self._converters:
+            value = convert(row.get(field))
+            if field in self._dictionaries and value is not None:
+                value = self._dictionaries[field].setdefault(value, len(self._dictionaries[field]))
+            self._columns[field].append(value)
+        self.count += 1
+        if len(self._columns[self.fields[0]]) >= self.batch_size:
+            self._write_batch()
+
+    def write_many(self, rows: Iterable[Dict]) -> int:
+        """
+        Write rows from any iterable, e.g. one page of a streaming crawl
+
+        Args:
+            rows: Row dictionaries
+
+        Returns:
+            Number of rows written
+        """
+        written = 0
+        for row in rows:
+            self.write(row)
+            written += 1
+        return written
+
+    def flush(self):
+        """
+        Does nothing; buffered rows are written once a record batch is full
+
+        Callers flush after every page of a streaming crawl, but a batch
+        per page would split a Parquet file into tiny row groups (each
+        storing its own copy of the dictionaries). Neither format can be
+        read before close() writes its footer anyway.
+        """
+
+    def _write_batch(self):
+        """Write buffered rows as one record batch"""
+        if not self.fields or not self._columns[self.fields[0]]:
+            return
+        arrays = []
+        for field in self.fields:
+            if field in self._dictionaries:
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(self._columns[field], type=pa.int32()),
+                    pa.array(list(self._dictionaries[field]), type=pa.string())
+                ))
+            else:
+                arrays.append(pa.array(self._columns[field], type=self.schema.field(field).type))
+        batch = pa.record_batch(arrays, schema=self.schema)
+        self._writer.write_batch(batch)
+        self._columns = {field: [] for field in self.fields}
+
+    def close(self):
+        """Flush remaining rows and finish the file"""
+        if self._writer is None:
+            return
+        self._write_batch()
+        self._writer.close()
+        self._writer = None
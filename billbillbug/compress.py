@@ -0,0 +1,148 @@
+"""
+Compressed output files for BillBillBug
+
+Files whose name ends in .gz or .zst are compressed on the fly while
+they are written, so the uncompressed bytes never reach the disk. gzip
+comes from the standard library; zstd requires the optional zstandard
+dependency (pip install zstandard), which can also compress on several
+threads for large outputs.
+"""
+
+import gzip
+import io
+import os
+import sys
+from typing import Optional, TextIO, Union
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional
+    zstandard = None
+
+
+# Codec -> file name suffix
+SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+DEFAULT_LEVELS = {'gzip': 6, 'zstd': 3}
+
+
+def _require_zstandard():
+    """Raise a helpful error when zstandard is not installed"""
+    if zstandard is None:
+        raise ImportError("zstd compression requires zstandard: pip install zstandard")
+
+
+def codec_for(filename: str) -> Optional[str]:
+    """Compression codec selected by a file name's suffix (None for plain files)"""
+    for codec, suffix in SUFFIXES.items():
+        if filename.endswith(suffix):
+            return codec
+    return None
+
+
+def open_text(target: Union[str, TextIO], codec: Optional[str] = None, level: Optional[int] = None,
+              threads: int = 0, newline: Optional[str] = None) -> TextIO:
+    """
+    Open a text file for writing, compressing it if its name asks for it
+
+    Args:
+        target: File path, '-' for stdout, or an open text stream (e.g. stdout)
+            whose binary buffer receives the compressed bytes
+        codec: 'gzip' or 'zstd' (default: chosen by the suffix of target;
+            required to compress stdout and streams)
+        level: Compression level (default: DEFAULT_LEVELS)
+        threads: zstd worker threads (0 compresses on the calling thread,
+            -1 uses one thread per CPU); ignored for gzip
+        newline: As for open()
+
+    Returns:
+        Writable text file; closing it finishes the compressed stream
+        (stdout and streams are left open)
+    """
+    stream = None  # Binary stream owned by the caller
+    if target == '-':
+        stream = sys.stdout.buffer
+    elif not isinstance(target, str):
+        target.flush()
+        stream = target.buffer
+    codec = codec or (codec_for(target) if stream is None else None)
+    if codec is None:
+        if stream is not None:
+            raise ValueError("Streams are only opened to be compressed")
+        os.makedirs(os.path.dirname(target) if os.path.dirname(target) else '.', exist_ok=True)
+        return open(target, 'w', newline=newline, encoding='utf-8')
+
+    level = DEFAULT_LEVELS[codec] if level is None else level
+    if stream is None:
+        os.makedirs(os.path.dirname(target) if os.path.dirname(target) else '.', exist_ok=True)
+    if codec == 'gzip':
+        # GzipFile leaves a file object it was given open, so the stream survives close()
+        binary = (gzip.open(target, 'wb', compresslevel=level) if stream is None
+                  else gzip.GzipFile(fileobj=stream, mode='wb', compresslevel=level))
+    else:
+        _require_zstandard()
+        compressor = zstandard.ZstdCompressor(level=level, threads=threads)
+        binary = compressor.stream_writer(open(target, 'wb') if stream is None else stream,
+                                          closefd=stream is None)
+    return io.TextIOWrapper(binary, encoding='utf-8', newline=newline)
+
+
+class Compression:
+    """
+    Compression settings for output files
+
+    The codec of a file is chosen by its name (.gz or .zst); the settings
+    supply the level and zstd threads, and the codec for stdout, which
+    has no name.
+    """
+
+    def __init__(self, codec: Optional[str] = None, level: Optional[int] = None, threads: int = 0):
+        """
+        Initialize the settings
+
+        Args:
+            codec: 'gzip', 'zstd' or None (no compression)
+            level: Compression level (default: DEFAULT_LEVELS)
+            threads: zstd worker threads (0 compresses on the writing thread,
+                -1 uses one thread per CPU)
+        """
+        if codec is not None and codec not in SUFFIXES:
+            raise ValueError(f"Unknown compression codec: {codec}")
+        if codec == 'zstd':
+            _require_zstandard()
+        self.codec = codec
+        self.level = level
+        self.threads = threads
+
+    def __bool__(self) -> bool:
+        return self.codec is not None
+
+    @property
+    def suffix(self) -> str:
+        """File name suffix of the codec ('' without compression)"""
+        return SUFFIXES.get(self.codec, '')
+
+    def open(self, target: Union[str, TextIO], newline: Optional[str] = None) -> TextIO:
+        """
+        Open a text file for writing (see open_text)
+
+        Args:
+            target: File path, or '-' or an open text stream (compressed with
+                this codec)
+            newline: As for open()
+        """
+        codec = codec_for(target) if isinstance(target, str) and target != '-' else self.codec
+        # A level is only meaningful for the codec it was chosen for
+        level = self.level if codec == self.codec else None
+        return open_text(target, codec, level, self.threads, newline)
+
+
+def read_bytes(filename: str) -> bytes:
+    """Read a whole file, decompressing it if its name ends in .gz or .zst"""
+    codec = codec_for(filename)
+    with open(filename, 'rb') as f:
+        if codec == 'gzip':
+            return gzip.decompress(f.read())
+        if codec == 'zstd':
+            _require_zstandard()
+            return zstandard.ZstdDecompressor().stream_reader(f).read()
+        return f.read()
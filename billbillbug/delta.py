@@ -0,0 +1,170 @@
+"""
+Delta exports for BillBillBug
+
+A full export rewrites every video of a UID on each run, although only a
+few counters usually change. SnapshotIndex keeps a compact SQLite index
+of the last exported snapshot - one 4-byte checksum per field of every
+video, keyed by UID and bvid - so a new crawl can be compared with it
+without reading the previous export, and only the inserted, updated and
+removed videos are written out.
+"""
+
+import os
+import sqlite3
+import threading
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from .table import VideoTable
+
+
+class SnapshotIndex:
+    """
+    Per-field checksums of the last exported snapshot of every UID
+
+    diff() compares a crawl with the index and returns change rows: the
+    video with an 'op' column ('insert', 'update' or 'delete') and a
+    'changed' column listing the fields that differ (empty for inserts and
+    deletes). The index only moves to the new snapshot on commit(), so a
+    failed export is diffed again on the next run.
+    """
+
+    # Columns added in front of the video fields of a change row
+    DELTA_FIELDS = ['op', 'changed']
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the index database
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) if os.path.dirname(path) else '.', exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, tuple] = {}  # uid -> (fields, {bvid: digest}) awaiting commit
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                mid TEXT PRIMARY KEY,
+                fields TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS snapshot_rows (
+                mid TEXT NOT NULL,
+                bvid TEXT NOT NULL,
+                digest BLOB NOT NULL,
+                PRIMARY KEY (mid, bvid)
+            ) WITHOUT ROWID;
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the database (uncommitted diffs are dropped)"""
+        self._conn.close()
+
+    @staticmethod
+    def digest(video: Dict, fields: List[str]) -> bytes:
+        """Checksum of every field of a video, in field order"""
+        return array('I', [zlib.crc32(repr(video.get(field)).encode('utf-8')) for field in fields]).tobytes()
+
+    def _load(self, uid: str):
+        """Field order and per-video digests of the stored snapshot of a UID"""
+        row = self._conn.execute('SELECT fields FROM snapshots WHERE mid = ?', (uid,)).fetchone()
+        if row is None:
+            return [], {}
+        rows = self._conn.execute('SELECT bvid, digest FROM snapshot_rows WHERE mid = ?', (uid,))
+        return row[0].split(','), dict(rows)
+
+    def diff(self, uid: str, videos: Iterable[Dict], complete: bool = True) -> List[Dict]:
+        """
+        Compare a crawl of a UID with its stored snapshot
+
+        Args:
+            uid: UP master's UID
+            videos: Formatted video rows (or a VideoTable)
+            complete: Whether the crawl covers every video of the UID; videos
+                missing from a partial crawl (--max-videos) are not deletions
+
+        Returns:
+            Change rows in crawl order, followed by the deletions
+        """
+        uid = str(uid)
+        videos = videos.to_dicts() if isinstance(videos, VideoTable) else list(videos)
+        fields = list(dict.fromkeys(field for video in videos[:1] for field in video))
+        with self._lock:
+            old_fields, old = self._load(uid)
+        fields = fields or old_fields
+
+        # (field, position in the new digests, position in the stored digests)
+        shared = [(field, i, old_fields.index(field)) for i, field in enumerate(fields) if field in old_fields]
+        added = [field for field in fields if field not in old_fields]
+        changes = []
+        digests = {}
+        for video in videos:
+            bvid = video.get('bvid')
+            if not bvid or bvid in digests:
+                continue
+            digests[bvid] = self.digest(video, fields)
+            previous = old.get(bvid)
+            if previous is None:
+                changes.append({'op': 'insert', 'changed': [], **video})
+                continue
+            current = array('I', digests[bvid])
+            stored = array('I', previous)
+            changed = [field for field, i, j in shared if current[i] != stored[j]] + added
+            if changed:
+                changes.append({'op': 'update', 'changed': changed, **video})
+
+        if complete:
+            mid = int(uid) if uid.isdigit() else uid
+            changes.extend({'op': 'delete', 'changed': [], 'bvid': bvid, 'mid': mid}
+                           for bvid in old if bvid not in digests)
+        else:
+            # Keep the videos the partial crawl did not reach
+            old_positions = [old_fields.index(field) if field in old_fields else None for field in fields]
+            for bvid, previous in old.items():
+                if bvid not in digests:
+                    stored = array('I', previous)
+                    digests[bvid] = array('I', [stored[i] if i is not None else 0
+                                                for i in old_positions]).tobytes()
+
+        with self._lock:
+            self._pending[uid] = (fields, digests)
+        return changes
+
+    def commit(self, uid: str):
+        """Make the snapshot of the last diff() of a UID the stored one"""
+        uid = str(uid)
+        with self._lock, self._conn:
+            pending = self._pending.pop(uid, None)
+            if pending is None:
+                return
+            fields, digests = pending
+            self._conn.execute('DELETE FROM snapshot_rows WHERE mid = ?', (uid,))
+            self._conn.executemany('INSERT INTO snapshot_rows (mid, bvid, digest) VALUES (?, ?, ?)',
+                                   ((uid, bvid, digest) for bvid, digest in digests.items()))
+            self._conn.execute('INSERT OR REPLACE INTO snapshots (mid, fields) VALUES (?, ?)',
+                               (uid, ','.join(fields)))
+
+    def forget(self, uid: str):
+        """Drop the stored snapshot of a UID, so its next export is all inserts"""
+        uid = str(uid)
+        with self._lock, self._conn:
+            self._pending.pop(uid, None)
+            self._conn.execute('DELETE FROM snapshot_rows WHERE mid = ?', (uid,))
+            self._conn.execute('DELETE FROM snapshots WHERE mid = ?', (uid,))
+
+    def count(self, uid: Optional[str] = None) -> int:
+        """Number of indexed videos (of one UID, or in total)"""
+        with self._lock:
+            if uid is None:
+                return self._conn.execute('SELECT COUNT(*) FROM snapshot_rows').fetchone()[0]
+            return self._conn.execute('SELECT COUNT(*) FROM snapshot_rows WHERE mid = ?',
+                                      (str(uid),)).fetchone()[0]
@@ -0,0 +1,129 @@
+"""
+Per-video detail enrichment for BillBillBug
+
+The space listing has no likes, coins, shares or tags; those come from
+the video detail endpoint, one request per video. VideoEnricher fetches
+them on a thread pool through the scraper, so the requests share its
+rate limiter, retry policy and response cache (a detail cached with
+--cache is reused while fresh), and merges them into formatted rows.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+
+from .scraper import BilibiliScraper
+from .table import VideoTable
+
+
+class VideoEnricher:
+    """
+    Add detail columns to formatted video rows
+
+    Details are remembered for the lifetime of the enricher, so a video
+    appearing under several UP masters (collaborations) is fetched once
+    per batch.
+    """
+
+    # Columns added to every row (None when the detail request failed)
+    DETAIL_FIELDS = ('like', 'coin', 'share', 'reply', 'danmaku', 'tags')
+
+    def __init__(self, scraper: BilibiliScraper, workers: int = 8):
+        """
+        Initialize the enricher
+
+        Args:
+            scraper: Scraper sending the detail requests
+            workers: Concurrent detail requests (the scraper's rate limiter
+                still bounds the request rate)
+        """
+        self.scraper = scraper
+        self.workers = max(1, workers)
+        self.fetched = 0
+        self.failed = 0
+        self.reused = 0  # Rows whose detail was already known
+        self._details: Dict[str, Dict] = {}  # bvid -> detail columns
+        self._lock = threading.Lock()
+
+        if self.scraper.transport.pool_size < self.workers:
+            self.scraper.transport.set_pool_size(self.workers)
+
+    @classmethod
+    def extract(cls, detail: Dict) -> Dict:
+        """
+        Pick the detail columns out of a get_video_detail response
+
+        Args:
+            detail: Response data from BilibiliScraper.get_video_detail
+
+        Returns:
+            Dictionary with a value (or None) for every DETAIL_FIELDS column
+        """
+        if not detail:
+            return dict.fromkeys(cls.DETAIL_FIELDS)
+        stat = (detail.get('View') or {}).get('stat') or {}
+        columns = {field: stat.get(field) for field in cls.DETAIL_FIELDS if field != 'tags'}
+        columns['tags'] = ','.join(tag.get('tag_name', '') for tag in detail.get('Tags') or [])
+        return columns
+
+    def fetch(self, bvids: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Fetch the details of the given videos that are not known yet
+
+        Args:
+            bvids: Video BV ids (duplicates are fetched once)
+
+        Returns:
+            Detail columns of every requested bvid
+        """
+        bvids = list(dict.fromkeys(bvid for bvid in bvids if bvid))
+        with self._lock:
+            missing = [bvid for bvid in bvids if bvid not in self._details]
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(missing)),
+                                    thread_name_prefix='billbillbug-detail') as pool:
+                details = list(pool.map(self.scraper.get_video_detail, missing))
+            with self._lock:
+                for bvid, detail in zip(missing, details):
+                    if detail:
+                        self._details[bvid] = self.extract(detail)
+                        self.fetched += 1
+                    else:
+                        self.failed += 1  # Not remembered, so a later call retries it
+
+        with self._lock:
+            return {bvid: self._details.get(bvid) or self.extract({}) for bvid in bvids}
+
+    def enrich_rows(self, videos: Iterable[Dict]) -> List[Dict]:
+        """
+        Return copies of formatted rows with the detail columns added
+
+        Args:
+            videos: Rows from format_video_data (or a VideoTable)
+        """
+        videos = videos.to_dicts() if isinstance(videos, VideoTable) else list(videos)
+        with self._lock:
+            self.reused += sum(1 for video in videos if video.get('bvid') in self._details)
+        details = self.fetch(video.get('bvid') for video in videos)
+        return [dict(video, **details.get(video.get('bvid')) or self.extract({})) for video in videos]
+
+    def enrich(self, data: Dict) -> Dict:
+        """
+        Add the detail columns to the videos of a scrape_up_master result
+
+        Args:
+            data: Data dictionary from scrape_up_master
+
+        Returns:
+            A copy of data whose videos carry the DETAIL_FIELDS columns
+        """
+        if not data or not data.get('videos'):
+            return data
+        return dict(data, videos=self.enrich_rows(data['videos']))
+
+    def stats(self) -> Dict:
+        """Counts of fetched, failed and reused details"""
+        with self._lock:
+            return {'fetched': self.fetched, 'failed': self.failed, 'reused': self.reused,
+                    'known': len(self._details)}
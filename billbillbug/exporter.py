@@ -2,28 +2,129 @@
 Data export functionality for BillBillBug
 """
 
-import json
 import csv
+import functools
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from . import fastjson
+from .analytics import analyze
+from .sinks import CSVSink, JSONArraySink, NDJSONSink
+from .columnar import ArrowSink
+from .compress import Compression
+from .delta import SnapshotIndex
+from .instrumentation import Hooks
+from .storage import SQLiteExporter
+from .table import VideoTable
+
+
+def _json_default(value):
+    """Serialize VideoTable videos as a list of rows"""
+    if isinstance(value, VideoTable):
+        return value.to_dicts()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _write_json(f, data, compact: bool = False, fields: Optional[List[str]] = None):
+    """
+    Write data like json.dump(data, f, ensure_ascii=False, indent=2, default=_json_default)
+    (or with compact separators), streaming the lists of a top-level dictionary
+    element by element so a video list is never encoded as one huge string;
+    fields, if given, projects the rows of the 'videos' list
+    """
+    indent = None if compact else 2
+    if not isinstance(data, dict) or not data or not all(isinstance(key, str) for key in data):
+        f.write(fastjson.dumps(data, indent=indent, default=_json_default))
+        return
+    
+    f.write('{')
+    for i, (key, value) in enumerate(data.items()):
+        separator = ',' if i else ''
+        if compact:
+            f.write(f"{separator}{fastjson.dumps(key)}:")
+        else:
+            f.write(f"{separator}\n  {fastjson.dumps(key)}: ")
+        
+        if isinstance(value, (list, VideoTable)) and len(value):
+            with JSONArraySink(f, fields if key == 'videos' else None, compact=compact, level=1) as sink:
+                sink.write_many(value)
+        elif compact:
+            f.write(fastjson.dumps(value, default=_json_default))
+        else:
+            f.write(fastjson.dumps(value, indent=2, default=_json_default).replace('\n', '\n  '))
+    f.write('}' if compact else '\n}')
+
+
+class _timed:
+    """
+    Export method that can be called on the class or on an instance
+
+    Called through a DataExporter instance, the time spent is reported
+    to the instance's hooks as an 'export' stage; called on the class it
+    behaves like a plain static method.
+    """
+    
+    def __init__(self, method):
+        self._method = method
+        functools.update_wrapper(self, method)
+    
+    def __get__(self, instance, owner=None):
+        method = self._method
+        if instance is None:
+            return method
+        
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            with instance.hooks.stage('export', method=method.__name__):
+                return method(*args, **kwargs)
+        return timed
+
 
 class DataExporter:
-    """Export scraped data to various formats"""
+    """
+    Export scraped data to various formats
+    
+    Every method takes the data dictionary from scrape_up_master; its
+    videos may be a list of dicts or a VideoTable, and a bare VideoTable
+    is accepted in place of the dictionary. Text files named *.gz or
+    *.zst are compressed while they are written.
+    """
+    
+    def __init__(self, hooks: Optional[Hooks] = None):
+        """
+        Initialize the exporter
+        
+        Args:
+            hooks: Optional Hooks notified of the time spent in each export
+                made through this instance (see instrumentation)
+        """
+        self.hooks = hooks or Hooks()
     
     @staticmethod
-    def export_to_json(data: Dict[str, Any], filename: str = None) -> str:
+    def _dataset(data) -> Dict[str, Any]:
+        """Wrap a bare VideoTable in a data dictionary"""
+        if isinstance(data, VideoTable):
+            return {'user_info': data.user_info, 'videos': data, 'total_videos': len(data)}
+        return data
+    
+    @_timed
+    def export_to_json(data: Dict[str, Any], filename: str = None, compact: bool = False,
+                       fields: Optional[List[str]] = None, compression: Optional[Compression] = None) -> str:
         """
         Export data to JSON format
         
         Args:
             data: Data dictionary to export
             filename: Output filename (auto-generated if None)
+            compact: Write without indentation or spaces after separators
+            fields: Fields of the videos to write (default: every field of each row)
+            compression: Level and zstd threads for a .gz or .zst filename (default: codec defaults)
             
         Returns:
             Path to the created file
         """
+        data = DataExporter._dataset(data)
         if filename is None:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             uid = data.get('user_info', {}).get('mid', 'unknown')
@@ -32,24 +133,28 @@ class DataExporter:
         # Ensure the directory exists
         os.makedirs(os.path.dirname(filename) if os.path.dirname(filename) else '.', exist_ok=True)
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with (compression or Compression()).open(filename) as f:
+            _write_json(f, data, compact, fields)
             
         print(f"Data exported to JSON: {filename}")
         return filename
     
-    @staticmethod
-    def export_to_csv(data: Dict[str, Any], filename: str = None) -> str:
+    @_timed
+    def export_to_csv(data: Dict[str, Any], filename: str = None, fields: Optional[List[str]] = None,
+                      compression: Optional[Compression] = None) -> str:
         """
         Export video data to CSV format
         
         Args:
             data: Data dictionary to export
             filename: Output filename (auto-generated if None)
+            fields: Column names; when omitted every row is scanned to collect them
+            compression: Level and zstd threads for a .gz or .zst filename (default: codec defaults)
             
         Returns:
             Path to the created file
         """
+        data = DataExporter._dataset(data)
         videos = data.get('videos', [])
         if not videos:
             print("No video data to export")
@@ -64,31 +169,195 @@ class DataExporter:
         os.makedirs(os.path.dirname(filename) if os.path.dirname(filename) else '.', exist_ok=True)
         
         # Get all possible field names from all videos
-        fieldnames = set()
-        for video in videos:
-            fieldnames.update(video.keys())
-        fieldnames = sorted(list(fieldnames))
+        if fields is not None:
+            fieldnames = list(fields)
+        elif isinstance(videos, VideoTable):
+            fieldnames = sorted(videos.fields)
+        else:
+            fieldnames = set()
+            for video in videos:
+                fieldnames.update(video.keys())
+            fieldnames = sorted(list(fieldnames))
         
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        with (compression or Compression()).open(filename, newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
             writer.writeheader()
             writer.writerows(videos)
             
         print(f"Data exported to CSV: {filename}")
         return filename
     
+    @_timed
+    def export_to_ndjson(data: Dict[str, Any], filename: str = None, compact: bool = False,
+                         fields: Optional[List[str]] = None, compression: Optional[Compression] = None) -> str:
+        """
+        Export video data as newline-delimited JSON (one video per line)
+        
+        Args:
+            data: Data dictionary to export
+            filename: Output filename (auto-generated if None)
+            compact: Omit the spaces after ',' and ':'
+            fields: Fields to write (default: every field of each row)
+            compression: Level and zstd threads for a .gz or .zst filename (default: codec defaults)
+            
+        Returns:
+            Path to the created file
+        """
+        data = DataExporter._dataset(data)
+        if filename is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            uid = data.get('user_info', {}).get('mid', 'unknown')
+            filename = f"bilibili_videos_{uid}_{timestamp}.ndjson"
+            
+        with NDJSONSink(filename, fields, compact=compact, compression=compression) as sink:
+            sink.write_many(data.get('videos', []))
+            
+        print(f"Data exported to NDJSON: {filename}")
+        return filename
+    
+    @_timed
+    def export_delta(data: Dict[str, Any], filename: str, index: SnapshotIndex, complete: bool = True,
+                     compact: bool = False, compression: Optional[Compression] = None) -> str:
+        """
+        Export only the videos inserted, updated or removed since the last delta export
+        
+        The file is always written (possibly with no rows), so a consumer
+        never picks up the delta of an earlier run twice.
+        
+        Args:
+            data: Data dictionary to export
+            filename: Output filename; a .csv extension writes CSV (with the
+                changed fields joined by '|'), anything else NDJSON
+            index: Snapshot index the data is compared with; it moves to the
+                new snapshot once the file is written
+            complete: Whether the data holds every video of the UP master
+                (otherwise videos missing from it are not reported as removed)
+            compact: Omit the spaces after ',' and ':' in NDJSON
+            compression: Level and zstd threads for a .gz or .zst filename (default: codec defaults)
+        
+        Returns:
+            Path to the created file
+        """
+        data = DataExporter._dataset(data)
+        videos = data.get('videos', [])
+        uid = data.get('user_info', {}).get('mid', 'unknown')
+        changes = index.diff(uid, videos, complete=complete)
+        
+        if filename.endswith('.csv'):
+            # The header comes from the crawl, so it is the same when nothing changed
+            fields = SnapshotIndex.DELTA_FIELDS + (list(videos.fields) if isinstance(videos, VideoTable)
+                                                   else list(videos[0]) if videos else [])
+            fields = list(dict.fromkeys(fields + [key for row in changes for key in row]))
+            with CSVSink(filename, fields, compression=compression) as sink:
+                sink.write_many(dict(row, changed='|'.join(row['changed'])) for row in changes)
+        else:
+            with NDJSONSink(filename, compact=compact, compression=compression) as sink:
+                sink.write_many(changes)
+        index.commit(uid)
+        
+        counts = {op: 0 for op in ('insert', 'update', 'delete')}
+        for row in changes:
+            counts[row['op']] += 1
+        print(f"Delta exported: {filename} ({counts['insert']} inserted, {counts['update']} updated, "
+              f"{counts['delete']} removed of {len(videos)} videos)")
+        return filename
+    
+    @_timed
+    def export_to_parquet(data: Dict[str, Any], filename: str = None, fields: Optional[List[str]] = None,
+                          compression: str = 'zstd') -> str:
+        """
+        Export video data to a typed, compressed Parquet file (requires pyarrow)
+        
+        Args:
+            data: Data dictionary to export
+            filename: Output filename (auto-generated if None)
+            fields: Column names (default: the keys of the first video)
+            compression: Parquet compression codec
+            
+        Returns:
+            Path to the created file
+        """
+        return DataExporter._export_columnar(data, filename, fields, 'parquet', compression)
+    
+    @_timed
+    def export_to_feather(data: Dict[str, Any], filename: str = None, fields: Optional[List[str]] = None,
+                          compression: str = 'zstd') -> str:
+        """
+        Export video data to a typed Arrow IPC (Feather v2) file (requires pyarrow)
+        
+        Args:
+            data: Data dictionary to export
+            filename: Output filename (auto-generated if None)
+            fields: Column names (default: the keys of the first video)
+            compression: IPC compression codec ('zstd' or 'lz4')
+            
+        Returns:
+            Path to the created file
+        """
+        return DataExporter._export_columnar(data, filename, fields, 'feather', compression)
+    
     @staticmethod
-    def export_user_info_csv(data: Dict[str, Any], filename: str = None) -> str:
+    def _export_columnar(data: Dict[str, Any], filename: str, fields: Optional[List[str]],
+                         file_format: str, compression: str) -> str:
+        """Shared implementation of the Parquet and Feather exports"""
+        data = DataExporter._dataset(data)
+        videos = data.get('videos', [])
+        if not videos:
+            print("No video data to export")
+            return ""
+            
+        if filename is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            uid = data.get('user_info', {}).get('mid', 'unknown')
+            filename = f"bilibili_videos_{uid}_{timestamp}.{file_format}"
+            
+        if not fields:
+            fields = videos.fields if isinstance(videos, VideoTable) else list(videos[0].keys())
+        with ArrowSink(filename, fields, file_format, compression) as sink:
+            sink.write_many(videos)
+            
+        print(f"Data exported to {file_format.capitalize()}: {filename}")
+        return filename
+    
+    @_timed
+    def export_to_sqlite(data: Dict[str, Any], filename: str = None, fields: Optional[List[str]] = None) -> str:
+        """
+        Store user info and videos in a SQLite database, updating existing rows
+        
+        Args:
+            data: Data dictionary to export
+            filename: Database file (default: bilibili.db)
+            fields: Video fields to write (default: all); the other columns
+                of videos already stored keep their values
+            
+        Returns:
+            Path to the database
+        """
+        data = DataExporter._dataset(data)
+        if filename is None:
+            filename = "bilibili.db"
+            
+        with SQLiteExporter(filename) as db:
+            db.export(data, fields=fields)
+            
+        print(f"Data exported to SQLite: {filename}")
+        return filename
+    
+    @_timed
+    def export_user_info_csv(data: Dict[str, Any], filename: str = None,
+                             compression: Optional[Compression] = None) -> str:
         """
         Export user information to CSV format
         
         Args:
             data: Data dictionary containing user info
             filename: Output filename (auto-generated if None)
+            compression: Level and zstd threads for a .gz or .zst filename (default: codec defaults)
             
         Returns:
             Path to the created file
         """
+        data = DataExporter._dataset(data)
         user_info = data.get('user_info', {})
         if not user_info:
             print("No user info to export")
@@ -121,7 +390,7 @@ class DataExporter:
         
         fieldnames = list(user_data[0].keys())
         
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+        with (compression or Compression()).open(filename, newline='') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
             writer.writerows(user_data)
@@ -129,18 +398,21 @@ class DataExporter:
         print(f"User info exported to CSV: {filename}")
         return filename
     
-    @staticmethod
-    def export_summary_txt(data: Dict[str, Any], filename: str = None) -> str:
+    @_timed
+    def export_summary_txt(data: Dict[str, Any], filename: str = None,
+                           compression: Optional[Compression] = None) -> str:
         """
         Export a summary report in text format
         
         Args:
             data: Data dictionary to export
             filename: Output filename (auto-generated if None)
+            compression: Level and zstd threads for a .gz or .zst filename (default: codec defaults)
             
         Returns:
             Path to the created file
         """
+        data = DataExporter._dataset(data)
         if filename is None:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             uid = data.get('user_info', {}).get('mid', 'unknown')
@@ -152,7 +424,7 @@ class DataExporter:
         user_info = data.get('user_info', {})
         videos = data.get('videos', [])
         
-        with open(filename, 'w', encoding='utf-8') as f:
+        with (compression or Compression()).open(filename) as f:
             f.write("=== Bilibili UP Master Video Summary ===\n\n")
             f.write(f"Scrape Time: {data.get('scrape_time', 'Unknown')}\n")
             f.write(f"Total Videos: {data.get('total_videos', 0)}\n\n")
@@ -168,24 +440,82 @@ class DataExporter:
             
             # Video statistics
             if videos:
-                total_plays = sum(video.get('play', 0) for video in videos)
-                total_comments = sum(video.get('video_review', 0) for video in videos)
-                total_favorites = sum(video.get('favorites', 0) for video in videos)
+                stats = analyze(videos)
+                totals = stats['totals']
                 
                 f.write("=== Video Statistics ===\n")
                 f.write(f"Total Videos: {len(videos)}\n")
-                f.write(f"Total Views: {total_plays:,}\n")
-                f.write(f"Total Comments: {total_comments:,}\n")
-                f.write(f"Total Favorites: {total_favorites:,}\n")
-                f.write(f"Average Views per Video: {total_plays // len(videos) if videos else 0:,}\n\n")
+                f.write(f"Total Views: {totals['play']:,}\n")
+                f.write(f"Total Comments: {totals['video_review']:,}\n")
+                f.write(f"Total Favorites: {totals['favorites']:,}\n")
+                f.write(f"Average Views per Video: {totals['play'] // len(videos) if videos else 0:,}\n\n")
                 
                 # Top 10 most popular videos
-                top_videos = sorted(videos, key=lambda x: x.get('play', 0), reverse=True)[:10]
                 f.write("=== Top 10 Most Popular Videos ===\n")
-                for i, video in enumerate(top_videos, 1):
+                for i, video in enumerate(stats['top']['play'], 1):
                     f.write(f"{i}. {video.get('title', 'Unknown Title')}\n")
                     f.write(f"   Views: {video.get('play', 0):,} | Comments: {video.get('video_review', 0):,}\n")
                     f.write(f"   Published: {video.get('created', 'Unknown')}\n\n")
+                
+                # Distribution and engagement
+                labels = {'play': 'Views', 'video_review': 'Comments', 'favorites': 'Favorites'}
+                f.write("=== Percentiles ===\n")
+                for metric, label in labels.items():
+                    values = ' | '.join(f"{name}: {value:,.0f}" for name, value in stats['percentiles'][metric].items())
+                    f.write(f"{label}: {values}\n")
+                f.write("\n")
+                
+                engagement = stats['engagement']
+                f.write("=== Engagement ===\n")
+                f.write(f"Comments per 1k Views: {engagement['comments_per_1k_views']}\n")
+                f.write(f"Favorites per 1k Views: {engagement['favorites_per_1k_views']}\n\n")
+                
+                f.write("=== Uploads by Month ===\n")
+                for month in stats['monthly']:
+                    f.write(f"{month['month']}: {month['uploads']} videos, {month['views']:,} views\n")
+                f.write("\n")
+                
+                f.write("=== Uploads by Weekday ===\n")
+                for weekday in stats['weekday']:
+                    f.write(f"{weekday['weekday']}: {weekday['uploads']} videos, {weekday['views']:,} views\n")
+                f.write("\n")
             
         print(f"Summary exported to TXT: {filename}")
+        return filename
+    
+    @_timed
+    def export_summary_json(data: Dict[str, Any], filename: str = None, top_n: int = 10,
+                            compression: Optional[Compression] = None) -> str:
+        """
+        Export summary statistics (totals, percentiles, monthly/weekday
+        aggregates, engagement and top videos) in JSON format
+        
+        Args:
+            data: Data dictionary to export
+            filename: Output filename (auto-generated if None)
+            top_n: Number of top videos per metric
+            compression: Level and zstd threads for a .gz or .zst filename (default: codec defaults)
+            
+        Returns:
+            Path to the created file
+        """
+        data = DataExporter._dataset(data)
+        if filename is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            uid = data.get('user_info', {}).get('mid', 'unknown')
+            filename = f"bilibili_summary_{uid}_{timestamp}.json"
+            
+        # Ensure the directory exists
+        os.makedirs(os.path.dirname(filename) if os.path.dirname(filename) else '.', exist_ok=True)
+        
+        summary = {
+            'scrape_time': data.get('scrape_time', ''),
+            'user_info': data.get('user_info', {}),
+            'statistics': analyze(data.get('videos', []), top_n=top_n),
+        }
+        
+        with (compression or Compression()).open(filename) as f:
+            f.write(fastjson.dumps(summary, indent=2))
+            
+        print(f"Summary exported to JSON: {filename}")
         return filename
\ No newline at end of file
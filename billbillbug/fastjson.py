@@ -0,0 +1,89 @@
+"""
+JSON encoding and decoding for BillBillBug
+
+Uses orjson when it is installed (pip install orjson) and the standard
+json module otherwise. Either way the output is byte-identical to
+json.dumps(obj, ensure_ascii=False) with indent=2 or compact
+separators: orjson spells floats in exponent notation differently (1e16
+for 1e+16, 0.00001 for 1e-05), writes NaN as null and refuses some
+values the standard library accepts (integers beyond 64 bits,
+non-string keys, lone surrogates), so documents containing any of
+these are encoded with the standard library instead.
+"""
+
+import json
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+
+# Name of the backend in use
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+if orjson is not None:
+    # Leave types the standard library would reject to `default`, like json.dumps does
+    _OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_SUBCLASS
+
+
+def _orjson_compatible(obj: Any, default: Optional[Callable[[Any], Any]]) -> bool:
+    """Whether every float in obj is one orjson spells like repr() (plain decimal notation)"""
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+        if kind is str or kind is int or value is None or kind is bool:
+            continue
+        if kind is dict:
+            stack.extend(value.values())
+        elif kind is list or kind is tuple:
+            stack.extend(value)
+        elif kind is float:
+            # repr() switches to exponent notation outside [1e-4, 1e16); NaN fails too
+            if value and not 1e-4 <= abs(value) < 1e16:
+                return False
+        elif default is not None:
+            stack.append(default(value))
+        else:
+            return False
+    return True
+
+
+def dumps(obj: Any, indent: Optional[int] = None, default: Optional[Callable[[Any], Any]] = None) -> str:
+    """
+    Serialize obj like json.dumps(obj, ensure_ascii=False, ...)
+
+    Args:
+        obj: Value to serialize
+        indent: None for compact output (',' and ':' separators without
+            spaces), otherwise the indentation width
+        default: Function returning a serializable version of unsupported objects
+
+    Returns:
+        JSON text
+    """
+    if orjson is not None and indent in (None, 2) and _orjson_compatible(obj, default):
+        try:
+            return orjson.dumps(obj, default=default,
+                                option=_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=indent, default=default,
+                      separators=None if indent is not None else (',', ':'))
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Deserialize a JSON document (bytes are expected to be UTF-8)
+
+    Raises:
+        ValueError: The document is not valid JSON
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass  # e.g. NaN or huge integers, which the standard library accepts
+    return json.loads(data)
@@ -0,0 +1,228 @@
+"""
+Instrumentation hooks for BillBillBug
+
+BilibiliScraper (per instance) and DataExporter (per class) emit events
+to a Hooks object; any callable taking (event, info) can subscribe:
+
+    request_start  endpoint, url
+    request_end    endpoint, status, code, bytes, latency, error
+    stage          stage, seconds (and e.g. method for exports)
+
+Stages are 'fetch' (time on the wire), 'rate_limit' (waiting for the
+request budget or --delay), 'retry_wait' (backoff and circuit breaker
+pauses), 'sign' (WBI signing), 'format' and 'export'. The Profiler hook
+aggregates the events into a time breakdown, latency histograms and
+Prometheus text format.
+"""
+
+import contextlib
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds of the latency histogram buckets in seconds (Prometheus defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGES = ('fetch', 'rate_limit', 'retry_wait', 'sign', 'format', 'export')
+
+Hook = Callable[[str, Dict], None]
+
+
+class Hooks:
+    """Callbacks notified of instrumentation events"""
+
+    def __init__(self, callbacks: Iterable[Hook] = ()):
+        """
+        Initialize the hooks
+
+        Args:
+            callbacks: Initial subscribers, called as callback(event, info)
+        """
+        self._callbacks: List[Hook] = list(callbacks)
+
+    def __bool__(self) -> bool:
+        return bool(self._callbacks)
+
+    def add(self, callback: Hook):
+        """Subscribe a callback"""
+        self._callbacks.append(callback)
+
+    def remove(self, callback: Hook):
+        """Unsubscribe a callback"""
+        self._callbacks.remove(callback)
+
+    def emit(self, event: str, **info):
+        """Call every subscriber with the event"""
+        for callback in self._callbacks:
+            callback(event, info)
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **info):
+        """Time the enclosed block and emit it as a 'stage' event"""
+        if not self._callbacks:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.emit('stage', stage=name, seconds=time.perf_counter() - started, **info)
+
+
+class _Histogram:
+    """Cumulative latency histogram"""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # Last bucket is +Inf
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class Profiler:
+    """
+    Hook that aggregates events into a profile
+
+    Subscribe it to both the scraper's and DataExporter's hooks. Stage
+    times are summed over all threads, so with several workers they can
+    add up to more than the wall time.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}  # stage -> [seconds, count]
+        self.latency: Dict[str, _Histogram] = {}  # endpoint -> histogram
+        self.requests: Dict[Tuple[str, str], int] = {}  # (endpoint, status) -> count
+        self.codes: Dict[Tuple[str, str], int] = {}  # (endpoint, API code) -> count
+        self.bytes: Dict[str, int] = {}  # endpoint -> bytes received
+        self._lock = threading.Lock()
+
+    def __call__(self, event: str, info: Dict):
+        with self._lock:
+            if event == 'stage':
+                totals = self.stages.setdefault(info['stage'], [0.0, 0])
+                totals[0] += info['seconds']
+                totals[1] += 1
+            elif event == 'request_end':
+                endpoint = info['endpoint']
+                status = str(info['status']) if info.get('status') is not None else info.get('error') or 'error'
+                self.requests[(endpoint, status)] = self.requests.get((endpoint, status), 0) + 1
+                if info.get('code') is not None:
+                    key = (endpoint, str(info['code']))
+                    self.codes[key] = self.codes.get(key, 0) + 1
+                self.bytes[endpoint] = self.bytes.get(endpoint, 0) + (info.get('bytes') or 0)
+                self.latency.setdefault(endpoint, _Histogram()).observe(info['latency'])
+
+    def report(self) -> str:
+        """Human-readable time breakdown and latency histograms"""
+        with self._lock:
+            wall = time.perf_counter() - self.started
+            lines = ['=== Profile ===', f"Wall time: {wall:.3f}s", '', 'Time by stage (summed over threads):']
+            for stage in list(STAGES) + sorted(set(self.stages) - set(STAGES)):
+                seconds, count = self.stages.get(stage, (0.0, 0))
+                share = seconds / wall * 100 if wall else 0.0
+                lines.append(f"  {stage:<11} {seconds:9.3f}s  {share:6.1f}%  ({count} calls)")
+
+            for endpoint, histogram in sorted(self.latency.items()):
+                statuses = ', '.join(f"{status}: {count}" for (name, status), count in sorted(self.requests.items())
+                                     if name == endpoint)
+                codes = ', '.join(f"{code}: {count}" for (name, code), count in sorted(self.codes.items())
+                                  if name == endpoint)
+                lines.append('')
+                lines.append(f"{endpoint}: {histogram.count} requests, {self.bytes.get(endpoint, 0)} bytes, "
+                             f"mean {histogram.total / histogram.count * 1000:.1f} ms, "
+                             f"max {histogram.max * 1000:.1f} ms")
+                lines.append(f"  HTTP status: {statuses}" + (f"; API code: {codes}" if codes else ''))
+                widest = max(histogram.counts)
+                for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), histogram.counts):
+                    label = f"<= {bound * 1000:g} ms" if bound != float('inf') else f"> {LATENCY_BUCKETS[-1] * 1000:g} ms"
+                    bar = '#' * round(count / widest * 40) if widest else ''
+                    lines.append(f"  {label:>12} {count:7d} {bar}")
+            return '\n'.join(lines)
+
+    def prometheus(self, extra: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """
+        Metrics in Prometheus text exposition format
+
+        Args:
+            extra: Additional counters as {name: (help text, value)}, e.g. retry totals
+
+        Returns:
+            Text for the node exporter's textfile collector
+        """
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP billbillbug_{name} {help_text}")
+            lines.append(f"# TYPE billbillbug_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape(str(val))}"' for key, val in labels)
+                lines.append(f"billbillbug_{name}{{{label_text}}} {value:g}" if label_text else
+                             f"billbillbug_{name} {value:g}")
+
+        with self._lock:
+            metric('requests_total', 'counter', 'HTTP requests by endpoint and status',
+                   [((('endpoint', endpoint), ('status', status)), count)
+                    for (endpoint, status), count in sorted(self.requests.items())])
+            metric('api_responses_total', 'counter', 'Decoded API responses by endpoint and API code',
+                   [((('endpoint', endpoint), ('code', code)), count)
+                    for (endpoint, code), count in sorted(self.codes.items())])
+            metric('response_bytes_total', 'counter', 'Response bytes received by endpoint',
+                   [((('endpoint', endpoint),), count) for endpoint, count in sorted(self.bytes.items())])
+
+            metric('request_duration_seconds', 'histogram', 'Request latency by endpoint', [])
+            for endpoint, histogram in sorted(self.latency.items()):
+                name = 'billbillbug_request_duration_seconds'
+                label = f'endpoint="{_escape(endpoint)}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = f"{bound:g}" if bound != float('inf') else '+Inf'
+                    lines.append(f'{name}_bucket{{{label},le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label}}} {histogram.total:g}')
+                lines.append(f'{name}_count{{{label}}} {histogram.count}')
+
+            metric('stage_seconds_total', 'counter', 'Time spent per stage, summed over threads',
+                   [((('stage', stage),), seconds) for stage, (seconds, _) in sorted(self.stages.items())])
+            metric('run_seconds', 'gauge', 'Wall time of the run', [((), time.perf_counter() - self.started)])
+
+        for name, (help_text, value) in sorted((extra or {}).items()):
+            metric(name, 'counter' if name.endswith('_total') else 'gauge', help_text, [((), value)])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str, extra: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """
+        Write the metrics atomically, so a collector never reads a partial file
+
+        Args:
+            path: Target file (e.g. in the node exporter's textfile directory)
+            extra: Additional counters, see prometheus()
+
+        Returns:
+            Path to the written file
+        """
+        os.makedirs(os.path.dirname(path) if os.path.dirname(path) else '.', exist_ok=True)
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus(extra))
+        os.replace(temp, path)
+        return path
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
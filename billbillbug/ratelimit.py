@@ -0,0 +1,148 @@
+"""
+Request rate limiting for BillBillBug
+
+Both limiters implement the token-bucket algorithm: the bucket refills at
+`rate` tokens per second up to `capacity` tokens, and every request takes
+one token. A request that finds the bucket empty reserves its token
+anyway and sleeps until the token is due, so concurrent callers queue up
+in order and the budget is used without idle gaps.
+"""
+
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+
+class TokenBucket:
+    """Thread-safe in-process token bucket"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        Initialize the bucket
+
+        Args:
+            rate: Tokens added per second (sustained requests per second)
+            capacity: Maximum number of tokens (burst size)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """Take tokens from the bucket and return how long to wait for them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until the requested tokens are available
+
+        Args:
+            tokens: Number of tokens to take
+
+        Returns:
+            Number of seconds spent waiting
+        """
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class FileTokenBucket:
+    """
+    Token bucket shared by every process on the host
+
+    The bucket state lives in a small file that is updated under an
+    exclusive flock, so any number of worker processes pointing at the
+    same path draw from one global request budget. Unix only.
+    """
+
+    _STATE = struct.Struct('<dd')  # tokens, last update (wall clock)
+
+    def __init__(self, path: str, rate: float, capacity: float = 1.0):
+        """
+        Initialize the bucket
+
+        Args:
+            path: State file shared between processes (created if missing)
+            rate: Tokens added per second (sustained requests per second)
+            capacity: Maximum number of tokens (burst size)
+        """
+        if fcntl is None:
+            raise RuntimeError("FileTokenBucket requires fcntl (Unix only)")
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        self._lock = threading.Lock()  # flock does not serialize threads sharing a descriptor
+
+        os.makedirs(os.path.dirname(path) if os.path.dirname(path) else '.', exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def _reserve(self, tokens: float) -> float:
+        """Take tokens from the shared bucket and return how long to wait for them"""
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                raw = os.pread(self._fd, self._STATE.size, 0)
+                if len(raw) == self._STATE.size:
+                    stored, updated = self._STATE.unpack(raw)
+                    elapsed = max(0.0, now - updated)
+                    available = min(self.capacity, stored + elapsed * self.rate)
+                else:
+                    available = self.capacity
+                available -= tokens
+                os.pwrite(self._fd, self._STATE.pack(available, now), 0)
+                return max(0.0, -available / self.rate)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until the requested tokens are available
+
+        Args:
+            tokens: Number of tokens to take
+
+        Returns:
+            Number of seconds spent waiting
+        """
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def close(self):
+        """Close the state file"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
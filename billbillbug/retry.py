@@ -0,0 +1,326 @@
+"""
+Request retries for BillBillBug
+
+Failed requests are classified as retryable or not: server errors
+(HTTP 5xx), timeouts, dropped connections and throttling (HTTP 412/429
+or the API codes -412/-799/-509) are retried after a jittered
+exponential backoff; everything else fails immediately. A shared
+circuit breaker watches the throttling rate and pauses every worker
+when Bilibili starts refusing most requests, instead of letting each
+one retry into the block.
+"""
+
+import random
+import threading
+import time
+from collections import Counter, deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+
+
+class CircuitBreaker:
+    """
+    Pause all requests while the throttling rate is too high
+
+    The outcome of the last `window` requests is kept; once at least
+    `min_requests` are known and the throttled fraction reaches
+    `threshold`, the breaker opens and wait() blocks every caller for
+    `cooldown` seconds. After the pause a single request is let through
+    as a probe while the others keep waiting: if it is throttled again
+    the breaker reopens with twice the cooldown (up to `max_cooldown`),
+    otherwise everyone resumes. Outcomes of requests admitted before the
+    breaker opened are ignored, so the requests in flight when it trips
+    neither reopen it nor count as probes.
+    """
+
+    def __init__(self, threshold: float = 0.5, window: int = 20, min_requests: int = 10,
+                 cooldown: float = 30.0, max_cooldown: float = 600.0):
+        """
+        Initialize the breaker
+
+        Args:
+            threshold: Throttled fraction of recent requests that opens the breaker
+            window: Number of recent requests considered
+            min_requests: Requests needed in the window before the breaker can open
+            cooldown: Seconds all requests are paused when it opens
+            max_cooldown: Upper bound of the cooldown after repeated failed probes
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self.min_requests = max(1, min(min_requests, window))
+        self.cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self.trips = 0
+        self._outcomes = deque(maxlen=window)
+        self._open_until = 0.0
+        self._current_cooldown = cooldown
+        self._generation = 0  # Bumped by every trip; tickets from older generations are stale
+        self._probing = False  # Waiting for the outcome of the probe after a pause
+        self._probe_out = False  # The probe has been let through
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    @property
+    def is_open(self) -> bool:
+        """Whether requests are currently paused"""
+        return time.monotonic() < self._open_until
+
+    def wait(self) -> float:
+        """
+        Block while the breaker is open
+
+        Returns:
+            Number of seconds spent waiting
+        """
+        return self.acquire()[0]
+
+    def acquire(self) -> Tuple[float, int]:
+        """
+        Block while the breaker is open or its probe is outstanding
+
+        Returns:
+            Number of seconds spent waiting, and the ticket to pass to
+            record() with the outcome of the request
+        """
+        waited = 0.0
+        with self._changed:
+            while True:
+                remaining = self._open_until - time.monotonic()
+                if remaining <= 0 and not self._probe_out:
+                    break
+                started = time.monotonic()
+                self._changed.wait(remaining if remaining > 0 else None)
+                waited += time.monotonic() - started
+            if self._probing:
+                self._probe_out = True
+            return waited, self._generation
+
+    def record(self, throttled: bool, ticket: Optional[int] = None):
+        """
+        Record the outcome of a request
+
+        Args:
+            throttled: Whether the request was throttled
+            ticket: Ticket from acquire(); outcomes of requests admitted
+                before the breaker last opened are ignored
+        """
+        with self._changed:
+            if ticket is not None and ticket != self._generation:
+                return
+            if self._probing:
+                self._probing = self._probe_out = False
+                self._changed.notify_all()
+                if throttled:
+                    self._trip(min(self._current_cooldown * 2, self.max_cooldown))
+                    return
+                self._current_cooldown = self.cooldown
+
+            self._outcomes.append(throttled)
+            if len(self._outcomes) >= self.min_requests and time.monotonic() >= self._open_until:
+                rate = sum(self._outcomes) / len(self._outcomes)
+                if rate >= self.threshold:
+                    print(f"Throttled on {rate:.0%} of recent requests; pausing all requests")
+                    self._trip(self.cooldown)
+
+    def _trip(self, cooldown: float):
+        """Open the breaker (called with the lock held)"""
+        self.trips += 1
+        self._generation += 1
+        self._current_cooldown = cooldown
+        self._open_until = time.monotonic() + cooldown
+        self._outcomes.clear()
+        self._probing = True
+        self._probe_out = False
+        self._changed.notify_all()
+        print(f"Circuit breaker open for {cooldown:.0f}s")
+
+
+class RetryPolicy:
+    """
+    Retry transient request failures with jittered exponential backoff
+
+    The wait before retry n is drawn uniformly from
+    [0, min(max_backoff, backoff * 2 ** (n - 1))] ("full jitter"), so
+    workers that fail together do not retry together; a Retry-After
+    header from the server is used as the lower bound. One policy is
+    shared by all threads of a scraper and counts retries and the time
+    they cost.
+    """
+
+    # HTTP statuses Bilibili uses for throttling
+    THROTTLE_STATUSES = frozenset([412, 429])
+    # API codes that mean "too many requests" ("请求被拦截", "请求过于频繁", ...)
+    THROTTLE_CODES = frozenset([-412, -799, -509])
+
+    def __init__(self, max_attempts: int = 4, backoff: float = 0.5, max_backoff: float = 30.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        Initialize the policy
+
+        Args:
+            max_attempts: Attempts per request, including the first (1 disables retries)
+            backoff: Base of the backoff in seconds
+            max_backoff: Maximum backoff between two attempts, in seconds
+            breaker: Optional CircuitBreaker shared by every request of the policy
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker
+        self._lock = threading.Lock()
+        self._retries: Counter = Counter()  # reason -> retries
+        self._retried_requests = 0
+        self._gave_up = 0
+        self._throttled = 0
+        self._wasted = 0.0
+
+    @classmethod
+    def classify_error(cls, error: requests.RequestException) -> Optional[str]:
+        """
+        Reason a failed request may be retried, or None if it may not
+
+        Args:
+            error: Exception raised while sending the request
+        """
+        if isinstance(error, requests.Timeout):
+            return 'timeout'
+        if isinstance(error, requests.ConnectionError):
+            return 'connection'
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            status = error.response.status_code
+            if status in cls.THROTTLE_STATUSES:
+                return 'throttled'
+            if status >= 500:
+                return 'server_error'
+        return None
+
+    @classmethod
+    def classify_data(cls, data) -> Optional[str]:
+        """Reason a decoded API response should be retried, or None"""
+        if isinstance(data, dict) and data.get('code') in cls.THROTTLE_CODES:
+            return 'throttled'
+        return None
+
+    @staticmethod
+    def retry_after(error: Optional[requests.RequestException]) -> Optional[float]:
+        """Seconds requested by the Retry-After header of a failed response, if any"""
+        response = getattr(error, 'response', None)
+        value = response.headers.get('Retry-After') if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def delay(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """
+        Seconds to wait before a retry
+
+        Args:
+            retry: Number of the retry (1 for the first)
+            retry_after: Delay requested by the server, used as a lower bound
+        """
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (retry - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def call(self, send: Callable[[], Dict]) -> Dict:
+        """
+        Send a request, retrying it while it fails in a retryable way
+
+        Args:
+            send: Function that sends the request and returns the decoded JSON
+
+        Returns:
+            The decoded response. A response that is still throttled after the
+            last attempt is returned as is, so the caller reports its API error.
+
+        Raises:
+            requests.RequestException: The last error when it is not retryable
+                or the attempts are exhausted
+        """
+        attempt = 1
+        while True:
+            ticket = None
+            if self.breaker:
+                waited, ticket = self.breaker.acquire()
+                self._add_wasted(waited)
+
+            started = time.monotonic()
+            error = None
+            reason = None
+            try:
+                data = send()
+                reason = self.classify_data(data)
+            except requests.RequestException as e:
+                reason = self.classify_error(e)
+                if reason is None:
+                    raise
+                error = e
+            finally:
+                # Recorded however the attempt ends, so a probe never leaves the others waiting
+                if self.breaker:
+                    self.breaker.record(reason == 'throttled', ticket)
+            if reason is None:
+                return data
+
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._throttled += reason == 'throttled'
+                self._wasted += elapsed
+                if attempt >= self.max_attempts:
+                    self._gave_up += 1
+                else:
+                    self._retries[reason] += 1
+                    self._retried_requests += attempt == 1
+
+            if attempt >= self.max_attempts:
+                print(f"Giving up after {attempt} attempts ({reason})")
+                if error is not None:
+                    raise error
+                return data
+
+            wait = self.delay(attempt, self.retry_after(error))
+            time.sleep(wait)
+            self._add_wasted(wait)
+            attempt += 1
+
+    def _add_wasted(self, seconds: float):
+        if seconds:
+            with self._lock:
+                self._wasted += seconds
+
+    def stats(self) -> Dict:
+        """
+        Retry metrics since the policy was created
+
+        Returns:
+            Dictionary with 'retries' (total and 'by_reason'), 'retried_requests',
+            'gave_up', 'throttled', 'wasted_seconds' (failed attempts, backoff
+            and breaker pauses) and 'breaker_trips'
+        """
+        with self._lock:
+            return {
+                'retries': sum(self._retries.values()),
+                'by_reason': dict(self._retries),
+                'retried_requests': self._retried_requests,
+                'gave_up': self._gave_up,
+                'throttled': self._throttled,
+                'wasted_seconds': round(self._wasted, 3),
+                'breaker_trips': self.breaker.trips if self.breaker else 0,
+            }
+
+
+def default_policy() -> RetryPolicy:
+    """Retry policy used by scrapers that are not given one"""
+    return RetryPolicy(breaker=CircuitBreaker())
+
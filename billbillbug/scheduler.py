@@ -0,0 +1,250 @@
+"""
+Adaptive re-crawl scheduling for BillBillBug
+
+Tracked UP masters live in a SQLite priority queue ordered by the time
+each one is next due. After every crawl the next-crawl time is derived
+from the UID's observed upload frequency and audience size, so active,
+popular accounts are revisited within hours while dormant ones wait up
+to `max_interval`; the request budget goes where new videos are likely.
+"""
+
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from .state import CrawlState
+
+
+class CrawlScheduler:
+    """
+    Persistent priority queue of UIDs to re-crawl
+
+    The expected upload rate of a UID (uploads per second) is an
+    exponentially weighted average of the rates seen between crawls. The
+    next crawl is planned after `target_uploads` expected uploads,
+    shortened for large audiences (a 1M-fan account is revisited
+    `1 + 6 / audience_scale` times sooner) and clamped to
+    [min_interval, max_interval]. Failed crawls back off exponentially
+    from min_interval.
+    """
+
+    # Recent history used to estimate the upload rate on a first crawl
+    HISTORY_WINDOW = 90 * 86400
+
+    def __init__(self, path: str, min_interval: float = 3600, max_interval: float = 7 * 86400,
+                 target_uploads: float = 1.0, audience_scale: float = 3.0, smoothing: float = 0.5,
+                 jitter: float = 0.1):
+        """
+        Open (or create) the schedule database
+
+        Args:
+            path: SQLite database file
+            min_interval: Shortest time between two crawls of a UID, in seconds
+            max_interval: Longest time between two crawls of a UID, in seconds
+            target_uploads: Expected new uploads between two crawls
+            audience_scale: Larger values reduce the priority boost of large audiences
+            smoothing: Weight of the latest observation in the upload rate average
+            jitter: Random fraction added to or removed from every interval, so
+                UIDs added together do not stay due together
+        """
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.target_uploads = target_uploads
+        self.audience_scale = audience_scale
+        self.smoothing = smoothing
+        self.jitter = jitter
+        os.makedirs(os.path.dirname(path) if os.path.dirname(path) else '.', exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS schedule (
+                mid TEXT PRIMARY KEY,
+                next_crawl REAL NOT NULL,
+                last_crawl REAL,
+                last_upload INTEGER NOT NULL DEFAULT 0,
+                upload_rate REAL,
+                audience INTEGER NOT NULL DEFAULT 0,
+                crawls INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS schedule_next_crawl ON schedule (next_crawl);
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the database"""
+        self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM schedule').fetchone()[0]
+
+    def add(self, uids: Iterable[str], now: Optional[float] = None) -> int:
+        """
+        Start tracking UIDs; new ones are due immediately
+
+        Returns:
+            Number of UIDs that were not tracked yet
+        """
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany('INSERT OR IGNORE INTO schedule (mid, next_crawl) VALUES (?, ?)',
+                                   ((str(uid), now) for uid in uids))
+            return self._conn.total_changes - before
+
+    def remove(self, uid: str):
+        """Stop tracking a UID"""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM schedule WHERE mid = ?', (str(uid),))
+
+    def due(self, limit: Optional[int] = None, now: Optional[float] = None) -> List[str]:
+        """
+        UIDs whose next crawl is due, most overdue first
+
+        Args:
+            limit: Maximum number of UIDs to return
+            now: Current time (default: time.time())
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute('SELECT mid FROM schedule WHERE next_crawl <= ? ORDER BY next_crawl LIMIT ?',
+                                      (now, -1 if limit is None else limit))
+            return [row[0] for row in rows]
+
+    def next_due(self) -> Optional[float]:
+        """Time at which the next UID becomes due (None if nothing is tracked)"""
+        with self._lock:
+            return self._conn.execute('SELECT MIN(next_crawl) FROM schedule').fetchone()[0]
+
+    def record(self, uid: str, data: Optional[Dict], now: Optional[float] = None) -> float:
+        """
+        Record the outcome of a crawl and plan the next one
+
+        Args:
+            uid: UP master's UID
+            data: Result of scrape_up_master (merged with earlier videos for
+                incremental crawls), or a false value if the crawl failed
+            now: Time of the crawl (default: time.time())
+
+        Returns:
+            Time of the next crawl
+        """
+        uid = str(uid)
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT last_crawl, last_upload, upload_rate, audience, failures FROM schedule WHERE mid = ?',
+                (uid,)
+            ).fetchone()
+            last_crawl, last_upload, rate, audience, failures = row or (None, 0, None, 0, 0)
+
+            if not data:
+                failures += 1
+                interval = min(self.max_interval, self.min_interval * 2 ** (failures - 1))
+                self._conn.execute(
+                    'INSERT INTO schedule (mid, next_crawl, failures) VALUES (?, ?, ?) '
+                    'ON CONFLICT(mid) DO UPDATE SET next_crawl = excluded.next_crawl, failures = excluded.failures',
+                    (uid, now + interval, failures)
+                )
+                return now + interval
+
+            uploads = [CrawlState._to_timestamp(video.get('created')) for video in data.get('videos') or []]
+            newest = max(max(uploads, default=0), last_upload)
+            observed = self._observed_rate(uploads, last_crawl, last_upload, now)
+            rate = observed if rate is None else self.smoothing * observed + (1 - self.smoothing) * rate
+            audience = self._audience(data) or audience
+
+            next_crawl = now + self.interval(rate, audience)
+            self._conn.execute(
+                'INSERT INTO schedule (mid, next_crawl, last_crawl, last_upload, upload_rate, audience, crawls) '
+                'VALUES (?, ?, ?, ?, ?, ?, 1) '
+                'ON CONFLICT(mid) DO UPDATE SET next_crawl = excluded.next_crawl, '
+                'last_crawl = excluded.last_crawl, last_upload = excluded.last_upload, '
+                'upload_rate = excluded.upload_rate, audience = excluded.audience, '
+                'crawls = crawls + 1, failures = 0',
+                (uid, next_crawl, now, newest, rate, audience)
+            )
+            return next_crawl
+
+    def _observed_rate(self, uploads: List[int], last_crawl: Optional[float], last_upload: int,
+                       now: float) -> float:
+        """Uploads per second since the last crawl (or over the recent history on a first crawl)"""
+        if last_crawl is not None and now > last_crawl:
+            return sum(1 for created in uploads if created > last_upload) / (now - last_crawl)
+        recent = [created for created in uploads if created >= now - self.HISTORY_WINDOW]
+        return len(recent) / self.HISTORY_WINDOW
+
+    @staticmethod
+    def _audience(data: Dict) -> int:
+        """Follower count, or the mean view count of the videos when it is unknown"""
+        fans = (data.get('user_info') or {}).get('fans')
+        if fans:
+            return int(fans)
+        plays = [video.get('play') for video in data.get('videos') or [] if isinstance(video.get('play'), int)]
+        return int(sum(plays) / len(plays)) if plays else 0
+
+    def interval(self, upload_rate: float, audience: int = 0) -> float:
+        """
+        Seconds until the next crawl of a UID
+
+        Args:
+            upload_rate: Expected uploads per second
+            audience: Follower count (or another popularity measure)
+        """
+        interval = self.target_uploads / upload_rate if upload_rate > 0 else self.max_interval
+        interval /= 1 + math.log10(1 + max(0, audience)) / self.audience_scale
+        if self.jitter:
+            interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def stats(self, now: Optional[float] = None) -> Dict:
+        """
+        Queue depth and staleness
+
+        Returns:
+            Dictionary with 'tracked', 'due', 'never_crawled', 'failing', the
+            median and maximum 'overdue_seconds' of due UIDs, the mean and
+            maximum 'staleness_seconds' (time since the last crawl) and
+            'next_due_seconds'
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            tracked, never_crawled, failing = self._conn.execute(
+                'SELECT COUNT(*), COUNT(*) - COUNT(last_crawl), SUM(failures > 0) FROM schedule'
+            ).fetchone()
+            overdue = [row[0] for row in self._conn.execute(
+                'SELECT ? - next_crawl FROM schedule WHERE next_crawl <= ? ORDER BY next_crawl DESC', (now, now))]
+            staleness = self._conn.execute(
+                'SELECT AVG(? - last_crawl), MAX(? - last_crawl) FROM schedule WHERE last_crawl IS NOT NULL',
+                (now, now)
+            ).fetchone()
+            next_due = self._conn.execute('SELECT MIN(next_crawl) FROM schedule WHERE next_crawl > ?',
+                                          (now,)).fetchone()[0]
+        return {
+            'tracked': tracked,
+            'due': len(overdue),
+            'never_crawled': never_crawled,
+            'failing': failing or 0,
+            'overdue_seconds': {
+                'median': round(overdue[len(overdue) // 2], 1) if overdue else 0.0,
+                'max': round(overdue[-1], 1) if overdue else 0.0,
+            },
+            'staleness_seconds': {
+                'mean': round(staleness[0], 1) if staleness[0] is not None else 0.0,
+                'max': round(staleness[1], 1) if staleness[1] is not None else 0.0,
+            },
+            'next_due_seconds': round(next_due - now, 1) if next_due is not None else None,
+        }
+
@@ -4,59 +4,169 @@ Based on the Bilibili API documentation: https://socialsisteryi.github.io/bilibi
 """
 
 import requests
+import threading
 import time
-import json
-import hashlib
-import urllib.parse
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Union
+from urllib.parse import urlsplit
+
+from .checkpoint import CrawlCheckpoint
+from .instrumentation import Hooks
+from .ratelimit import TokenBucket
+from .retry import RetryPolicy, default_policy
+from .table import VideoTable
+from .transport import RequestsTransport
+from .wbi import MIXIN_KEY_ENC_TAB, WbiSigner, get_mixin_key, sign_params
+
+
+class IncompleteCrawlError(Exception):
+    """A page of a video listing still failed after all retries, so videos are missing"""
+    
+    def __init__(self, uid: str, page: int):
+        super().__init__(f"API error on page {page} of UID {uid}; the video list is incomplete")
+        self.uid = uid
+        self.page = page
 
 
 class BilibiliScraper:
     """Bilibili video information scraper"""
     
     # WBI signature encoding table
-    MIXIN_KEY_ENC_TAB = [
-        46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49,
-        33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40,
-        61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
-        36, 20, 34, 44, 52
-    ]
+    MIXIN_KEY_ENC_TAB = MIXIN_KEY_ENC_TAB
+    
+    # Default API host (override with api_base, e.g. for a local test server)
+    API_BASE = 'https://api.bilibili.com'
+    
+    # Maximum page size accepted by the space video listing API
+    PAGE_SIZE = 50
+    
+    # Fields of a formatted video row (see format_video_data)
+    VIDEO_FIELDS = VideoTable.VIDEO_FIELDS
+    UP_FIELDS = VideoTable.UP_FIELDS
+    # fields= value that passes the raw API videos through unformatted
+    RAW_FIELDS = 'raw'
     
-    def __init__(self, delay: float = 1.0):
+    def __init__(self, delay: float = 1.0, rate_limiter=None, cache=None, signer: WbiSigner = None,
+                 wbi_key_file: Optional[str] = None, api_base: Optional[str] = None, compact: bool = False,
+                 retry: Optional[RetryPolicy] = None, transport=None, hooks: Optional[Hooks] = None,
+                 fields: Optional[Union[str, Iterable[str]]] = None):
         """
         Initialize the scraper
         
         Args:
-            delay: Delay between requests in seconds (for rate limiting)
+            delay: Minimum interval between requests in seconds (for rate limiting)
+            rate_limiter: Optional limiter with an acquire() method, e.g. a shared
+                TokenBucket or FileTokenBucket; overrides delay when given
+            cache: Optional ResponseCache consulted before every request
+            signer: Optional shared WbiSigner (default: a private signer that
+                fetches keys through this scraper)
+            wbi_key_file: File where the default signer persists WBI keys
+            api_base: API host to use instead of API_BASE
+            compact: Return scraped videos as a VideoTable instead of a list of dicts
+            retry: RetryPolicy for failed requests (default: up to 4 attempts with
+                backoff and a circuit breaker; RetryPolicy(max_attempts=1) disables retries)
+            transport: HTTP transport with get_json(), e.g. a RequestsTransport sized
+                for the number of workers or an HTTP/2 HttpxTransport (default: a
+                RequestsTransport)
+            hooks: Hooks notified of every request (request_start, request_end) and
+                of the time spent per stage, e.g. Hooks([Profiler()])
+            fields: Fields of the formatted rows (a subset of video_fields(); 'bvid'
+                is always kept), or RAW_FIELDS to keep the raw API videos as they
+                are; other fields are never built (default: all fields)
         """
         self.delay = delay
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': 'https://www.bilibili.com/'
-        })
-        self._wbi_cache = {}  # Cache for WBI keys
+        self.fields = self.resolve_fields(fields)
+        self.api_base = (api_base or self.API_BASE).rstrip('/')
+        self.compact = compact
+        self.cache = cache
+        if rate_limiter is None and delay > 0:
+            rate_limiter = TokenBucket(rate=1.0 / delay, capacity=1)
+        self.rate_limiter = rate_limiter
+        self.retry = retry or default_policy()
+        self.transport = transport or RequestsTransport()
+        # The underlying requests session (None for transports without one)
+        self.session = getattr(self.transport, 'session', None)
+        self.signer = signer or WbiSigner(self._fetch_wbi_keys, key_file=wbi_key_file)
+        self.hooks = hooks if hooks is not None else Hooks()
+        self._stats_lock = threading.Lock()
+        self.request_count = 0  # Number of HTTP requests sent by this scraper
+        
+    def _request(self, url: str, params: dict = None) -> dict:
+        """Send a GET request through the shared session and decode the JSON body"""
+        if self.cache:
+            data = self.cache.get(url, params)
+            if data is not None:
+                return data
+        
+        if not self.hooks:
+            data = self.retry.call(lambda: self._send(url, params))
+        else:
+            # Whatever the retry policy spends outside of _send is backoff or breaker pauses
+            attempts = []  # Seconds spent in each attempt
+            
+            def send():
+                started = time.perf_counter()
+                try:
+                    return self._send(url, params)
+                finally:
+                    attempts.append(time.perf_counter() - started)
+            
+            started = time.perf_counter()
+            try:
+                data = self.retry.call(send)
+            finally:
+                waited = time.perf_counter() - started - sum(attempts)
+                if len(attempts) > 1 or waited > 0.001:
+                    self.hooks.emit('stage', stage='retry_wait', seconds=waited)
+        
+        if self.cache:
+            self.cache.set(url, params, data)
+        return data
+        
+    def _send(self, url: str, params: dict = None) -> dict:
+        """Make one attempt at a request (called by the retry policy)"""
+        if self.rate_limiter:
+            with self.hooks.stage('rate_limit'):
+                self.rate_limiter.acquire()
+        with self._stats_lock:
+            self.request_count += 1
+        if not self.hooks:
+            return self.transport.get_json(url, params=params, timeout=10)
+        
+        endpoint = urlsplit(url).path
+        self.hooks.emit('request_start', endpoint=endpoint, url=url)
+        meta = {}
+        data = error = None
+        started = time.perf_counter()
+        try:
+            data = self.transport.get_json(url, params=params, timeout=10, meta=meta)
+            return data
+        except requests.RequestException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            latency = time.perf_counter() - started
+            self.hooks.emit('stage', stage='fetch', seconds=latency)
+            self.hooks.emit('request_end', endpoint=endpoint, status=meta.get('status'),
+                            code=data.get('code') if isinstance(data, dict) else None,
+                            bytes=meta.get('bytes', 0), latency=latency, error=error)
+    
+    def close(self):
+        """Release the HTTP connections"""
+        self.transport.close()
         
     def _get_mixin_key(self, img_key: str, sub_key: str) -> str:
         """Get mixin key for WBI signing"""
-        orig = img_key + sub_key
-        temp = ''
-        for i in self.MIXIN_KEY_ENC_TAB:
-            temp += orig[i]
-        return temp[:32]
+        return get_mixin_key(img_key, sub_key)
     
     def _get_wbi_keys(self) -> tuple[str, str]:
-        """Get WBI keys from bilibili nav API"""
-        # Check cache first (cache for 1 hour)
-        current_time = time.time()
-        if self._wbi_cache and current_time - self._wbi_cache.get('timestamp', 0) < 3600:
-            return self._wbi_cache['img_key'], self._wbi_cache['sub_key']
-            
+        """Get WBI keys (cached by the signer, fetched from the nav API when stale)"""
+        return self.signer.keys()
+    
+    def _fetch_wbi_keys(self) -> tuple[str, str]:
+        """Fetch fresh WBI keys from bilibili nav API"""
         try:
-            response = self.session.get('https://api.bilibili.com/x/web-interface/nav', timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._request(f"{self.api_base}/x/web-interface/nav")
             
             if data.get('code') == 0 or data.get('code') == -101:  # -101 is ok (not logged in)
                 wbi_img = data['data']['wbi_img']
@@ -67,13 +177,6 @@ class BilibiliScraper:
                 img_key = img_url.split('/')[-1].split('.')[0]
                 sub_key = sub_url.split('/')[-1].split('.')[0]
                 
-                # Cache the keys
-                self._wbi_cache = {
-                    'img_key': img_key,
-                    'sub_key': sub_key,
-                    'timestamp': current_time
-                }
-                
                 return img_key, sub_key
             else:
                 print(f"Failed to get WBI keys: {data.get('message', 'Unknown error')}")
@@ -88,32 +191,8 @@ class BilibiliScraper:
         if not img_key or not sub_key:
             return params  # Return original params if WBI keys unavailable
             
-        mixin_key = self._get_mixin_key(img_key, sub_key)
-        curr_time = int(time.time())
-        
-        # Add timestamp
-        signed_params = params.copy()
-        signed_params['wts'] = curr_time
-        
-        # Sort parameters
-        sorted_params = dict(sorted(signed_params.items()))
-        
-        # Filter out unwanted characters
-        filtered_params = {}
-        for k, v in sorted_params.items():
-            value_str = str(v)
-            # Remove "!'()*" characters as per API documentation
-            filtered_value = ''.join(char for char in value_str if char not in "!'()*")
-            filtered_params[k] = filtered_value
-        
-        # Create query string
-        query = urllib.parse.urlencode(filtered_params)
-        
-        # Calculate w_rid
-        wbi_sign = hashlib.md5((query + mixin_key).encode()).hexdigest()
-        filtered_params['w_rid'] = wbi_sign
-        
-        return filtered_params
+        with self.hooks.stage('sign'):
+            return sign_params(params, self._get_mixin_key(img_key, sub_key))
         
     def get_user_videos(self, uid: str, page: int = 1, page_size: int = 50) -> Dict:
         """
@@ -127,10 +206,10 @@ class BilibiliScraper:
         Returns:
             Dictionary containing video list and metadata
         """
-        url = "https://api.bilibili.com/x/space/wbi/arc/search"
+        url = f"{self.api_base}/x/space/wbi/arc/search"
         params = {
             'mid': uid,
-            'ps': min(page_size, 50),  # API limit is 50
+            'ps': min(page_size, self.PAGE_SIZE),  # API limit is 50
             'pn': page,
             'order': 'pubdate',  # Sort by publish date
         }
@@ -139,9 +218,7 @@ class BilibiliScraper:
         signed_params = self._sign_wbi_params(params)
         
         try:
-            response = self.session.get(url, params=signed_params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._request(url, params=signed_params)
             
             if data.get('code') == 0:
                 return data['data']
@@ -152,8 +229,6 @@ class BilibiliScraper:
         except requests.RequestException as e:
             print(f"Request error: {e}")
             return {}
-        finally:
-            time.sleep(self.delay)
     
     def get_user_info(self, uid: str) -> Dict:
         """
@@ -165,13 +240,11 @@ class BilibiliScraper:
         Returns:
             Dictionary containing user information
         """
-        url = "https://api.bilibili.com/x/space/acc/info"
+        url = f"{self.api_base}/x/space/acc/info"
         params = {'mid': uid}
         
         try:
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            data = self._request(url, params=params)
             
             if data.get('code') == 0:
                 return data['data']
@@ -179,9 +252,7 @@ class BilibiliScraper:
                 print("Request was intercepted, trying with WBI signing...")
                 # Try with WBI signing for better compatibility
                 signed_params = self._sign_wbi_params(params)
-                response = self.session.get(url, params=signed_params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
+                data = self._request(url, params=signed_params)
                 if data.get('code') == 0:
                     return data['data']
                 else:
@@ -194,59 +265,163 @@ class BilibiliScraper:
         except requests.RequestException as e:
             print(f"Request error: {e}")
             return {}
-        finally:
-            time.sleep(self.delay)
     
-    def get_all_user_videos(self, uid: str, max_videos: Optional[int] = None) -> List[Dict]:
+    def get_video_detail(self, bvid: str) -> Dict:
         """
-        Get all videos from a UP master (with pagination)
+        Get the details of a single video
+        
+        Args:
+            bvid: Video BV id
+            
+        Returns:
+            Dictionary with the video information under 'View' (including its
+            'stat' counters: like, coin, share, reply, ...) and its 'Tags'
+        """
+        url = f"{self.api_base}/x/web-interface/view/detail"
+        
+        try:
+            data = self._request(url, params={'bvid': bvid})
+            
+            if data.get('code') == 0:
+                return data['data']
+            else:
+                print(f"API Error for {bvid}: {data.get('message', 'Unknown error')}")
+                return {}
+                
+        except requests.RequestException as e:
+            print(f"Request error for {bvid}: {e}")
+            return {}
+    
+    def iter_video_pages(self, uid: str, max_videos: Optional[int] = None,
+                         known_bvids: Optional[Set[str]] = None,
+                         checkpoint: Optional[CrawlCheckpoint] = None) -> Iterator[List[Dict]]:
+        """
+        Iterate over the raw video list of a UP master one page at a time
         
         Args:
             uid: UP master's UID
             max_videos: Maximum number of videos to fetch (None for all)
+            known_bvids: Already collected bvids; since the listing is ordered by
+                publish date, pagination stops at the first known video
+            checkpoint: Optional CrawlCheckpoint; pages it holds are replayed
+                instead of fetched, and fetched pages are appended to it
             
-        Returns:
-            List of video dictionaries
+        Yields:
+            Non-empty lists of raw video dictionaries, in listing order
+            
+        Raises:
+            IncompleteCrawlError: If a page could not be fetched
         """
-        all_videos = []
+        fetched = 0
         page = 1
         
         print(f"Fetching videos for UID: {uid}")
         
         while True:
-            print(f"Fetching page {page}...")
-            data = self.get_user_videos(uid, page=page)
+            data = checkpoint.get(page) if checkpoint else None
+            if data is None:
+                print(f"Fetching page {page}...")
+                data = self.get_user_videos(uid, page=page)
+                if checkpoint and data and data.get('list', {}).get('vlist'):
+                    checkpoint.save(page, data)
+            else:
+                print(f"Page {page} restored from checkpoint")
             
             if not data or 'list' not in data:
-                print("No more videos found or API error")
-                break
+                # Returning here would pass the pages so far off as the whole list
+                raise IncompleteCrawlError(uid, page)
                 
             videos = data['list']['vlist']
             if not videos:
                 print("No videos in current page")
-                break
+                return
                 
-            all_videos.extend(videos)
-            print(f"Found {len(videos)} videos on page {page}")
+            new_videos = self._take_new_videos(videos, known_bvids)
+            print(f"Found {len(new_videos)} videos on page {page}")
             
             # Check if we've reached the desired limit
-            if max_videos and len(all_videos) >= max_videos:
-                all_videos = all_videos[:max_videos]
-                break
+            if max_videos and fetched + len(new_videos) >= max_videos:
+                yield new_videos[:max_videos - fetched]
+                return
+            
+            fetched += len(new_videos)
+            if new_videos:
+                yield new_videos
+            
+            # Everything after a known video has been collected before
+            if len(new_videos) < len(videos):
+                print("Reached previously collected videos")
+                return
                 
             # Check if there are more pages
-            if len(videos) < 50:  # If less than page size, this was the last page
-                break
+            if len(videos) < self.PAGE_SIZE:  # If less than page size, this was the last page
+                return
                 
             page += 1
+    
+    def get_all_user_videos(self, uid: str, max_videos: Optional[int] = None,
+                            known_bvids: Optional[Set[str]] = None,
+                            checkpoint: Optional[CrawlCheckpoint] = None) -> List[Dict]:
+        """
+        Get all videos from a UP master (with pagination)
+        
+        Args:
+            uid: UP master's UID
+            max_videos: Maximum number of videos to fetch (None for all)
+            known_bvids: Already collected bvids; since the listing is ordered by
+                publish date, pagination stops at the first known video
+            checkpoint: Optional CrawlCheckpoint to resume from and append to
+            
+        Returns:
+            List of video dictionaries
+            
+        Raises:
+            IncompleteCrawlError: If a page could not be fetched
+        """
+        all_videos = []
+        for videos in self.iter_video_pages(uid, max_videos, known_bvids, checkpoint):
+            all_videos.extend(videos)
             
         print(f"Total videos fetched: {len(all_videos)}")
         return all_videos
     
+    def iter_user_videos(self, uid: str, user_info: Dict = None, max_videos: Optional[int] = None,
+                         known_bvids: Optional[Set[str]] = None) -> Iterator[Dict]:
+        """
+        Stream formatted videos of a UP master as each page arrives
+        
+        Only one page of raw and formatted videos is held in memory at a
+        time, so arbitrarily large accounts can be processed in constant
+        memory. Rows have the fields listed in video_fields().
+        
+        Args:
+            uid: UP master's UID
+            user_info: Optional user information added to every row
+            max_videos: Maximum number of videos to fetch (None for all)
+            known_bvids: Already collected bvids; only newer videos are fetched
+            
+        Yields:
+            Formatted video dictionaries, newest first
+        """
+        for videos in self.iter_video_pages(uid, max_videos, known_bvids):
+            yield from self.format_video_data(videos, user_info)
+    
+    @staticmethod
+    def _take_new_videos(videos: List[Dict], known_bvids: Optional[Set[str]]) -> List[Dict]:
+        """Return the leading videos of a page that are not in known_bvids"""
+        if not known_bvids:
+            return videos
+        for i, video in enumerate(videos):
+            if video.get('bvid') in known_bvids:
+                return videos[:i]
+        return videos
+    
     def format_video_data(self, videos: List[Dict], user_info: Dict = None) -> List[Dict]:
         """
         Format video data for export
         
+        Only the fields of the scraper's projection are built (see fields).
+        
         Args:
             videos: List of raw video data from API
             user_info: Optional user information
@@ -254,52 +429,148 @@ class BilibiliScraper:
         Returns:
             List of formatted video dictionaries
         """
-        formatted_videos = []
-        
-        for video in videos:
-            formatted_video = {
-                'title': video.get('title', ''),
-                'bvid': video.get('bvid', ''),
-                'aid': video.get('aid', ''),
-                'pic': video.get('pic', ''),
-                'author': video.get('author', ''),
-                'mid': video.get('mid', ''),
-                'play': video.get('play', 0),  # View count
-                'video_review': video.get('video_review', 0),  # Comment count
-                'favorites': video.get('favorites', 0),  # Favorite count
-                'created': self._format_timestamp(video.get('created', 0)),
-                'length': video.get('length', ''),  # Video duration
-                'description': video.get('description', ''),
-            }
+        if self.fields is not None:
+            return self._project_video_data(videos, user_info)
+        
+        with self.hooks.stage('format'):
+            formatted_videos = []
             
-            # Add user info if provided
-            if user_info:
-                formatted_video['up_name'] = user_info.get('name', '')
-                formatted_video['up_face'] = user_info.get('face', '')
-                formatted_video['up_sign'] = user_info.get('sign', '')
-                formatted_video['up_level'] = user_info.get('level', 0)
-                formatted_video['up_fans'] = user_info.get('fans', 0)
+            for video in videos:
+                formatted_video = {
+                    'title': video.get('title', ''),
+                    'bvid': video.get('bvid', ''),
+                    'aid': video.get('aid', ''),
+                    'pic': video.get('pic', ''),
+                    'author': video.get('author', ''),
+                    'mid': video.get('mid', ''),
+                    'play': video.get('play', 0),  # View count
+                    'video_review': video.get('video_review', 0),  # Comment count
+                    'favorites': video.get('favorites', 0),  # Favorite count
+                    'created': self._format_timestamp(video.get('created', 0)),
+                    'length': video.get('length', ''),  # Video duration
+                    'description': video.get('description', ''),
+                }
+                
+                # Add user info if provided
+                if user_info:
+                    formatted_video['up_name'] = user_info.get('name', '')
+                    formatted_video['up_face'] = user_info.get('face', '')
+                    formatted_video['up_sign'] = user_info.get('sign', '')
+                    formatted_video['up_level'] = user_info.get('level', 0)
+                    formatted_video['up_fans'] = user_info.get('fans', 0)
+                    
+                formatted_videos.append(formatted_video)
                 
-            formatted_videos.append(formatted_video)
+        return formatted_videos
+    
+    def _project_video_data(self, videos: List[Dict], user_info: Dict = None) -> List[Dict]:
+        """format_video_data for a field projection or the raw passthrough"""
+        if self.fields == self.RAW_FIELDS:
+            return list(videos)
+        
+        with self.hooks.stage('format'):
+            defaults = VideoTable._DEFAULTS
+            video_fields = [field for field in self.VIDEO_FIELDS if field in self.fields]
+            with_created = 'created' in self.fields
+            up_values = [
+                (field, user_info.get(key, default)) for field, key, default in VideoTable._UP_SOURCES
+                if field in self.fields
+            ] if user_info else []
             
+            formatted_videos = []
+            for video in videos:
+                formatted_video = {field: video.get(field, defaults[field]) for field in video_fields}
+                if with_created:
+                    formatted_video['created'] = self._format_timestamp(formatted_video['created'])
+                formatted_video.update(up_values)
+                formatted_videos.append(formatted_video)
+        
         return formatted_videos
     
+    @classmethod
+    def video_fields(cls, with_user: bool = True) -> List[str]:
+        """Return the field names of a formatted video row, in output order"""
+        return list(cls.VIDEO_FIELDS) + (list(cls.UP_FIELDS) if with_user else [])
+    
+    @classmethod
+    def resolve_fields(cls, fields: Optional[Union[str, Iterable[str]]]) -> Optional[Union[str, List[str]]]:
+        """
+        Validate a field projection
+        
+        Args:
+            fields: Field names (a list or a comma-separated string), RAW_FIELDS or None
+            
+        Returns:
+            The projected fields in output order (with 'bvid'), RAW_FIELDS, or
+            None when every field is kept
+            
+        Raises:
+            ValueError: If a field is not a formatted video field
+        """
+        if fields is None or fields == cls.RAW_FIELDS:
+            return fields
+        if isinstance(fields, str):
+            fields = [field.strip() for field in fields.split(',') if field.strip()]
+        fields = set(fields) | {'bvid'}
+        unknown = fields.difference(cls.video_fields())
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))} "
+                             f"(choose from {', '.join(cls.video_fields())} or '{cls.RAW_FIELDS}')")
+        return [field for field in cls.video_fields() if field in fields]
+    
+    def row_fields(self, with_user: bool = True) -> Optional[List[str]]:
+        """Field names of the rows this scraper formats, in output order (None for raw videos)"""
+        if self.fields == self.RAW_FIELDS:
+            return None
+        fields = self.video_fields(with_user)
+        return fields if self.fields is None else [field for field in fields if field in self.fields]
+    
+    def format_video_table(self, videos: List[Dict], user_info: Dict = None) -> VideoTable:
+        """
+        Format video data into a compact VideoTable
+        
+        The table yields the same rows as format_video_data but stores
+        them column by column, at a fraction of the memory.
+        
+        Args:
+            videos: List of raw video data from API
+            user_info: Optional user information
+            
+        Returns:
+            VideoTable of formatted videos (the raw list with RAW_FIELDS)
+        """
+        if self.fields == self.RAW_FIELDS:
+            # Raw videos have no fixed columns
+            return self.format_video_data(videos, user_info)
+        with self.hooks.stage('format'):
+            return VideoTable.from_raw(videos, user_info, self.fields)
+    
     def _format_timestamp(self, timestamp: int) -> str:
         """Convert timestamp to readable date format"""
         if timestamp:
             return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
         return ''
     
-    def scrape_up_master(self, uid: str, max_videos: Optional[int] = None) -> Dict:
+    def scrape_up_master(self, uid: str, max_videos: Optional[int] = None,
+                         known_bvids: Optional[Set[str]] = None,
+                         checkpoint: Optional[CrawlCheckpoint] = None) -> Dict:
         """
         Scrape complete information for a UP master
         
         Args:
             uid: UP master's UID
             max_videos: Maximum number of videos to fetch
+            known_bvids: Already collected bvids; only newer videos are fetched
+            checkpoint: Optional CrawlCheckpoint; an interrupted crawl resumes
+                after its last checkpointed page
             
         Returns:
             Dictionary containing user info and formatted video list
+            (a VideoTable when the scraper is compact)
+            
+        Raises:
+            IncompleteCrawlError: If a page of the video list could not be
+                fetched (the pages before it stay in the checkpoint)
         """
         print(f"Starting scrape for UP master UID: {uid}")
         
@@ -312,13 +583,16 @@ class BilibiliScraper:
         print(f"UP Master: {user_info.get('name', 'Unknown')}")
         
         # Get all videos
-        videos = self.get_all_user_videos(uid, max_videos)
+        videos = self.get_all_user_videos(uid, max_videos, known_bvids, checkpoint)
         if not videos:
             print("No videos found")
             return {'user_info': user_info, 'videos': []}
             
         # Format video data
-        formatted_videos = self.format_video_data(videos, user_info)
+        if self.compact:
+            formatted_videos = self.format_video_table(videos, user_info)
+        else:
+            formatted_videos = self.format_video_data(videos, user_info)
         
         return {
             'user_info': user_info,
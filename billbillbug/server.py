@@ -0,0 +1,391 @@
+"""
+Scraper daemon for BillBillBug
+
+`python main.py serve` keeps one warm scraper (pooled keep-alive
+connections, WBI keys already fetched) and answers over a local HTTP
+port or a Unix socket:
+
+    GET  /users/<uid>                         user information
+    GET  /users/<uid>/videos?page=1&page_size=50
+                                              one raw page of the video list
+    GET  /users/<uid>/scrape?max_videos=100   user information and formatted videos
+    POST /jobs  {"uid": ..., "max_videos": ...}
+                                              queue a scrape, returns {"id": ...}
+    GET  /jobs/<id>                           job status, and its result once done
+    GET  /stats                               cache and request counters
+
+Responses are kept in an in-memory LRU for `ttl` seconds, and
+concurrent identical requests (same UID, page and page size) are
+coalesced into a single upstream request.
+"""
+
+import itertools
+import os
+import socketserver
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from . import fastjson
+from .scraper import BilibiliScraper
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU with a time-to-live"""
+
+    def __init__(self, max_entries: int = 4096, ttl: float = 60.0):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Entries kept before the least recently used are evicted
+            ttl: Seconds an entry stays fresh (0 disables caching)
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """Return the fresh value of a key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries when full"""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions}
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key
+
+    The first caller runs the function; callers arriving while it runs
+    wait for it and share its result (or exception).
+    """
+
+    def __init__(self):
+        self.coalesced = 0  # Calls answered by another caller's request
+        self._calls: Dict[Hashable, Dict] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Run func for key unless a call for key is already in flight"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event()}
+            else:
+                self.coalesced += 1
+        if not leader:
+            call['done'].wait()
+            if 'error' in call:
+                raise call['error']
+            return call['value']
+
+        try:
+            call['value'] = func()
+            return call['value']
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
+
+class ScraperService:
+    """Cached, coalescing front end to a shared BilibiliScraper"""
+
+    def __init__(self, scraper: BilibiliScraper, cache_size: int = 4096, ttl: float = 60.0,
+                 workers: int = 4, max_jobs: int = 1000):
+        """
+        Initialize the service
+
+        Args:
+            scraper: Scraper shared by every request (it must not be compact)
+            cache_size: Responses kept in the LRU
+            ttl: Seconds a response is served from the LRU
+            workers: Threads running queued scrape jobs
+            max_jobs: Finished jobs kept for GET /jobs/<id>
+        """
+        self.scraper = scraper
+        self.cache = LRUCache(cache_size, ttl)
+        self.flight = SingleFlight()
+        self.max_jobs = max_jobs
+        self.started = time.time()
+        self._jobs: OrderedDict = OrderedDict()  # id -> job dictionary
+        self._job_ids = itertools.count(1)
+        self._jobs_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='billbillbug-job')
+
+    def warm_up(self):
+        """Fetch the WBI keys so the first request does not pay for it"""
+        self.scraper.signer.keys()
+
+    def _cached(self, key: Tuple, fetch: Callable[[], Any]) -> Any:
+        """Serve key from the LRU, or fetch it once however many callers ask"""
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+
+        def load():
+            value = fetch()
+            if value:  # Failures are not cached
+                self.cache.set(key, value)
+            return value
+
+        return self.flight.do(key, load)
+
+    def user_info(self, uid: str) -> Dict:
+        """User information ({} if the API call failed)"""
+        return self._cached(('info', uid), lambda: self.scraper.get_user_info(uid))
+
+    def videos(self, uid: str, page: int = 1, page_size: int = BilibiliScraper.PAGE_SIZE) -> Dict:
+        """One page of the raw video list ({} if the API call failed)"""
+        return self._cached(('page', uid, page, page_size),
+                            lambda: self.scraper.get_user_videos(uid, page=page, page_size=page_size))
+
+    def scrape(self, uid: str, max_videos: Optional[int] = None) -> Dict:
+        """
+        Scrape a UP master like BilibiliScraper.scrape_up_master
+
+        Pages come from the LRU where possible, so a scrape shares its
+        upstream requests with concurrent scrapes and page queries.
+        """
+        return self._cached(('scrape', uid, max_videos), lambda: self._scrape(uid, max_videos))
+
+    def _scrape(self, uid: str, max_videos: Optional[int]) -> Dict:
+        user_info = self.user_info(uid)
+        if not user_info:
+            return {}
+        videos = []
+        page = 1
+        while True:
+            data = self.videos(uid, page)
+            vlist = data.get('list', {}).get('vlist') if data else None
+            if not data:
+                # Fail rather than serve (and cache) an incomplete list
+                print(f"API error on page {page} of UID {uid}")
+                return {}
+            if not vlist:
+                break
+            videos.extend(vlist)
+            if (max_videos and len(videos) >= max_videos) or len(vlist) < BilibiliScraper.PAGE_SIZE:
+                break
+            page += 1
+        videos = videos[:max_videos] if max_videos else videos
+
+        formatted_videos = self.scraper.format_video_data(videos, user_info)
+        return {
+            'user_info': user_info,
+            'videos': formatted_videos,
+            'total_videos': len(formatted_videos),
+            'scrape_time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    def submit(self, uid: str, max_videos: Optional[int] = None) -> Dict:
+        """Queue a scrape job and return its description"""
+        with self._jobs_lock:
+            job = {'id': str(next(self._job_ids)), 'uid': uid, 'max_videos': max_videos,
+                   'status': 'queued', 'submitted': time.time()}
+            self._jobs[job['id']] = job
+            self._prune_jobs()
+            description = self._public(job)
+        self._executor.submit(self._run_job, job)
+        return description
+
+    def _run_job(self, job: Dict):
+        with self._jobs_lock:
+            job['status'] = 'running'
+        try:
+            result = self.scrape(job['uid'], job['max_videos'])
+            outcome = {'status': 'done', 'result': result} if result else \
+                {'status': 'failed', 'error': 'Failed to scrape data'}
+        except Exception as e:
+            outcome = {'status': 'failed', 'error': str(e)}
+        with self._jobs_lock:
+            job.update(outcome, finished=time.time())
+
+    def _prune_jobs(self):
+        """Forget the oldest finished jobs beyond max_jobs (called with the lock held)"""
+        excess = len(self._jobs) - self.max_jobs
+        for job_id in [job_id for job_id, job in self._jobs.items() if 'finished' in job][:max(0, excess)]:
+            del self._jobs[job_id]
+
+    def job(self, job_id: str) -> Optional[Dict]:
+        """Description of a job, with its result once it is done"""
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            return self._public(job, with_result=True) if job else None
+
+    @staticmethod
+    def _public(job: Dict, with_result: bool = False) -> Dict:
+        return {key: value for key, value in job.items() if with_result or key != 'result'}
+
+    def stats(self) -> Dict:
+        """Cache, coalescing and upstream request counters"""
+        with self._jobs_lock:
+            jobs = {}
+            for job in self._jobs.values():
+                jobs[job['status']] = jobs.get(job['status'], 0) + 1
+        return {
+            'uptime_seconds': round(time.time() - self.started, 3),
+            'cache': self.cache.stats(),
+            'coalesced': self.flight.coalesced,
+            'upstream_requests': self.scraper.request_count,
+            'jobs': jobs,
+        }
+
+    def close(self):
+        """Wait for running jobs and release the scraper"""
+        self._executor.shutdown(wait=True)
+        self.scraper.close()
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server listening on a Unix socket"""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)  # Stale socket from a previous run
+        super().server_bind()
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+def make_server(service: ScraperService, host: str = '127.0.0.1', port: int = 8765,
+                unix_socket: Optional[str] = None):
+    """
+    Create the HTTP server for a service
+
+    Args:
+        service: Service answering the requests
+        host: Interface to listen on
+        port: TCP port (0 picks a free port)
+        unix_socket: Path of a Unix socket to listen on instead of host and port
+
+    Returns:
+        A socketserver instance; call serve_forever() on it
+    """
+    handler = _make_handler(service)
+    if unix_socket:
+        handler.disable_nagle_algorithm = False  # TCP only
+        return _UnixHTTPServer(unix_socket, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def _make_handler(service: ScraperService):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            parsed = urllib.parse.urlsplit(self.path)
+            params = dict(urllib.parse.parse_qsl(parsed.query))
+            parts = [part for part in parsed.path.split('/') if part]
+            try:
+                if parts == ['stats']:
+                    return self._reply(200, service.stats())
+                if parts == ['health']:
+                    return self._reply(200, {'status': 'ok'})
+                if len(parts) == 2 and parts[0] == 'jobs':
+                    job = service.job(parts[1])
+                    return self._reply(200, job) if job else self._error(404, 'Unknown job')
+                if len(parts) == 2 and parts[0] == 'users':
+                    return self._result(service.user_info(parts[1]))
+                if len(parts) == 3 and parts[0] == 'users' and parts[2] == 'videos':
+                    page = int(params.get('page', 1))
+                    page_size = int(params.get('page_size', BilibiliScraper.PAGE_SIZE))
+                    if page < 1 or not 1 <= page_size <= BilibiliScraper.PAGE_SIZE:
+                        return self._error(400, 'page must be positive and page_size between 1 and 50')
+                    return self._result(service.videos(parts[1], page, page_size))
+                if len(parts) == 3 and parts[0] == 'users' and parts[2] == 'scrape':
+                    return self._result(service.scrape(parts[1], _max_videos(params.get('max_videos'))))
+            except ValueError as e:
+                return self._error(400, str(e))
+            self._error(404, 'Not found')
+
+        def do_POST(self):
+            parts = [part for part in urllib.parse.urlsplit(self.path).path.split('/') if part]
+            if parts != ['jobs']:
+                return self._error(404, 'Not found')
+            try:
+                body = fastjson.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+                uid = str(body['uid'])
+                job = service.submit(uid, _max_videos(body.get('max_videos')))
+            except (ValueError, KeyError, TypeError) as e:
+                return self._error(400, f"Expected {{\"uid\": ..., \"max_videos\": ...}}: {e}")
+            self._reply(202, job)
+
+        def _result(self, data):
+            if not data:
+                return self._error(502, 'Bilibili API request failed')
+            self._reply(200, data)
+
+        def _error(self, status: int, message: str):
+            self._reply(status, {'error': message})
+
+        def _reply(self, status: int, body):
+            payload = fastjson.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def address_string(self):
+            # Unix socket clients have no address
+            return self.client_address[0] if self.client_address else 'unix'
+
+        def log_message(self, format, *args):
+            pass  # Requests are visible in /stats
+
+    return Handler
+
+
+def _max_videos(value) -> Optional[int]:
+    """Parse a max_videos parameter (None or 0 for all videos)"""
+    if value in (None, ''):
+        return None
+    value = int(value)
+    if value < 0:
+        raise ValueError('max_videos must not be negative')
+    return value or None
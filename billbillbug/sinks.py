@@ -0,0 +1,177 @@
+"""
+Streaming export sinks for BillBillBug
+
+Sinks write rows as they arrive instead of collecting a full dataset
+first. They take a declared schema (the list of field names) up front,
+so CSV headers can be written before the first row. Targets named
+*.gz or *.zst are compressed as they are written (see compress).
+"""
+
+import csv
+import json
+import sys
+from typing import Dict, Iterable, List, Optional, TextIO, Union
+
+from . import fastjson
+from .compress import Compression
+
+# Reused encoder: json.dumps builds a new one on every call with these options
+_encode_line = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def _open_target(target: Union[str, TextIO], compression: Optional[Compression] = None):
+    """Open a sink target; returns (file, should_close). '-' means stdout."""
+    compression = compression or Compression()
+    if target == '-' and not compression:
+        return sys.stdout, False
+    if isinstance(target, str) or compression:
+        # Closing a compressed stdout stream finishes it but leaves stdout open
+        return compression.open(target, newline=''), True
+    return target, False
+
+
+class _Sink:
+    """Common plumbing for streaming sinks"""
+
+    def __init__(self, target: Union[str, TextIO], fields: Optional[List[str]] = None,
+                 compression: Optional[Compression] = None):
+        self.target = target
+        self.fields = list(fields) if fields is not None else None
+        self.count = 0
+        self._file, self._close = _open_target(target, compression)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, row: Dict):
+        """Write one row"""
+        raise NotImplementedError
+
+    def write_many(self, rows: Iterable[Dict]) -> int:
+        """
+        Write rows from any iterable, one at a time
+
+        Args:
+            rows: Row dictionaries (e.g. from BilibiliScraper.iter_user_videos)
+
+        Returns:
+            Number of rows written
+        """
+        written = 0
+        for row in rows:
+            self.write(row)
+            written += 1
+        return written
+
+    def flush(self):
+        """Flush buffered output"""
+        self._file.flush()
+
+    def close(self):
+        """Flush and close the target (stdout and caller-owned files stay open)"""
+        if self._file is None:
+            return
+        if self._close:
+            self._file.close()
+        else:
+            self._file.flush()
+        self._file = None
+
+
+class NDJSONSink(_Sink):
+    """Write rows as newline-delimited JSON"""
+
+    def __init__(self, target: Union[str, TextIO], fields: Optional[List[str]] = None, compact: bool = False,
+                 compression: Optional[Compression] = None):
+        """
+        Open the sink
+
+        Args:
+            target: File path, open text file, or '-' for stdout
+            fields: Optional schema; fields not in it are dropped
+            compact: Omit the spaces after ',' and ':' (and use the fast JSON backend)
+            compression: Level and threads for compressed targets, and the codec for stdout
+        """
+        super().__init__(target, fields, compression)
+        self._encode = fastjson.dumps if compact else _encode_line
+
+    def write(self, row: Dict):
+        """Write one row as a JSON line, keeping only schema fields if declared"""
+        if self.fields is not None:
+            row = {field: row.get(field, '') for field in self.fields}
+        self._file.write(self._encode(row))
+        self._file.write('\n')
+        self.count += 1
+
+
+class JSONArraySink(_Sink):
+    """
+    Write rows as the elements of a JSON array
+
+    The output is identical to json.dump(rows, f, ensure_ascii=False,
+    indent=2) (or compact separators), but rows are encoded one at a
+    time, so the array never has to be held in memory.
+    """
+
+    def __init__(self, target: Union[str, TextIO], fields: Optional[List[str]] = None, compact: bool = False,
+                 level: int = 0, compression: Optional[Compression] = None):
+        """
+        Open the sink and start the array
+
+        Args:
+            target: File path, open text file, or '-' for stdout
+            fields: Optional schema; fields not in it are dropped
+            compact: No indentation and no spaces after separators
+            level: Nesting depth of the array when it is part of an indented
+                document (e.g. 1 for the value of a top-level key)
+            compression: Level and threads for compressed targets, and the codec for stdout
+        """
+        super().__init__(target, fields, compression)
+        self.compact = compact
+        self._indent = None if compact else 2
+        self._newline = '\n' + '  ' * (level + 1)
+        self._end = ']' if compact else '\n' + '  ' * level + ']'
+        self._file.write('[')
+
+    def write(self, row: Dict):
+        """Append one row to the array"""
+        if self.fields is not None:
+            row = {field: row.get(field, '') for field in self.fields}
+        text = fastjson.dumps(row, indent=self._indent)
+        if self.compact:
+            self._file.write(',' + text if self.count else text)
+        else:
+            # Encoded strings never contain raw newlines, so every newline is structural
+            self._file.write((',' if self.count else '') + self._newline + text.replace('\n', self._newline))
+        self.count += 1
+
+    def close(self):
+        """Close the array, then the target"""
+        if self._file is not None:
+            self._file.write(self._end if self.count else ']')
+        super().close()
+
+
+class CSVSink(_Sink):
+    """Write rows as CSV with a declared header"""
+
+    def __init__(self, target: Union[str, TextIO], fields: List[str], compression: Optional[Compression] = None):
+        """
+        Open the sink and write the header
+
+        Args:
+            target: File path, open text file, or '-' for stdout
+            fields: Column names; fields not in the schema are dropped
+            compression: Level and threads for compressed targets, and the codec for stdout
+        """
+        super().__init__(target, fields, compression)
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fields, extrasaction='ignore')
+        self._writer.writeheader()
+
+    def write(self, row: Dict):
+        """Write one row"""
+        self._writer.writerow(row)
+        self.count += 1
@@ -0,0 +1,145 @@
+"""
+Crawl state store for incremental scraping
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Sequence, Set
+
+from . import fastjson
+from .compress import read_bytes
+
+
+class CrawlState:
+    """
+    Remember which videos have already been collected for each UP master
+
+    The state is kept in a small SQLite database holding every known bvid
+    and the newest `created` timestamp seen per UID. Incremental crawls
+    pass the known bvids to the scraper so pagination can stop at the
+    first video that was collected by an earlier run.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the state database
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) if os.path.dirname(path) else '.', exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS known_videos (
+                mid TEXT NOT NULL,
+                bvid TEXT NOT NULL,
+                created INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (mid, bvid)
+            );
+            CREATE TABLE IF NOT EXISTS crawls (
+                mid TEXT PRIMARY KEY,
+                newest_created INTEGER NOT NULL DEFAULT 0,
+                last_crawl TEXT NOT NULL
+            );
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the database"""
+        self._conn.close()
+
+    def known_bvids(self, uid: str) -> Set[str]:
+        """Return every bvid recorded for a UID"""
+        with self._lock:
+            rows = self._conn.execute('SELECT bvid FROM known_videos WHERE mid = ?', (str(uid),))
+            return {row[0] for row in rows}
+
+    def newest_created(self, uid: str) -> int:
+        """Return the newest publish timestamp recorded for a UID (0 if never crawled)"""
+        with self._lock:
+            row = self._conn.execute('SELECT newest_created FROM crawls WHERE mid = ?', (str(uid),)).fetchone()
+            return row[0] if row else 0
+
+    def record_videos(self, uid: str, videos: List[Dict]):
+        """
+        Record collected videos for a UID
+
+        Args:
+            uid: UP master's UID
+            videos: Raw or formatted video dictionaries (need 'bvid' and 'created')
+        """
+        rows = [(str(uid), video['bvid'], self._to_timestamp(video.get('created')))
+                for video in videos if video.get('bvid')]
+        newest = max((row[2] for row in rows), default=0)
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO known_videos (mid, bvid, created) VALUES (?, ?, ?)', rows
+            )
+            self._conn.execute(
+                'INSERT INTO crawls (mid, newest_created, last_crawl) VALUES (?, ?, ?) '
+                'ON CONFLICT(mid) DO UPDATE SET '
+                'newest_created = MAX(newest_created, excluded.newest_created), '
+                'last_crawl = excluded.last_crawl',
+                (str(uid), newest, now)
+            )
+
+    def forget(self, uid: str):
+        """Drop everything recorded for a UID so the next crawl is a full one"""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM known_videos WHERE mid = ?', (str(uid),))
+            self._conn.execute('DELETE FROM crawls WHERE mid = ?', (str(uid),))
+
+    @staticmethod
+    def _to_timestamp(created) -> int:
+        """Accept both raw API timestamps and formatted 'created' strings"""
+        if not created:
+            return 0
+        if isinstance(created, str):
+            return int(datetime.strptime(created, '%Y-%m-%d %H:%M:%S').timestamp())
+        return int(created)
+
+
+def load_previous_videos(filename: str) -> List[Dict]:
+    """
+    Load the video list of a previous JSON export
+
+    Args:
+        filename: JSON file written by DataExporter.export_to_json (.gz and
+            .zst files are decompressed)
+
+    Returns:
+        List of formatted video dictionaries (empty if the file does not exist)
+    """
+    if not os.path.exists(filename):
+        return []
+    return fastjson.loads(read_bytes(filename)).get('videos', [])
+
+
+def merge_videos(new_videos: Sequence[Dict], previous_videos: List[Dict]) -> List[Dict]:
+    """
+    Merge newly crawled videos into a previous dataset
+
+    New videos come first, matching the newest-first order of the listing.
+    Previous entries with the same bvid are replaced by the new ones.
+
+    Args:
+        new_videos: Formatted videos from the incremental crawl (a list or VideoTable)
+        previous_videos: Formatted videos from the previous dataset
+
+    Returns:
+        Merged list of formatted video dictionaries
+    """
+    new_bvids = {video.get('bvid') for video in new_videos}
+    return list(new_videos) + [video for video in previous_videos if video.get('bvid') not in new_bvids]
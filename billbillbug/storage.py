@@ -0,0 +1,208 @@
+"""
+SQLite storage backend for BillBillBug
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Optional
+
+
+def _to_int(value) -> Optional[int]:
+    """Convert a counter to int; placeholders such as '--' become NULL"""
+    if type(value) is int:
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SQLiteExporter:
+    """
+    Store scraped data in normalized SQLite tables
+
+    Users are keyed on `mid` and videos on `bvid`. Writes are upserts,
+    so re-crawling a UP master updates its rows in place. Videos are
+    written with batched executemany calls inside a single transaction,
+    and the database runs in WAL mode so readers are not blocked.
+    """
+
+    USER_COLUMNS = (
+        'mid', 'name', 'sex', 'face', 'sign', 'level', 'birthday', 'coins',
+        'fans', 'friend', 'attention', 'total_videos', 'scrape_time',
+    )
+    VIDEO_COLUMNS = (
+        'bvid', 'aid', 'mid', 'title', 'pic', 'author', 'play', 'video_review',
+        'favorites', 'created', 'length', 'description', 'updated_at',
+    )
+    INT_COLUMNS = frozenset([
+        'mid', 'level', 'coins', 'fans', 'friend', 'attention', 'total_videos',
+        'aid', 'play', 'video_review', 'favorites',
+    ])
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            mid INTEGER PRIMARY KEY,
+            name TEXT,
+            sex TEXT,
+            face TEXT,
+            sign TEXT,
+            level INTEGER,
+            birthday TEXT,
+            coins INTEGER,
+            fans INTEGER,
+            friend INTEGER,
+            attention INTEGER,
+            total_videos INTEGER,
+            scrape_time TEXT
+        );
+        CREATE TABLE IF NOT EXISTS videos (
+            bvid TEXT PRIMARY KEY,
+            aid INTEGER,
+            mid INTEGER,
+            title TEXT,
+            pic TEXT,
+            author TEXT,
+            play INTEGER,
+            video_review INTEGER,
+            favorites INTEGER,
+            created TEXT,
+            length TEXT,
+            description TEXT,
+            updated_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_videos_mid ON videos (mid);
+        CREATE INDEX IF NOT EXISTS idx_videos_created ON videos (created);
+        CREATE INDEX IF NOT EXISTS idx_videos_play ON videos (play);
+    """
+
+    def __init__(self, path: str, batch_size: int = 10000):
+        """
+        Open (or create) the database
+
+        Args:
+            path: SQLite database file
+            batch_size: Rows per executemany call
+        """
+        self.path = path
+        self.batch_size = batch_size
+
+        os.makedirs(os.path.dirname(path) if os.path.dirname(path) else '.', exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+
+        self._user_sql = self._upsert_sql('users', self.USER_COLUMNS, 'mid')
+        self._video_sql = self._upsert_sql('videos', self.VIDEO_COLUMNS, 'bvid')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the database"""
+        self._conn.close()
+
+    @staticmethod
+    def _upsert_sql(table: str, columns, key: str) -> str:
+        """Build an INSERT ... ON CONFLICT DO UPDATE statement"""
+        updates = ', '.join(f"{column} = excluded.{column}" for column in columns if column != key)
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT({key}) DO UPDATE SET {updates}"
+        )
+
+    def _row(self, columns, values: Dict[str, Any]) -> tuple:
+        """Convert a dictionary to a parameter tuple in column order"""
+        return tuple(
+            _to_int(values.get(column)) if column in self.INT_COLUMNS else values.get(column)
+            for column in columns
+        )
+
+    def upsert_user(self, user_info: Dict, scrape_time: str = '', total_videos: int = 0):
+        """
+        Insert or update one user
+
+        Args:
+            user_info: User information from BilibiliScraper.get_user_info
+            scrape_time: Time of the crawl
+            total_videos: Number of videos collected
+        """
+        values = dict(user_info, scrape_time=scrape_time, total_videos=total_videos)
+        with self._conn:
+            self._conn.execute(self._user_sql, self._row(self.USER_COLUMNS, values))
+
+    def upsert_videos(self, videos: Iterable[Dict], mid: Any = None,
+                      fields: Optional[Iterable[str]] = None) -> int:
+        """
+        Insert or update videos in one transaction
+
+        Args:
+            videos: Formatted video dictionaries (any iterable, consumed in batches)
+            mid: UP master UID to use for rows without their own `mid`
+            fields: Video fields the rows were projected to (default: all);
+                only these columns are written, so existing rows keep the
+                stored values of the others
+
+        Returns:
+            Number of rows written
+        """
+        updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if fields is None:
+            sql = self._video_sql
+            rows = (
+                (
+                    video.get('bvid'), _to_int(video.get('aid')), _to_int(video.get('mid') or mid),
+                    video.get('title'), video.get('pic'), video.get('author'),
+                    _to_int(video.get('play')), _to_int(video.get('video_review')), _to_int(video.get('favorites')),
+                    video.get('created'), video.get('length'), video.get('description'), updated_at,
+                )
+                for video in videos
+            )
+        else:
+            # The key and the owning UP master are always known, whatever the projection
+            fields = set(fields)
+            projected = [column for column in self.VIDEO_COLUMNS[:-1]
+                         if column in fields and column not in ('bvid', 'mid')]
+            sql = self._upsert_sql('videos', ['bvid', 'mid'] + projected + ['updated_at'], 'bvid')
+            ints = [column in self.INT_COLUMNS for column in projected]
+            rows = (
+                (video.get('bvid'), _to_int(video.get('mid') or mid))
+                + tuple(_to_int(video.get(column)) if is_int else video.get(column)
+                        for column, is_int in zip(projected, ints))
+                + (updated_at,)
+                for video in videos
+            )
+
+        written = 0
+        with self._conn:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self._conn.executemany(sql, batch)
+                written += len(batch)
+        return written
+
+    def export(self, data: Dict[str, Any], fields: Optional[Iterable[str]] = None) -> str:
+        """
+        Store a scrape result (user info plus videos)
+
+        Args:
+            data: Data dictionary from BilibiliScraper.scrape_up_master
+            fields: Video fields the rows were projected to (default: all)
+
+        Returns:
+            Path to the database
+        """
+        user_info = data.get('user_info', {})
+        if user_info:
+            self.upsert_user(user_info, data.get('scrape_time', ''), data.get('total_videos', 0))
+        self.upsert_videos(data.get('videos', []), mid=user_info.get('mid'), fields=fields)
+        return self.path
@@ -0,0 +1,220 @@
+"""
+Compact columnar storage for formatted video rows
+"""
+
+import sys
+import time
+from array import array
+from collections.abc import Sequence
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class VideoTable(Sequence):
+    """
+    Array-backed table of videos that behaves like a list of row dicts
+
+    Counters are stored in int64 arrays, `created` as epoch seconds and
+    repeated strings (author, length) are interned; the `up_*` fields
+    are not stored per row at all but derived from the table's single
+    user_info. Values that do not fit their column type (e.g. the '--'
+    placeholder the API uses for hidden counters) are kept exactly as
+    they are in a small side table.
+
+    Rows are built on demand: indexing and iteration return plain dicts
+    identical to BilibiliScraper.format_video_data output, so a table
+    can be used anywhere a list of formatted videos is expected. A table
+    built with a field projection only stores the projected columns.
+    """
+
+    # Fields of a formatted video row, in output order
+    VIDEO_FIELDS = (
+        'title', 'bvid', 'aid', 'pic', 'author', 'mid', 'play', 'video_review',
+        'favorites', 'created', 'length', 'description',
+    )
+    UP_FIELDS = ('up_name', 'up_face', 'up_sign', 'up_level', 'up_fans')
+
+    INT_FIELDS = ('aid', 'mid', 'play', 'video_review', 'favorites', 'created')
+    STR_FIELDS = ('title', 'bvid', 'pic', 'author', 'length', 'description')
+    INTERNED_FIELDS = frozenset(['author', 'length'])
+
+    # (row field, user_info key, default) of the per-UP columns
+    _UP_SOURCES = (
+        ('up_name', 'name', ''), ('up_face', 'face', ''), ('up_sign', 'sign', ''),
+        ('up_level', 'level', 0), ('up_fans', 'fans', 0),
+    )
+    # Defaults of format_video_data for missing raw values
+    _DEFAULTS = {
+        'title': '', 'bvid': '', 'aid': '', 'pic': '', 'author': '', 'mid': '',
+        'play': 0, 'video_review': 0, 'favorites': 0, 'created': 0, 'length': '', 'description': '',
+    }
+
+    def __init__(self, user_info: Optional[Dict] = None, fields: Optional[Iterable[str]] = None):
+        """
+        Create an empty table
+
+        Args:
+            user_info: UP master information added to every row (as the up_* fields)
+            fields: Fields to keep (default: all of VIDEO_FIELDS and UP_FIELDS);
+                rows keep the order of VIDEO_FIELDS and UP_FIELDS
+        """
+        self.user_info = user_info or {}
+        projection = None if fields is None else set(fields)
+        self._video_fields = tuple(field for field in self.VIDEO_FIELDS if projection is None or field in projection)
+        self._ints = {field: array('q') for field in self.INT_FIELDS if field in self._video_fields}
+        self._strs = {field: [] for field in self.STR_FIELDS if field in self._video_fields}
+        self._length = 0
+        self._odd: Dict[tuple, Any] = {}  # (field, row) -> value that does not fit the column
+        self._odd_rows = set()
+        self._columns = [
+            (field, self._ints[field] if field in self._ints else self._strs[field])
+            for field in self._video_fields
+        ]
+        self._up_values = tuple(
+            (field, self.user_info.get(key, default)) for field, key, default in self._UP_SOURCES
+            if projection is None or field in projection
+        ) if self.user_info else ()
+
+    @classmethod
+    def from_raw(cls, videos: Iterable[Dict], user_info: Optional[Dict] = None,
+                 fields: Optional[Iterable[str]] = None) -> 'VideoTable':
+        """
+        Build a table from raw API videos (the input of format_video_data)
+
+        Args:
+            videos: Raw video dictionaries from the video listing API
+            user_info: Optional user information
+            fields: Fields to keep (default: all)
+        """
+        table = cls(user_info, fields)
+        table.extend(videos)
+        return table
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict], user_info: Optional[Dict] = None,
+                  fields: Optional[Iterable[str]] = None) -> 'VideoTable':
+        """
+        Build a table from formatted rows (the output of format_video_data)
+
+        Args:
+            rows: Formatted video dictionaries
+            user_info: User information; recovered from the up_* fields when omitted
+            fields: Fields to keep (default: all)
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return cls(user_info, fields)
+        if user_info is None and any(field in first for field in cls.UP_FIELDS):
+            user_info = {key: first.get(field) for field, key, _ in cls._UP_SOURCES if field in first}
+
+        table = cls(user_info, fields)
+        for row in chain([first], rows):
+            created = row.get('created', '')
+            table._append(row, _parse_created(created) if isinstance(created, str) else created)
+        return table
+
+    def append(self, video: Dict):
+        """Add one raw API video"""
+        self._append(video, video.get('created', 0))
+
+    def extend(self, videos: Iterable[Dict]):
+        """Add raw API videos"""
+        for video in videos:
+            self._append(video, video.get('created', 0))
+
+    def _append(self, video: Dict, created: Any):
+        row = len(self)
+        defaults = self._DEFAULTS
+        for field, column in self._ints.items():
+            value = created if field == 'created' else video.get(field, defaults[field])
+            if type(value) is int and -0x8000000000000000 <= value <= 0x7fffffffffffffff:
+                column.append(value)
+            else:
+                column.append(0)
+                self._odd[(field, row)] = value
+                self._odd_rows.add(row)
+        for field, column in self._strs.items():
+            value = video.get(field, defaults[field])
+            if type(value) is not str:
+                self._odd[(field, row)] = value
+                self._odd_rows.add(row)
+                value = ''
+            elif field in self.INTERNED_FIELDS:
+                value = sys.intern(value)
+            column.append(value)
+        self._length += 1
+
+    @property
+    def fields(self) -> List[str]:
+        """Column names of the rows, in output order"""
+        return list(self._video_fields) + [field for field, _ in self._up_values]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('VideoTable index out of range')
+        return self._row(index)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self._row(i)
+
+    def __repr__(self) -> str:
+        return f"VideoTable({len(self)} videos, user={self.user_info.get('name', '')!r})"
+
+    def _row(self, row: int) -> Dict:
+        """Build the formatted dictionary of one row"""
+        video = {field: column[row] for field, column in self._columns}
+        if 'created' in video:
+            video['created'] = _format_created(video['created'])
+        if row in self._odd_rows:
+            for field in self._video_fields:
+                if (field, row) in self._odd:
+                    value = self._odd[(field, row)]
+                    video[field] = _format_created(value) if field == 'created' and not isinstance(value, str) else value
+        video.update(self._up_values)
+        return video
+
+    def column(self, field: str) -> List[Any]:
+        """
+        All values of one column, as they appear in the rows
+
+        Args:
+            field: One of fields
+        """
+        if field in self.UP_FIELDS:
+            return [dict(self._up_values).get(field)] * len(self)
+        if field not in self._video_fields:
+            raise KeyError(field)
+        return [video[field] for video in self]
+
+    def to_dicts(self) -> List[Dict]:
+        """Convert to a list of formatted video dictionaries"""
+        return list(self)
+
+
+def _format_created(timestamp) -> str:
+    """Format a publish time like BilibiliScraper._format_timestamp"""
+    if timestamp:
+        return time.strftime(_TIME_FORMAT, time.localtime(timestamp))
+    return ''
+
+
+def _parse_created(value: str):
+    """Epoch seconds of a formatted publish time, or the string itself if it does not round-trip"""
+    if not value:
+        return 0
+    try:
+        timestamp = int(time.mktime(time.strptime(value, _TIME_FORMAT)))
+    except (ValueError, OverflowError):
+        return value
+    return timestamp if _format_created(timestamp) == value else value
@@ -0,0 +1,290 @@
+"""
+Video statistics time series for BillBillBug
+
+Every crawl is a snapshot of the counters; StatsStore keeps them all, so
+view, comment and favorite growth can be tracked per video. Points are
+appended to one raw little-endian file per column (series id, timestamp
+and one int64 file per counter) and queried through NumPy memory maps,
+so tens of millions of points are never loaded into RAM at once.
+
+Requires the optional numpy dependency (pip install numpy).
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional
+    np = None
+
+from .analytics import _count
+from .table import VideoTable
+
+
+def _require_numpy():
+    """Raise a helpful error when numpy is not installed"""
+    if np is None:
+        raise ImportError("The time-series store requires numpy: pip install numpy")
+
+
+class StatsStore:
+    """
+    Append-only columnar store of video counters, indexed by (bvid, timestamp)
+
+    Each append() is one crawl and carries a single timestamp, and
+    timestamps never go backwards, so the timestamp column is sorted and
+    a time range is found by binary search; the videos of a UID are then
+    picked out of that range by series id. Counters missing from a row
+    (e.g. the detail counters without --enrich) are stored as -1 and
+    skipped by the queries.
+    """
+
+    # Counters recorded for every video (the last five come from --enrich)
+    FIELDS = ('play', 'video_review', 'favorites', 'like', 'coin', 'share', 'reply', 'danmaku')
+    MISSING = -1
+
+    # Column file -> dtype; counters are stored in '<field>.i8'
+    SERIES_COLUMN = ('series.i4', '<i4')
+    TIME_COLUMN = ('time.i8', '<i8')
+
+    def __init__(self, directory: str):
+        """
+        Open (or create) the store
+
+        Args:
+            directory: Directory holding the column files and the series list
+        """
+        _require_numpy()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._columns = dict([self.SERIES_COLUMN, self.TIME_COLUMN],
+                             **{f"{field}.i8": '<i8' for field in self.FIELDS})
+        self._maps: Dict[str, 'np.ndarray'] = {}
+        self._mapped = 0  # Point count the memory maps were made for
+
+        # Series ids are line numbers of series.tsv ("mid<TAB>bvid")
+        self._bvids: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._by_mid: Dict[str, List[int]] = {}
+        self._series_file = os.path.join(directory, 'series.tsv')
+        if os.path.exists(self._series_file):
+            with open(self._series_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.endswith('\n'):
+                        mid, bvid = line[:-1].split('\t')
+                        self._add_series(mid, bvid)
+
+        self._points = self._repair()
+        self._last_time = int(self._column('time.i8')[-1]) if self._points else None
+
+    def _path(self, column: str) -> str:
+        return os.path.join(self.directory, column)
+
+    def _repair(self) -> int:
+        """Cut every column to the points fully written to all of them (after a crash mid-append)"""
+        sizes = {column: np.dtype(dtype).itemsize for column, dtype in self._columns.items()}
+        lengths = {column: os.path.getsize(self._path(column)) if os.path.exists(self._path(column)) else 0
+                   for column in sizes}
+        count = min(lengths[column] // size for column, size in sizes.items())
+        for column, size in sizes.items():
+            if lengths[column] != count * size:
+                with open(self._path(column), 'r+b') as f:
+                    f.truncate(count * size)
+        return count
+
+    def _add_series(self, mid: str, bvid: str) -> int:
+        series = len(self._bvids)
+        self._bvids.append(bvid)
+        self._ids[bvid] = series
+        self._by_mid.setdefault(mid, []).append(series)
+        return series
+
+    def __len__(self) -> int:
+        return self._points
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Release the memory maps"""
+        with self._lock:
+            self._maps = {}
+
+    def append(self, videos: Iterable[Dict], timestamp: Optional[float] = None) -> int:
+        """
+        Append the counters of one crawl
+
+        Args:
+            videos: Formatted video rows (or a VideoTable)
+            timestamp: Crawl time in seconds (default: now); must not be
+                earlier than the previous append
+
+        Returns:
+            Number of points appended
+        """
+        videos = videos.to_dicts() if isinstance(videos, VideoTable) else videos
+        with self._lock:
+            if timestamp is None:
+                # Concurrent appends (and a clock stepping back) must not break the time order
+                timestamp = max(int(time.time()), self._last_time or 0)
+            timestamp = int(timestamp)
+            if self._last_time is not None and timestamp < self._last_time:
+                raise ValueError(f"Timestamp {timestamp} is earlier than the last append ({self._last_time})")
+
+            new_series = []
+            series = []
+            rows = []
+            for video in videos:
+                bvid = video.get('bvid')
+                if not bvid:
+                    continue
+                if bvid not in self._ids:
+                    mid = str(video.get('mid', ''))
+                    self._add_series(mid, bvid)
+                    new_series.append(f"{mid}\t{bvid}\n")
+                series.append(self._ids[bvid])
+                rows.append(video)
+            if not rows:
+                return 0
+
+            if new_series:
+                with open(self._series_file, 'a', encoding='utf-8') as f:
+                    f.writelines(new_series)
+
+            # The series column is written last: a point exists once all its columns do
+            for field in self.FIELDS:
+                values = [_count(row.get(field)) for row in rows]
+                self._write(f"{field}.i8", np.array([self.MISSING if value is None else value for value in values],
+                                                    dtype='<i8'))
+            self._write('time.i8', np.full(len(rows), timestamp, dtype='<i8'))
+            self._write('series.i4', np.array(series, dtype='<i4'))
+
+            self._points += len(rows)
+            self._last_time = timestamp
+            return len(rows)
+
+    def _write(self, column: str, values: 'np.ndarray'):
+        with open(self._path(column), 'ab') as f:
+            f.write(values.tobytes())
+
+    def _column(self, column: str) -> 'np.ndarray':
+        """Read-only memory map of a column (remapped after appends)"""
+        if self._mapped != self._points:
+            self._maps = {}
+            self._mapped = self._points
+        if column not in self._maps:
+            if not self._points:
+                return np.empty(0, dtype=self._columns[column])
+            self._maps[column] = np.memmap(self._path(column), dtype=self._columns[column], mode='r',
+                                           shape=(self._points,))
+        return self._maps[column]
+
+    def _range(self, start: Optional[float], end: Optional[float]) -> slice:
+        """Positions of the points with start <= timestamp <= end"""
+        times = self._column('time.i8')
+        lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        hi = self._points if end is None else int(np.searchsorted(times, end, side='right'))
+        return slice(lo, hi)
+
+    def series(self, bvid: str, field: str = 'play', start: Optional[float] = None,
+               end: Optional[float] = None) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Counter history of one video
+
+        Args:
+            bvid: Video BV id
+            field: One of FIELDS
+            start: Earliest timestamp (inclusive)
+            end: Latest timestamp (inclusive)
+
+        Returns:
+            (timestamps, values) arrays, oldest first
+        """
+        with self._lock:
+            series = self._ids.get(bvid)
+            if series is None:
+                return np.empty(0, dtype='<i8'), np.empty(0, dtype='<i8')
+            span = self._range(start, end)
+            values = self._column(f"{field}.i8")[span]
+            mask = (self._column('series.i4')[span] == series) & (values != self.MISSING)
+            return np.array(self._column('time.i8')[span][mask]), np.array(values[mask])
+
+    def points(self, uid: Optional[str] = None, start: Optional[float] = None, end: Optional[float] = None,
+               fields: Iterable[str] = FIELDS) -> Dict[str, 'np.ndarray']:
+        """
+        All points in a time range, optionally only of one UP master's videos
+
+        Returns:
+            Dictionary of equally long arrays: 'bvid', 'timestamp' and one per field
+        """
+        with self._lock:
+            span = self._range(start, end)
+            series = self._column('series.i4')[span]
+            mask = self._select(series, uid)
+            series = np.array(series[mask] if mask is not None else series)
+            result = {
+                'bvid': np.array(self._bvids, dtype=object)[series] if len(series) else np.empty(0, dtype=object),
+                'timestamp': np.array(self._column('time.i8')[span][mask] if mask is not None
+                                      else self._column('time.i8')[span]),
+            }
+            for field in fields:
+                values = self._column(f"{field}.i8")[span]
+                result[field] = np.array(values[mask] if mask is not None else values)
+            return result
+
+    def _select(self, series: 'np.ndarray', uid: Optional[str]) -> Optional['np.ndarray']:
+        """Mask of the points belonging to a UID (None selects everything)"""
+        if uid is None:
+            return None
+        return np.isin(series, np.array(self._by_mid.get(str(uid), []), dtype='<i4'))
+
+    def rates(self, uid: Optional[str] = None, field: str = 'play', window: float = 86400,
+              now: Optional[float] = None, per: float = 3600) -> Dict[str, float]:
+        """
+        Growth rate of a counter over a recent window, per video
+
+        The rate of a video is the change between its first and last point
+        in the window divided by the time between them, so at least two
+        crawls must fall in the window.
+
+        Args:
+            uid: Only videos of this UP master (default: every video)
+            field: One of FIELDS
+            window: Window length in seconds, ending at now
+            now: End of the window (default: time.time())
+            per: Rate unit in seconds (default: per hour)
+
+        Returns:
+            Dictionary of bvid -> growth per `per` seconds
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            span = self._range(now - window, now)
+            series = self._column('series.i4')[span]
+            times = self._column('time.i8')[span]
+            values = self._column(f"{field}.i8")[span]
+            mask = values != self.MISSING
+            selected = self._select(series, uid)
+            if selected is not None:
+                mask &= selected
+            series, times, values = series[mask], times[mask], values[mask]
+            if not len(series):
+                return {}
+
+            # Points are in time order: the first occurrence of a series is its oldest point
+            ids, first = np.unique(series, return_index=True)
+            _, last = np.unique(series[::-1], return_index=True)
+            last = len(series) - 1 - last
+            elapsed = times[last] - times[first]
+            growth = (values[last] - values[first]) * per / np.maximum(elapsed, 1)
+            return {self._bvids[series_id]: float(rate)
+                    for series_id, rate, seconds in zip(ids.tolist(), growth.tolist(), elapsed.tolist())
+                    if seconds > 0}
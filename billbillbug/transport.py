@@ -0,0 +1,265 @@
+"""
+HTTP transports for BillBillBug
+
+A transport sends one GET request and returns the decoded JSON body
+(using orjson when installed, see fastjson), raising requests
+exceptions on failure so the retry policy can classify them whatever
+the backend. Two are available:
+
+- RequestsTransport: a requests session with a connection pool sized to
+  the number of workers and kept alive between requests (the default)
+- HttpxTransport: an httpx client speaking HTTP/2, which multiplexes
+  concurrent page requests over a single connection per host
+  (pip install 'httpx[http2]')
+
+Both count requests, bytes on the wire, decoded body bytes, time spent
+and TCP connections opened.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from . import fastjson
+
+try:
+    import httpx
+except ImportError:  # httpx is optional
+    httpx = None
+
+
+# Headers sent with every request. ACCEPT_ENCODING lists every encoding
+# urllib3 can decode here, so br is only offered when brotli is installed.
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Referer': 'https://www.bilibili.com/',
+    'Accept-Encoding': ACCEPT_ENCODING,
+}
+
+
+class TransportStats:
+    """Thread-safe request counters shared by the transports"""
+
+    def __init__(self):
+        self.requests = 0
+        self.wire_bytes = 0  # As transferred, i.e. compressed
+        self.body_bytes = 0  # After decompression
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, wire_bytes: int, body_bytes: int):
+        """Record one completed request"""
+        with self._lock:
+            self.requests += 1
+            self.wire_bytes += wire_bytes
+            self.body_bytes += body_bytes
+            self.seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'wire_bytes': self.wire_bytes,
+                'body_bytes': self.body_bytes,
+                'bytes_per_request': round(self.wire_bytes / self.requests) if self.requests else 0,
+                'mean_ms': round(self.seconds / self.requests * 1000, 2) if self.requests else 0.0,
+                'max_ms': round(self.max_seconds * 1000, 2),
+            }
+
+
+class RequestsTransport:
+    """Transport backed by a tuned requests session"""
+
+    def __init__(self, pool_size: int = 10, headers: Optional[Dict] = None, block: bool = False):
+        """
+        Initialize the transport
+
+        Args:
+            pool_size: Keep-alive connections kept per host; should be at least
+                the number of threads sending requests, or connections are
+                opened and thrown away under load
+            headers: Headers to send instead of DEFAULT_HEADERS
+            block: Never open more than pool_size connections to one host;
+                extra requests wait for a free connection instead
+        """
+        self.block = block
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        self._stats = TransportStats()
+        self._retired_connections = 0  # Opened by pools that have since been closed
+        self.set_pool_size(pool_size)
+
+    def set_pool_size(self, pool_size: int):
+        """Replace the connection pools with ones holding pool_size connections per host"""
+        self.pool_size = max(1, pool_size)
+        self._retired_connections += self._pool_connections()
+        for adapter in set(self.session.adapters.values()):
+            adapter.close()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size,
+                              pool_block=self.block)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get_json(self, url: str, params: dict = None, timeout: float = 10, meta: Optional[Dict] = None) -> dict:
+        """
+        Send a GET request and decode the JSON body
+
+        Args:
+            url: Request URL
+            params: Query parameters
+            timeout: Timeout in seconds
+            meta: Optional dictionary that receives the HTTP 'status' (also for
+                HTTP errors) and the 'bytes' received
+
+        Raises:
+            requests.RequestException: The request failed or returned an HTTP error
+        """
+        started = time.perf_counter()
+        response = self.session.get(url, params=params, timeout=timeout)
+        if meta is not None:
+            meta['status'] = response.status_code
+        response.raise_for_status()
+        data = _decode(response)
+
+        body_bytes = len(response.content)
+        try:
+            wire_bytes = int(response.raw.tell())  # Bytes read from the socket
+        except (AttributeError, TypeError, ValueError):
+            wire_bytes = body_bytes
+        self._stats.record(time.perf_counter() - started, wire_bytes or body_bytes, body_bytes)
+        if meta is not None:
+            meta['bytes'] = wire_bytes or body_bytes
+        return data
+
+    def connections(self) -> int:
+        """Number of connections opened so far"""
+        return self._retired_connections + self._pool_connections()
+
+    def _pool_connections(self) -> int:
+        """Connections opened by the current pools"""
+        total = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+            if pools is None:
+                continue
+            for key in pools.keys():
+                pool = pools.get(key)
+                total += getattr(pool, 'num_connections', 0) if pool else 0
+        return total
+
+    def stats(self) -> Dict:
+        """Request, byte and timing counters, plus 'connections' opened"""
+        return dict(self._stats.as_dict(), connections=self.connections())
+
+    def close(self):
+        """Close all pooled connections"""
+        self._retired_connections += self._pool_connections()
+        self.session.close()
+
+
+class HttpxTransport:
+    """Transport backed by an httpx client, using HTTP/2 by default"""
+
+    def __init__(self, pool_size: int = 10, headers: Optional[Dict] = None, http2: bool = True):
+        """
+        Initialize the transport
+
+        Args:
+            pool_size: Maximum open connections (with HTTP/2 one per host is
+                normally enough, since requests are multiplexed over it)
+            headers: Headers to send instead of DEFAULT_HEADERS
+            http2: Negotiate HTTP/2 (needs the h2 package); HTTP/1.1 otherwise
+        """
+        if httpx is None:
+            raise ImportError("HttpxTransport requires httpx. Install with: pip install 'httpx[http2]'")
+        self.http2 = http2
+        self.headers = dict(headers or DEFAULT_HEADERS)
+        self._stats = TransportStats()
+        self._connections = 0
+        self._lock = threading.Lock()
+        self.client = None
+        self.set_pool_size(pool_size)
+
+    def set_pool_size(self, pool_size: int):
+        """Replace the client with one allowing pool_size open connections"""
+        self.pool_size = max(1, pool_size)
+        if self.client is not None:
+            self.client.close()
+        self.client = httpx.Client(
+            http2=self.http2,
+            headers=self.headers,
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+        )
+
+    def _trace(self, event: str, info: Dict):
+        """httpcore trace callback; counts TCP connections as they are established"""
+        if event == 'connection.connect_tcp.complete':
+            with self._lock:
+                self._connections += 1
+
+    def get_json(self, url: str, params: dict = None, timeout: float = 10, meta: Optional[Dict] = None) -> dict:
+        """
+        Send a GET request and decode the JSON body
+
+        httpx errors are re-raised as the matching requests exceptions;
+        meta is filled in like RequestsTransport.get_json does.
+
+        Raises:
+            requests.RequestException: The request failed or returned an HTTP error
+        """
+        started = time.perf_counter()
+        try:
+            response = self.client.get(url, params=params, timeout=timeout, extensions={'trace': self._trace})
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e)) from e
+
+        if meta is not None:
+            meta['status'] = response.status_code
+            meta['bytes'] = response.num_bytes_downloaded
+        if response.is_error:
+            raise requests.HTTPError(
+                f"{response.status_code} Error for url: {response.url}",
+                response=_to_requests_response(response),
+            )
+        data = _decode(response)
+
+        self._stats.record(time.perf_counter() - started, response.num_bytes_downloaded, len(response.content))
+        return data
+
+    def connections(self) -> int:
+        """Number of connections opened so far"""
+        return self._connections
+
+    def stats(self) -> Dict:
+        """Request, byte and timing counters, plus 'connections' opened"""
+        return dict(self._stats.as_dict(), connections=self.connections(), http2=self.http2)
+
+    def close(self):
+        """Close all pooled connections"""
+        self.client.close()
+
+
+def _decode(response):
+    """Decode a JSON body with the fast JSON backend, failing like response.json()"""
+    try:
+        return fastjson.loads(response.content)
+    except ValueError as e:
+        raise requests.exceptions.JSONDecodeError(str(e), response.text, 0) from e
+
+
+def _to_requests_response(response) -> requests.Response:
+    """Copy the parts of an httpx response that error handling looks at"""
+    converted = requests.Response()
+    converted.status_code = response.status_code
+    converted.headers.update(response.headers)
+    converted.url = str(response.url)
+    converted._content = response.content
+    return converted
@@ -0,0 +1,211 @@
+"""
+WBI request signing for the Bilibili API
+See: https://socialsisteryi.github.io/bilibili-API-collect/docs/misc/sign/wbi.html
+"""
+
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+from typing import Callable, List, Optional, Tuple
+
+# WBI signature encoding table
+MIXIN_KEY_ENC_TAB = [
+    46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49,
+    33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40,
+    61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
+    36, 20, 34, 44, 52
+]
+
+# Characters removed from parameter values before signing
+_FILTERED_CHARS = str.maketrans('', '', "!'()*")
+
+DEFAULT_KEY_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'billbillbug', 'wbi_keys.json')
+
+
+@functools.lru_cache(maxsize=16)
+def get_mixin_key(img_key: str, sub_key: str) -> str:
+    """Get mixin key for WBI signing (computed once per key pair)"""
+    orig = img_key + sub_key
+    return ''.join(orig[i] for i in MIXIN_KEY_ENC_TAB)[:32]
+
+
+def sign_params(params: dict, mixin_key: str, wts: Optional[int] = None) -> dict:
+    """
+    Sign parameters with a WBI mixin key
+
+    Args:
+        params: Query parameters
+        mixin_key: Key from get_mixin_key
+        wts: Signing timestamp (default: now)
+
+    Returns:
+        Sorted, filtered parameters including 'wts' and 'w_rid'
+    """
+    signed_params = dict(params)
+    signed_params['wts'] = int(time.time()) if wts is None else wts
+
+    # Sort parameters and remove "!'()*" characters as per API documentation
+    filtered_params = {
+        k: str(v).translate(_FILTERED_CHARS)
+        for k, v in sorted(signed_params.items())
+    }
+
+    # Calculate w_rid over the query string
+    query = urllib.parse.urlencode(filtered_params)
+    filtered_params['w_rid'] = hashlib.md5((query + mixin_key).encode()).hexdigest()
+    return filtered_params
+
+
+class WbiSigner:
+    """
+    Thread-safe WBI signer with a persistent key cache
+
+    The img/sub keys from the nav API rotate regularly. The signer caches
+    them for `ttl` seconds (the derived mixin key is computed once per
+    pair), can refresh them in a background thread before they expire,
+    and optionally persists them to `key_file` so a fresh process can
+    sign its first request without a nav round trip. One signer can be
+    shared by any number of threads and scrapers.
+    """
+
+    def __init__(self, fetch_keys: Callable[[], Tuple[str, str]], key_file: Optional[str] = None,
+                 ttl: float = 3600, refresh_margin: float = 300):
+        """
+        Initialize the signer
+
+        Args:
+            fetch_keys: Callable returning fresh (img_key, sub_key), or ('', '') on failure
+            key_file: Optional JSON file used to persist keys between processes
+            ttl: Seconds a key pair is trusted after it was fetched
+            refresh_margin: Seconds before expiry at which the background thread refreshes
+        """
+        self.fetch_keys = fetch_keys
+        self.key_file = key_file
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._entry = None  # (img_key, sub_key, fetched_at)
+        self._stop = threading.Event()
+        self._thread = None
+
+        if key_file:
+            self._load()
+
+    def _fresh(self, entry) -> bool:
+        return entry is not None and time.time() - entry[2] < self.ttl
+
+    def _load(self):
+        """Load persisted keys if they are still fresh"""
+        try:
+            with open(self.key_file, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            entry = (str(stored['img_key']), str(stored['sub_key']), float(stored['timestamp']))
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        if self._fresh(entry):
+            self._entry = entry
+
+    def _save(self, entry):
+        """Persist keys atomically so concurrent processes never read a partial file"""
+        try:
+            os.makedirs(os.path.dirname(self.key_file) if os.path.dirname(self.key_file) else '.', exist_ok=True)
+            tmp_file = f"{self.key_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'img_key': entry[0], 'sub_key': entry[1], 'timestamp': entry[2]}, f)
+            os.replace(tmp_file, self.key_file)
+        except OSError as e:
+            print(f"Could not save WBI keys: {e}")
+
+    def refresh(self) -> Tuple[str, str]:
+        """
+        Fetch new keys now
+
+        On failure the previous keys are kept (they may still be valid).
+
+        Returns:
+            The new (img_key, sub_key), or ('', '') if fetching failed
+        """
+        with self._lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> Tuple[str, str]:
+        img_key, sub_key = self.fetch_keys()
+        if not img_key or not sub_key:
+            return '', ''
+        entry = (img_key, sub_key, time.time())
+        self._entry = entry
+        if self.key_file:
+            self._save(entry)
+        return img_key, sub_key
+
+    def keys(self) -> Tuple[str, str]:
+        """Return current (img_key, sub_key), fetching them when missing or expired"""
+        entry = self._entry
+        if self._fresh(entry):
+            return entry[0], entry[1]
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            entry = self._entry
+            if self._fresh(entry):
+                return entry[0], entry[1]
+            return self._refresh_locked()
+
+    def sign(self, params: dict) -> dict:
+        """
+        Sign one set of parameters
+
+        Returns the original parameters unchanged if no keys are available.
+        """
+        img_key, sub_key = self.keys()
+        if not img_key or not sub_key:
+            return params
+        return sign_params(params, get_mixin_key(img_key, sub_key))
+
+    def sign_many(self, params_list: List[dict]) -> List[dict]:
+        """
+        Sign many parameter sets with one key lookup and one timestamp
+
+        Args:
+            params_list: Parameter dictionaries
+
+        Returns:
+            Signed parameter dictionaries, in the same order
+        """
+        img_key, sub_key = self.keys()
+        if not img_key or not sub_key:
+            return list(params_list)
+        mixin_key = get_mixin_key(img_key, sub_key)
+        wts = int(time.time())
+        return [sign_params(params, mixin_key, wts) for params in params_list]
+
+    def start_background_refresh(self):
+        """Refresh keys in a daemon thread shortly before they expire"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name='wbi-refresh', daemon=True)
+        self._thread.start()
+
+    def stop_background_refresh(self):
+        """Stop the background refresh thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            entry = self._entry
+            if entry is None:
+                # Nothing to renew yet; the first signed request fetches keys on demand
+                self._stop.wait(1)
+                continue
+            if self._stop.wait(max(0.0, entry[2] + self.ttl - self.refresh_margin - time.time())):
+                break
+            if not self.refresh()[0]:
+                self._stop.wait(60)  # Back off after a failed refresh
+
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the analytics module
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug import analytics
+from billbillbug.analytics import VideoStats, analyze
+
+
+def make_videos():
+    """Build formatted rows across two months and two UP masters"""
+    return [
+        {'title': 'A', 'bvid': 'BV1', 'mid': 1, 'play': 100, 'video_review': 10, 'favorites': 5,
+         'created': '2024-01-01 12:00:00'},  # Monday
+        {'title': 'B', 'bvid': 'BV2', 'mid': 1, 'play': 300, 'video_review': 30, 'favorites': 15,
+         'created': '2024-01-02 12:00:00'},  # Tuesday
+        {'title': 'C', 'bvid': 'BV3', 'mid': 2, 'play': '--', 'video_review': 0, 'favorites': 0,
+         'created': '2024-02-05 08:00:00'},  # Monday
+        {'title': 'D', 'bvid': 'BV4', 'mid': 2, 'play': 300, 'video_review': 20, 'favorites': 10,
+         'created': '2024-02-06 08:00:00'},  # Tuesday
+    ]
+
+
+class TestAnalytics(unittest.TestCase):
+    """Test the VideoStats functionality"""
+
+    def test_totals_and_aggregates(self):
+        """Test totals, means, engagement and calendar aggregates"""
+        stats = analyze(make_videos())
+
+        self.assertEqual(stats['videos'], 4)
+        self.assertEqual(stats['uploaders'], 2)
+        self.assertEqual(stats['totals'], {'play': 700, 'video_review': 60, 'favorites': 30})
+        self.assertAlmostEqual(stats['means']['play'], 233.33)  # '--' is not counted
+        self.assertEqual(stats['engagement']['comments_per_1k_views'], 85.714)
+        self.assertEqual(stats['monthly'], [
+            {'month': '2024-01', 'uploads': 2, 'views': 400},
+            {'month': '2024-02', 'uploads': 2, 'views': 300},
+        ])
+        self.assertEqual(stats['weekday'][0], {'weekday': 'Monday', 'uploads': 2, 'views': 100})
+        self.assertEqual(stats['weekday'][1], {'weekday': 'Tuesday', 'uploads': 2, 'views': 600})
+
+    def test_top_n_keeps_first_on_ties(self):
+        """Test the heap-based top-N against a full sort"""
+        stats = analyze(make_videos(), top_n=2)
+        self.assertEqual([video['bvid'] for video in stats['top']['play']], ['BV2', 'BV4'])
+
+    def test_percentiles_with_and_without_numpy(self):
+        """Test that the pure Python percentiles match NumPy's"""
+        videos = [{'play': (i * 7919) % 1000, 'video_review': i, 'favorites': 0} for i in range(1001)]
+        with mock.patch.object(analytics, 'np', None):
+            pure = analyze(videos, percentiles=(0, 25, 50, 99, 100))['percentiles']
+
+        self.assertEqual(pure['video_review'], {'p0': 0.0, 'p25': 250.0, 'p50': 500.0, 'p99': 990.0, 'p100': 1000.0})
+        if analytics.np is not None:
+            self.assertEqual(analyze(videos, percentiles=(0, 25, 50, 99, 100))['percentiles'], pure)
+
+    def test_accumulates_across_uids(self):
+        """Test feeding several scrape results into one accumulator"""
+        stats = VideoStats()
+        videos = make_videos()
+        stats.add_many(videos[:2]).add_many(videos[2:])
+        self.assertEqual(stats.result()['totals'], analyze(videos)['totals'])
+
+
+if __name__ == '__main__':
+    unittest.main()
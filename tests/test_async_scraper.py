@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the asyncio scraping engine
+"""
+
+import os
+import sys
+import asyncio
+import unittest
+from unittest import mock
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.scraper import BilibiliScraper, IncompleteCrawlError
+from billbillbug.async_scraper import AsyncBilibiliScraper
+
+
+def make_fake_listing(total):
+    """Build a fake get_user_videos serving `total` videos"""
+    videos = [{'bvid': f'BV{i:06d}', 'title': f'Video {i}', 'created': 1640995200 + i} for i in range(total)]
+
+    def fake_get_user_videos(self, uid, page=1, page_size=50):
+        start = (page - 1) * 50
+        return {
+            'list': {'vlist': videos[start:start + 50]},
+            'page': {'pn': page, 'ps': 50, 'count': total}
+        }
+
+    return fake_get_user_videos
+
+
+class TestAsyncBilibiliScraper(unittest.TestCase):
+    """Test the AsyncBilibiliScraper functionality"""
+
+    def test_scraper_initialization(self):
+        """Test async scraper initialization"""
+        scraper = AsyncBilibiliScraper(delay=0.5, concurrency=8)
+        self.assertEqual(scraper.delay, 0.5)
+        self.assertEqual(scraper.concurrency, 8)
+        scraper.close()
+
+    def test_matches_sync_output(self):
+        """Test that concurrent pagination returns the same list as the sync path"""
+        for total, max_videos in [(0, None), (30, None), (50, None), (237, None), (237, 120), (237, 10)]:
+            with mock.patch.object(BilibiliScraper, 'get_user_videos', make_fake_listing(total)):
+                expected = BilibiliScraper(delay=0).get_all_user_videos('1', max_videos)
+
+                async def run():
+                    async with AsyncBilibiliScraper(delay=0, concurrency=4) as scraper:
+                        return await scraper.get_all_user_videos('1', max_videos)
+
+                result = asyncio.run(run())
+
+            self.assertEqual(result, expected, f"total={total} max_videos={max_videos}")
+
+    def test_failed_page_raises(self):
+        """Test that a failed page fails the crawl like the sync path, instead of truncating it"""
+        fake = make_fake_listing(200)
+
+        def failing(self, uid, page=1, page_size=50):
+            return {} if page == 3 else fake(self, uid, page, page_size)
+
+        with mock.patch.object(BilibiliScraper, 'get_user_videos', failing):
+            async def run():
+                async with AsyncBilibiliScraper(delay=0) as scraper:
+                    return await scraper.get_all_user_videos('1')
+
+            with self.assertRaises(IncompleteCrawlError) as raised:
+                asyncio.run(run())
+            self.assertEqual(raised.exception.page, 3)
+
+            with self.assertRaises(IncompleteCrawlError):
+                BilibiliScraper(delay=0).get_all_user_videos('1')
+            # A failure after the requested videos does not matter
+            self.assertEqual(len(BilibiliScraper(delay=0).get_all_user_videos('1', max_videos=100)), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
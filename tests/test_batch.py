@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for batch scraping
+"""
+
+import io
+import os
+import sys
+import unittest
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.batch import BatchScraper, read_uids
+from billbillbug.scraper import BilibiliScraper
+
+
+class FakeScraper(BilibiliScraper):
+    """Scraper that answers from memory instead of the network"""
+
+    def scrape_up_master(self, uid, max_videos=None, known_bvids=None):
+        self.request_count += 2
+        if uid == 'bad':
+            raise RuntimeError('boom')
+        if uid == 'missing':
+            return {}
+        if uid == 'novideos':
+            return {'user_info': {'mid': uid}, 'videos': []}
+        return {'user_info': {'mid': uid}, 'videos': [{'bvid': f'BV{uid}'}], 'total_videos': 1}
+
+
+class TestBatchScraper(unittest.TestCase):
+    """Test the BatchScraper functionality"""
+
+    def test_read_uids(self):
+        """Test UID list parsing"""
+        stream = io.StringIO("123\n\n# comment\n456\n123\n  789  \n")
+        self.assertEqual(read_uids(stream), ['123', '456', '789'])
+
+    def test_run_isolates_failures(self):
+        """Test that failing UIDs are reported without aborting the batch"""
+        seen = []
+        batch = BatchScraper(FakeScraper(delay=0), workers=3)
+        report = batch.run(['1', 'bad', '2', 'missing', 'novideos'], on_result=seen.append)
+
+        statuses = {r['uid']: r['status'] for r in report['results']}
+        self.assertEqual(statuses, {'1': 'ok', 'bad': 'error', '2': 'ok', 'missing': 'error', 'novideos': 'empty'})
+        self.assertEqual([r['uid'] for r in report['results']], ['1', 'bad', '2', 'missing', 'novideos'])
+        self.assertIn('boom', report['results'][1]['error'])
+        self.assertEqual(len(seen), 5)
+
+        stats = report['stats']
+        self.assertEqual(stats['total_uids'], 5)
+        self.assertEqual(stats['failed'], 2)
+        self.assertEqual(stats['succeeded'], 3)
+        self.assertEqual(stats['requests'], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
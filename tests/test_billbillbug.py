@@ -125,6 +125,26 @@ class TestDataExporter(unittest.TestCase):
         finally:
             if os.path.exists(temp_file):
                 os.unlink(temp_file)
+    
+    def test_export_summary_json(self):
+        """Test summary JSON export functionality"""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
+            temp_file = f.name
+            
+        try:
+            result_file = self.exporter.export_summary_json(self.test_data, temp_file)
+            
+            with open(result_file, 'r', encoding='utf-8') as f:
+                summary = json.load(f)
+                
+            self.assertEqual(summary['user_info']['name'], 'Test UP Master')
+            self.assertEqual(summary['statistics']['videos'], 2)
+            self.assertIn('percentiles', summary['statistics'])
+            self.assertEqual(len(summary['statistics']['weekday']), 7)
+            
+        finally:
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
 
 
 class TestBilibiliScraper(unittest.TestCase):
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the on-disk response cache
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.cache import ResponseCache, CacheMiss
+from billbillbug.scraper import BilibiliScraper
+
+INFO_URL = 'https://api.bilibili.com/x/space/acc/info'
+SEARCH_URL = 'https://api.bilibili.com/x/space/wbi/arc/search'
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test the ResponseCache functionality"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_ignores_signature(self):
+        """Test that the WBI signature fields do not affect the cache key"""
+        first = ResponseCache.make_key(SEARCH_URL, {'mid': 1, 'pn': 2, 'wts': 100, 'w_rid': 'aa'})
+        second = ResponseCache.make_key(SEARCH_URL, {'pn': '2', 'mid': '1', 'wts': 200, 'w_rid': 'bb'})
+        self.assertEqual(first, second)
+        self.assertEqual(first, 'x/space/wbi/arc/search?mid=1&pn=2')
+
+    def test_ttl_and_error_responses(self):
+        """Test expiry and that failed API calls are not cached"""
+        cache = ResponseCache(self.path, ttls={'x/space/acc/info': 0})
+        cache.set(INFO_URL, {'mid': 1}, {'code': 0, 'data': {'name': 'a'}})
+        cache.set(SEARCH_URL, {'mid': 1}, {'code': -412, 'message': 'blocked'})
+
+        self.assertIsNone(cache.get(INFO_URL, {'mid': 1}))  # expired immediately
+        self.assertIsNone(cache.get(SEARCH_URL, {'mid': 1}))
+        self.assertEqual(cache.stats()['entries'], 1)
+        cache.close()
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entries are evicted"""
+        cache = ResponseCache(self.path, max_entries=10)
+        for i in range(10):
+            cache.set(INFO_URL, {'mid': i}, {'code': 0, 'data': {'mid': i}})
+        cache.get(INFO_URL, {'mid': 0})  # keep the oldest entry warm
+        cache.set(INFO_URL, {'mid': 10}, {'code': 0, 'data': {'mid': 10}})
+
+        self.assertLessEqual(cache.stats()['entries'], 10)
+        self.assertIsNotNone(cache.get(INFO_URL, {'mid': 0}))
+        self.assertIsNone(cache.get(INFO_URL, {'mid': 1}))
+        cache.close()
+
+    def test_replay_serves_from_cache_only(self):
+        """Test that replay mode never falls through to the network"""
+        cache = ResponseCache(self.path, ttls={'x/space/acc/info': 0})
+        cache.set(INFO_URL, {'mid': 1}, {'code': 0, 'data': {'name': '测试'}})
+        cache.close()
+
+        replay = ResponseCache(self.path, replay=True)
+        scraper = BilibiliScraper(delay=0, cache=replay)
+        with mock.patch.object(scraper.session, 'get') as get:
+            self.assertEqual(scraper.get_user_info('1'), {'name': '测试'})
+            self.assertEqual(scraper.get_user_info('2'), {})
+            get.assert_not_called()
+
+        with self.assertRaises(CacheMiss):
+            replay.get(INFO_URL, {'mid': 2})
+        replay.close()
+
+    def test_scraper_populates_cache(self):
+        """Test that responses fetched by the scraper are cached"""
+        cache = ResponseCache(self.path)
+        scraper = BilibiliScraper(delay=0, cache=cache)
+        response = mock.Mock()
+        response.json.return_value = {'code': 0, 'data': {'name': 'Test'}}
+        response.content = b'{"code":0,"data":{"name":"Test"}}'
+
+        with mock.patch.object(scraper.session, 'get', return_value=response) as get:
+            scraper.get_user_info('1')
+            scraper.get_user_info('1')
+            self.assertEqual(get.call_count, 1)
+
+        self.assertEqual(scraper.request_count, 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests for resumable crawl checkpoints
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.async_scraper import AsyncBilibiliScraper
+from billbillbug.checkpoint import CheckpointStore, CrawlCheckpoint
+from billbillbug.scraper import BilibiliScraper, IncompleteCrawlError
+
+PAGES = 4
+PAGE_SIZE = BilibiliScraper.PAGE_SIZE
+
+
+def make_page(page):
+    """Build one API response page of a 4-page listing"""
+    videos = [{'bvid': f'BV{page}_{i}', 'title': f'Video {page}.{i}'} for i in range(PAGE_SIZE)]
+    return {'list': {'vlist': videos}, 'page': {'pn': page, 'count': PAGES * PAGE_SIZE}}
+
+
+class FlakyPages:
+    """get_user_videos replacement that fails once at a given page"""
+
+    def __init__(self, fail_at=None, interrupt=True):
+        self.fail_at = fail_at
+        self.interrupt = interrupt  # Ctrl-C, or else an API error that outlasted the retries
+        self.requested = []
+
+    def __call__(self, uid, page=1, page_size=50):
+        if page == self.fail_at:
+            self.fail_at = None
+            if not self.interrupt:
+                return {}
+            raise KeyboardInterrupt
+        self.requested.append(page)
+        return make_page(page) if page <= PAGES else {'list': {'vlist': []}}
+
+
+class TestCrawlCheckpoint(unittest.TestCase):
+    """Test the CrawlCheckpoint functionality"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = CheckpointStore(self.tmp.name, resume=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def crawl(self, scraper, checkpoint):
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                return scraper.get_all_user_videos('42', checkpoint=checkpoint)
+            finally:
+                checkpoint.close()
+
+    def test_resume_after_interruption(self):
+        """Test that a resumed crawl skips the pages fetched before the failure"""
+        scraper = BilibiliScraper(delay=0)
+        scraper.get_user_videos = FlakyPages(fail_at=3)
+        with self.assertRaises(KeyboardInterrupt):
+            self.crawl(scraper, self.store.open('42'))
+
+        scraper.get_user_videos = fetcher = FlakyPages()
+        checkpoint = self.store.open('42')
+        self.assertEqual(checkpoint.last_page, 2)
+        videos = self.crawl(scraper, checkpoint)
+
+        self.assertEqual(fetcher.requested, [3, 4, 5])
+        self.assertEqual(len(videos), PAGES * PAGE_SIZE)
+        self.assertEqual(videos[0]['bvid'], 'BV1_0')
+
+        checkpoint.complete()
+        self.assertFalse(os.path.exists(self.store.path('42')))
+
+    def test_resume_after_failed_page(self):
+        """Test that a page failing after all retries fails the crawl and keeps the checkpoint"""
+        scraper = BilibiliScraper(delay=0)
+        scraper.get_user_videos = FlakyPages(fail_at=3, interrupt=False)
+        with self.assertRaises(IncompleteCrawlError):
+            self.crawl(scraper, self.store.open('42'))
+
+        scraper.get_user_videos = fetcher = FlakyPages()
+        checkpoint = self.store.open('42')
+        self.assertEqual(checkpoint.last_page, 2)
+        self.assertEqual(len(self.crawl(scraper, checkpoint)), PAGES * PAGE_SIZE)
+        self.assertEqual(fetcher.requested, [3, 4, 5])
+
+    def test_async_resume(self):
+        """Test that the concurrent crawler reuses checkpointed pages"""
+        checkpoint = self.store.open('42')
+        checkpoint.save(1, make_page(1))
+        checkpoint.save(3, make_page(3))
+        fetcher = FlakyPages()
+
+        async def fake_get_user_videos(uid, page=1, page_size=50):
+            return fetcher(uid, page, page_size)
+
+        async def crawl():
+            async with AsyncBilibiliScraper(delay=0) as scraper:
+                scraper.get_user_videos = fake_get_user_videos
+                return await scraper.get_all_user_videos('42', checkpoint=checkpoint)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            videos = asyncio.run(crawl())
+
+        self.assertEqual(sorted(fetcher.requested), [2, 4, 5])  # Page 4 is full, so page 5 is probed
+        self.assertEqual([video['bvid'] for video in videos[::PAGE_SIZE]], ['BV1_0', 'BV2_0', 'BV3_0', 'BV4_0'])
+
+    def test_torn_write_and_fresh_start(self):
+        """Test that a torn last line is ignored and resume=False starts over"""
+        checkpoint = self.store.open('42')
+        checkpoint.save(1, make_page(1))
+        checkpoint.close()
+        with open(self.store.path('42'), 'a', encoding='utf-8') as f:
+            f.write('{"page": 2, "data": {"li')
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(list(self.store.open('42').pages), [1])
+        self.assertEqual(CrawlCheckpoint(self.store.path('42'), '42', resume=False).pages, {})
+        self.assertFalse(os.path.exists(self.store.path('42')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the Parquet/Feather export
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug import columnar
+from billbillbug.columnar import ArrowSink, pa
+from billbillbug.exporter import DataExporter
+from billbillbug.scraper import BilibiliScraper
+
+
+def make_rows(count):
+    """Build formatted video rows"""
+    return [{
+        'title': f'视频 {i}', 'bvid': f'BV{i}', 'aid': i, 'pic': '', 'author': 'UP', 'mid': 42,
+        'play': '--' if i == 0 else i * 10, 'video_review': i, 'favorites': i,
+        'created': '2024-01-02 03:04:05', 'length': '01:00', 'description': '',
+        'up_name': 'UP', 'up_face': 'face.jpg', 'up_sign': 'sign', 'up_level': 6, 'up_fans': 1000,
+    } for i in range(count)]
+
+
+@unittest.skipIf(pa is None, "pyarrow not installed")
+class TestColumnarExport(unittest.TestCase):
+    """Test the typed columnar sinks"""
+
+    def test_export_to_parquet(self):
+        """Test that Parquet output uses the typed schema"""
+        import pyarrow.parquet as pq
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = DataExporter.export_to_parquet({'videos': make_rows(3)}, os.path.join(tmp, 'v.parquet'))
+            table = pq.read_table(path)
+
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.schema.field('play').type, pa.int64())
+        self.assertTrue(pa.types.is_timestamp(table.schema.field('created').type))
+        self.assertTrue(pa.types.is_dictionary(table.schema.field('up_name').type))
+        self.assertEqual(table.column('play').to_pylist(), [None, 10, 20])
+        self.assertEqual(table.column('created')[0].as_py(), datetime(2024, 1, 2, 3, 4, 5))
+        self.assertEqual(table.column('title')[0].as_py(), '视频 0')
+
+    def test_feather_across_batches(self):
+        """Test that streaming batches share one dictionary per column"""
+        import pyarrow.feather as feather
+
+        rows = make_rows(10)
+        for i, row in enumerate(rows):
+            row['author'] = f'author {i % 4}'
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'v.feather')
+            with ArrowSink(path, BilibiliScraper.video_fields(), 'feather', batch_size=3) as sink:
+                for start in range(0, 10, 4):
+                    sink.write_many(rows[start:start + 4])
+            table = feather.read_table(path)
+
+        self.assertEqual(table.num_rows, 10)
+        self.assertEqual(table.column('author').to_pylist(), [row['author'] for row in rows])
+
+
+    def test_flush_per_page_keeps_row_groups_whole(self):
+        """Test that flushing after every page does not write a row group per page"""
+        import pyarrow.parquet as pq
+
+        rows = make_rows(50)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'v.parquet')
+            with ArrowSink(path, BilibiliScraper.video_fields(), batch_size=2000) as sink:
+                for _ in range(100):
+                    sink.write_many(rows)
+                    sink.flush()
+            metadata = pq.read_metadata(path)
+
+        self.assertEqual(metadata.num_rows, 5000)
+        self.assertEqual([metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)],
+                         [2000, 2000, 1000])
+
+
+class TestColumnarWithoutPyarrow(unittest.TestCase):
+    """Test the optional dependency handling"""
+
+    def test_missing_pyarrow(self):
+        """Test that a clear ImportError is raised without pyarrow"""
+        with mock.patch.object(columnar, 'pa', None):
+            with self.assertRaises(ImportError):
+                ArrowSink('unused.parquet', ['bvid'])
+
+
+if __name__ == '__main__':
+    unittest.main()
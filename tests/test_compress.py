@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for compressed output files
+"""
+
+import contextlib
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.compress import Compression, codec_for, read_bytes, zstandard
+from billbillbug.exporter import DataExporter
+from billbillbug.sinks import CSVSink, NDJSONSink
+from billbillbug.state import load_previous_videos
+
+ROWS = [{'bvid': f"BV{i}", 'title': f"视频 {i}", 'play': i * 10} for i in range(200)]
+
+
+class TestCompressedOutput(unittest.TestCase):
+    """Test writing and reading compressed files"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.quiet = contextlib.redirect_stdout(io.StringIO())
+        self.quiet.__enter__()
+
+    def tearDown(self):
+        self.quiet.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_codec_for(self):
+        """Test that the codec follows the file name"""
+        self.assertEqual(codec_for('a.json.gz'), 'gzip')
+        self.assertEqual(codec_for('a.csv.zst'), 'zstd')
+        self.assertIsNone(codec_for('a.csv'))
+        self.assertEqual(Compression('gzip').suffix, '.gz')
+        self.assertEqual(Compression().suffix, '')
+        with self.assertRaises(ValueError):
+            Compression('lzma')
+
+    def test_gzip_sinks(self):
+        """Test that sinks compress targets named .gz"""
+        with NDJSONSink(self.path('v.ndjson.gz'), compression=Compression('gzip', level=9)) as sink:
+            sink.write_many(ROWS)
+        with CSVSink(self.path('v.csv.gz'), ['bvid', 'play']) as sink:
+            sink.write_many(ROWS)
+
+        with gzip.open(self.path('v.ndjson.gz'), 'rt', encoding='utf-8') as f:
+            self.assertEqual([json.loads(line) for line in f], ROWS)
+        with gzip.open(self.path('v.csv.gz'), 'rt', encoding='utf-8', newline='') as f:
+            self.assertEqual(next(csv.DictReader(f)), {'bvid': 'BV0', 'play': '0'})
+
+    @unittest.skipIf(zstandard is None, "zstandard not installed")
+    def test_threaded_zstd_exports(self):
+        """Test that exporters write multi-threaded zstd, and incremental merges read it back"""
+        compression = Compression('zstd', level=10, threads=2)
+        data = {'user_info': {'mid': 1}, 'videos': ROWS}
+        DataExporter.export_to_json(data, self.path('v.json.zst'), compression=compression)
+        DataExporter.export_to_csv(data, self.path('v.csv.zst'), fields=['bvid', 'title'], compression=compression)
+
+        self.assertEqual(load_previous_videos(self.path('v.json.zst')), ROWS)
+        rows = list(csv.DictReader(io.StringIO(read_bytes(self.path('v.csv.zst')).decode('utf-8'))))
+        self.assertEqual(rows[-1], {'bvid': 'BV199', 'title': '视频 199'})
+        self.assertLess(os.path.getsize(self.path('v.json.zst')), len(read_bytes(self.path('v.json.zst'))) / 5)
+
+    def test_compressed_stream(self):
+        """Test compressing into an open stream such as stdout, which stays open"""
+        buffer = io.BytesIO()
+        stream = io.TextIOWrapper(buffer, encoding='utf-8')
+        with NDJSONSink(stream, compression=Compression('gzip')) as sink:
+            sink.write_many(ROWS[:3])
+        self.assertFalse(stream.closed)
+        self.assertEqual(gzip.decompress(buffer.getvalue()).decode('utf-8').splitlines()[2],
+                         json.dumps(ROWS[2], ensure_ascii=False))
+
+    def test_plain_files_unchanged(self):
+        """Test that files without a compressed suffix are written as before"""
+        DataExporter.export_to_ndjson({'videos': ROWS[:2]}, self.path('v.ndjson'), compression=Compression('gzip'))
+        with open(self.path('v.ndjson'), encoding='utf-8') as f:
+            self.assertEqual(json.loads(f.readline()), ROWS[0])
+
+    def test_suffix_selects_codec_by_default(self):
+        """Test that exports without compression settings follow the file name"""
+        DataExporter.export_summary_json({'videos': ROWS[:3]}, self.path('s.json.gz'))
+        DataExporter.export_to_ndjson({'videos': ROWS[:2]}, self.path('v.ndjson'))
+        self.assertEqual(json.loads(read_bytes(self.path('s.json.gz')))['statistics']['videos'], 3)
+        with open(self.path('v.ndjson'), encoding='utf-8') as f:
+            self.assertEqual(json.loads(f.readline()), ROWS[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
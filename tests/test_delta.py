@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for delta exports against the previous snapshot
+"""
+
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.delta import SnapshotIndex
+from billbillbug.exporter import DataExporter
+from billbillbug.table import VideoTable
+
+
+def snapshot(count: int = 5, **overrides):
+    """Data dictionary of a UP master with `count` videos"""
+    videos = [{'bvid': f"BV{i}", 'mid': 7, 'title': f"video {i}", 'play': 100 * i, 'favorites': i}
+              for i in range(count)]
+    for video in videos:
+        video.update(overrides.get(video['bvid'], {}))
+    return {'user_info': {'mid': 7, 'name': 'up'}, 'videos': videos}
+
+
+class TestSnapshotIndex(unittest.TestCase):
+    """Test change detection and index updates"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'snapshot_index.db')
+        self.index = SnapshotIndex(self.path)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_first_run_inserts_everything(self):
+        """Test that an unknown UID is all inserts"""
+        changes = self.index.diff('7', snapshot()['videos'])
+        self.assertEqual([row['op'] for row in changes], ['insert'] * 5)
+        self.assertEqual(changes[0], {'op': 'insert', 'changed': [], **snapshot()['videos'][0]})
+
+    def test_updates_deletes_and_inserts(self):
+        """Test that only changed videos are reported, with their changed fields"""
+        self.index.diff('7', snapshot()['videos'])
+        self.index.commit('7')
+
+        videos = snapshot(BV1={'play': 1}, BV3={'title': 'renamed', 'favorites': 30})['videos']
+        videos = [video for video in videos if video['bvid'] != 'BV4']
+        videos.append({'bvid': 'BV9', 'mid': 7, 'title': 'new', 'play': 0, 'favorites': 0})
+        changes = self.index.diff('7', videos)
+
+        self.assertEqual([(row['op'], row['bvid'], row['changed']) for row in changes], [
+            ('update', 'BV1', ['play']),
+            ('update', 'BV3', ['title', 'favorites']),
+            ('insert', 'BV9', []),
+            ('delete', 'BV4', []),
+        ])
+        self.assertEqual(changes[-1], {'op': 'delete', 'changed': [], 'bvid': 'BV4', 'mid': 7})
+
+    def test_partial_crawl_keeps_unseen_videos(self):
+        """Test that videos missing from an incomplete crawl are not deletions"""
+        self.index.diff('7', snapshot()['videos'])
+        self.index.commit('7')
+
+        self.assertEqual(self.index.diff('7', snapshot(2)['videos'], complete=False), [])
+        self.index.commit('7')
+        self.assertEqual(self.index.count('7'), 5)
+        self.assertEqual(self.index.diff('7', snapshot()['videos']), [])
+
+    def test_uncommitted_diff_is_repeated(self):
+        """Test that the index only moves on commit and survives reopening"""
+        self.index.diff('7', snapshot()['videos'])
+        self.assertEqual(self.index.count(), 0)
+        self.index.diff('7', snapshot(3)['videos'])
+        self.index.commit('7')
+        self.index.close()
+
+        self.index = SnapshotIndex(self.path)
+        changes = self.index.diff('7', snapshot(4)['videos'])
+        self.assertEqual([(row['op'], row['bvid']) for row in changes], [('insert', 'BV3')])
+
+    def test_video_table(self):
+        """Test that a VideoTable is compared like its rows"""
+        table = VideoTable.from_rows(snapshot()['videos'], {'mid': 7})
+        self.assertEqual(len(self.index.diff('7', table)), 5)
+        self.index.commit('7')
+        self.assertEqual(self.index.diff('7', table.to_dicts()), [])
+
+    def test_new_fields_mark_updates(self):
+        """Test that columns added since the last run (e.g. --enrich) are reported as changed"""
+        self.index.diff('7', snapshot(2)['videos'])
+        self.index.commit('7')
+        videos = [dict(video, like=1) for video in snapshot(2)['videos']]
+        self.assertEqual([row['changed'] for row in self.index.diff('7', videos)], [['like'], ['like']])
+
+
+class TestExportDelta(unittest.TestCase):
+    """Test the delta files written by DataExporter"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = SnapshotIndex(os.path.join(self.tmp.name, 'snapshot_index.db'))
+        self.quiet = contextlib.redirect_stdout(io.StringIO())
+        self.quiet.__enter__()
+
+    def tearDown(self):
+        self.quiet.__exit__(None, None, None)
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_ndjson_delta(self):
+        """Test that the NDJSON delta holds one line per change"""
+        filename = os.path.join(self.tmp.name, 'videos_7.delta.ndjson')
+        DataExporter.export_delta(snapshot(), filename, self.index)
+        DataExporter.export_delta(snapshot(BV2={'play': 5}), filename, self.index, compact=True)
+
+        with open(filename, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines, [{'op': 'update', 'changed': ['play'], **snapshot(BV2={'play': 5})['videos'][2]}])
+
+        DataExporter.export_delta(snapshot(BV2={'play': 5}), filename, self.index)
+        self.assertEqual(os.path.getsize(filename), 0)
+
+    def test_csv_delta(self):
+        """Test that the CSV delta has op and changed columns first"""
+        filename = os.path.join(self.tmp.name, 'videos_7.delta.csv')
+        DataExporter.export_delta(snapshot(), filename, self.index)
+        DataExporter.export_delta(snapshot(4, BV0={'title': 'x', 'play': 9}), filename, self.index)
+
+        with open(filename, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            rows = list(reader)
+        self.assertEqual(reader.fieldnames, ['op', 'changed', 'bvid', 'mid', 'title', 'play', 'favorites'])
+        self.assertEqual([(row['op'], row['bvid'], row['changed']) for row in rows],
+                         [('update', 'BV0', 'title|play'), ('delete', 'BV4', '')])
+
+
+if __name__ == '__main__':
+    unittest.main()
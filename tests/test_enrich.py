@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for per-video detail enrichment
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench.mock_server import MockBilibiliServer
+from billbillbug.cache import ResponseCache
+from billbillbug.enrich import VideoEnricher
+from billbillbug.scraper import BilibiliScraper
+
+DETAIL_ENDPOINT = '/x/web-interface/view/detail'
+
+
+class TestVideoEnricher(unittest.TestCase):
+    """Test enrichment against the mock Bilibili server"""
+
+    def setUp(self):
+        self.server = MockBilibiliServer(videos_per_user=30)
+        self.server.start()
+        self.quiet = contextlib.redirect_stdout(io.StringIO())
+        self.quiet.__enter__()
+
+    def tearDown(self):
+        self.quiet.__exit__(None, None, None)
+        self.server.stop()
+
+    def detail_requests(self):
+        return self.server.stats()['by_endpoint'].get(DETAIL_ENDPOINT, 0)
+
+    def test_enrich_adds_columns(self):
+        """Test that every row gets the detail counters and tags"""
+        scraper = BilibiliScraper(delay=0, api_base=self.server.url)
+        data = scraper.scrape_up_master('7', max_videos=10)
+        enriched = VideoEnricher(scraper, workers=4).enrich(data)
+
+        self.assertEqual(len(enriched['videos']), 10)
+        self.assertNotIn('like', data['videos'][0])  # The input is left alone
+        row = enriched['videos'][3]
+        aid = row['aid']
+        self.assertEqual((row['like'], row['coin'], row['share']), (aid % 9000, aid % 3000, aid % 200))
+        self.assertEqual(row['tags'], 'tag3,tag4,tag5')
+        self.assertEqual(self.detail_requests(), 10)
+
+    def test_duplicates_are_fetched_once(self):
+        """Test that bvids shared between UIDs or repeated are requested once"""
+        scraper = BilibiliScraper(delay=0, api_base=self.server.url, compact=True)
+        enricher = VideoEnricher(scraper)
+        first = scraper.scrape_up_master('7', max_videos=5)
+        enricher.enrich(first)
+        # A collaboration listed by a second UP master, plus a repeated row
+        collab = {'videos': list(first['videos'])[:2] * 2 + [{'bvid': 'BV0000800000'}]}
+        rows = enricher.enrich(collab)['videos']
+
+        self.assertEqual(self.detail_requests(), 6)
+        self.assertEqual(rows[0]['like'], rows[2]['like'])
+        self.assertEqual(enricher.stats(), {'fetched': 6, 'failed': 0, 'reused': 4, 'known': 6})
+
+    def test_failed_details(self):
+        """Test that failed requests leave empty columns and are retried later"""
+        scraper = BilibiliScraper(delay=0, api_base=self.server.url)
+        enricher = VideoEnricher(scraper)
+        rows = enricher.enrich_rows([{'bvid': 'not-a-bvid', 'title': 'x'}])
+        self.assertEqual(rows, [{'bvid': 'not-a-bvid', 'title': 'x', **dict.fromkeys(VideoEnricher.DETAIL_FIELDS)}])
+        enricher.enrich_rows([{'bvid': 'not-a-bvid'}])
+        self.assertEqual(enricher.stats()['failed'], 2)
+
+    def test_fresh_cached_details_are_skipped(self):
+        """Test that a second run reuses details from the response cache"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.db')
+            for _ in range(2):
+                cache = ResponseCache(path)
+                scraper = BilibiliScraper(delay=0, api_base=self.server.url, cache=cache)
+                rows = VideoEnricher(scraper).enrich_rows([{'bvid': f"BV{700000 + i:010d}"} for i in range(5)])
+                cache.close()
+            self.assertEqual(self.detail_requests(), 5)
+            self.assertEqual(rows[1]['tags'], 'tag1,tag2,tag3')
+
+
+if __name__ == '__main__':
+    unittest.main()
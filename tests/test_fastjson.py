@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the fast JSON backend
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug import fastjson
+from billbillbug.exporter import DataExporter, _json_default
+from billbillbug.sinks import JSONArraySink
+from billbillbug.table import VideoTable
+from billbillbug.transport import RequestsTransport
+
+DOCUMENTS = [
+    {'title': '视频 "quoted"\n\t ', 'play': 12, 'empty': [], 'nested': {'a': [1, {}]}},
+    [0.1, 1e16, 1e-05, 1.5e300, -0.0, 123.456, 5e-324],
+    {'nan': float('nan'), 'inf': float('inf')},
+    {'big': 2 ** 70, 1: 'int key'},
+    '\x00\x1f\x7f😀',
+    [],
+    None,
+]
+
+
+class TestFastJSON(unittest.TestCase):
+    """Test that the backend matches the standard library byte for byte"""
+
+    def check_documents(self):
+        for document in DOCUMENTS:
+            self.assertEqual(fastjson.dumps(document, indent=2),
+                             json.dumps(document, ensure_ascii=False, indent=2))
+            self.assertEqual(fastjson.dumps(document),
+                             json.dumps(document, ensure_ascii=False, separators=(',', ':')))
+
+    def test_dumps_matches_stdlib(self):
+        """Test indented and compact output, including floats orjson spells differently"""
+        self.check_documents()
+
+    def test_dumps_without_orjson(self):
+        """Test the standard library fallback"""
+        with mock.patch.object(fastjson, 'orjson', None):
+            self.check_documents()
+
+    def test_default(self):
+        """Test that unsupported types go through default"""
+        table = VideoTable.from_raw([{'bvid': 'BV1', 'created': 0}])
+        self.assertEqual(fastjson.dumps({'videos': table}, default=_json_default),
+                         json.dumps({'videos': table}, ensure_ascii=False, separators=(',', ':'),
+                                    default=_json_default))
+        with self.assertRaises(TypeError):
+            fastjson.dumps({'when': object()})
+
+    def test_loads(self):
+        """Test decoding bytes and str, and documents only the standard library accepts"""
+        self.assertEqual(fastjson.loads(b'{"a": "\xe4\xb8\xad"}'), {'a': '中'})
+        self.assertEqual(fastjson.loads('[1, 2]'), [1, 2])
+        self.assertEqual(fastjson.loads('[%d]' % 2 ** 70), [2 ** 70])
+        with self.assertRaises(ValueError):
+            fastjson.loads(b'{"a": ')
+
+    def test_transport_decode_error(self):
+        """Test that an invalid body fails like response.json() did"""
+        transport = RequestsTransport()
+        response = mock.Mock(content=b'<html>', text='<html>')
+        with mock.patch.object(transport.session, 'get', return_value=response):
+            with self.assertRaises(requests.exceptions.JSONDecodeError):
+                transport.get_json('http://example.invalid/')
+
+
+class TestJSONStreaming(unittest.TestCase):
+    """Test the streaming JSON writers"""
+
+    def test_array_sink(self):
+        """Test that the array sink matches json.dumps for any number of rows"""
+        rows = [{'title': '视频', 'tags': ['a', 'b'], 'play': 1}, {'title': 'b', 'tags': [], 'play': 2}]
+        for compact in (False, True):
+            for count in range(3):
+                out = io.StringIO()
+                with JSONArraySink(out, compact=compact) as sink:
+                    sink.write_many(rows[:count])
+                expected = json.dumps(rows[:count], ensure_ascii=False, indent=None if compact else 2,
+                                      separators=(',', ':') if compact else None)
+                self.assertEqual(out.getvalue(), expected)
+
+    def test_export_to_json_unchanged(self):
+        """Test that the streamed export is byte-identical to json.dump"""
+        user_info = {'mid': 1, 'name': 'UP', 'face': '', 'sign': '', 'level': 6, 'fans': 10}
+        raw = [{'bvid': f'BV{i}', 'title': f'视频{i}', 'play': i, 'created': 1700000000 + i} for i in range(3)]
+        table = VideoTable.from_raw(raw, user_info)
+        datasets = [
+            {'user_info': user_info, 'videos': table.to_dicts(), 'total_videos': 3, 'scrape_time': 'now'},
+            {'user_info': user_info, 'videos': table, 'total_videos': 3},
+            {'user_info': user_info, 'videos': []},
+            {'stats': {'elapsed': 0.5}, 'results': [{'uid': '1', 'status': 'ok'}]},
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.json')
+            for data in datasets:
+                for compact in (False, True):
+                    DataExporter.export_to_json(data, path, compact=compact)
+                    with open(path, 'r', encoding='utf-8') as f:
+                        written = f.read()
+                    expected = json.dumps(data, ensure_ascii=False, indent=None if compact else 2,
+                                          separators=(',', ':') if compact else None, default=_json_default)
+                    self.assertEqual(written, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
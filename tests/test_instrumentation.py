@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for the instrumentation hooks and the profiler
+"""
+
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+import unittest
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench.mock_server import MockBilibiliServer
+from billbillbug.exporter import DataExporter
+from billbillbug.instrumentation import Hooks, Profiler
+from billbillbug.retry import RetryPolicy
+from billbillbug.scraper import BilibiliScraper
+
+
+class TestHooks(unittest.TestCase):
+    """Test the Hooks event surface"""
+
+    def test_emit_and_stage(self):
+        """Test that subscribers receive events and stage timings"""
+        events = []
+        hooks = Hooks([lambda event, info: events.append((event, info))])
+        hooks.emit('request_start', endpoint='/x')
+        with hooks.stage('sign', extra=1):
+            pass
+
+        self.assertEqual(events[0], ('request_start', {'endpoint': '/x'}))
+        self.assertEqual(events[1][0], 'stage')
+        self.assertEqual(events[1][1]['stage'], 'sign')
+        self.assertEqual(events[1][1]['extra'], 1)
+        self.assertGreaterEqual(events[1][1]['seconds'], 0)
+
+    def test_empty_hooks(self):
+        """Test that hooks without subscribers are falsy and stages do nothing"""
+        hooks = Hooks()
+        self.assertFalse(hooks)
+        with hooks.stage('format'):
+            pass
+        callback = lambda event, info: None
+        hooks.add(callback)
+        self.assertTrue(hooks)
+        hooks.remove(callback)
+        self.assertFalse(hooks)
+
+
+class TestProfiler(unittest.TestCase):
+    """Test the profiler against a scrape of the mock server"""
+
+    def scrape(self, **server_options):
+        profiler = Profiler()
+        events = []
+        hooks = Hooks([profiler, lambda event, info: events.append((event, info))])
+        with MockBilibiliServer(videos_per_user=120, **server_options) as server:
+            scraper = BilibiliScraper(delay=0, api_base=server.url, hooks=hooks,
+                                      retry=RetryPolicy(max_attempts=2, backoff=0))
+            with contextlib.redirect_stdout(io.StringIO()):
+                data = scraper.scrape_up_master('7')
+            scraper.close()
+        return profiler, events, data
+
+    def test_request_events(self):
+        """Test that every request is reported with status, code, bytes and latency"""
+        profiler, events, data = self.scrape()
+        self.assertEqual(data['total_videos'], 120)
+
+        ends = [info for event, info in events if event == 'request_end']
+        starts = [info for event, info in events if event == 'request_start']
+        self.assertEqual(len(starts), len(ends))
+        endpoints = {info['endpoint'] for info in ends}
+        self.assertIn('/x/space/wbi/arc/search', endpoints)
+        self.assertIn('/x/web-interface/nav', endpoints)
+        for info in ends:
+            self.assertEqual(info['status'], 200)
+            self.assertIn(info['code'], (0, -101))
+            self.assertGreater(info['bytes'], 0)
+            self.assertIsNone(info['error'])
+
+        self.assertEqual(profiler.requests[('/x/space/wbi/arc/search', '200')], 3)
+        self.assertEqual(profiler.codes[('/x/space/wbi/arc/search', '0')], 3)
+        self.assertEqual({'fetch', 'sign', 'format'} - set(profiler.stages), set())
+        self.assertEqual(profiler.stages['format'][1], 1)
+
+    def test_http_errors(self):
+        """Test that failed requests are counted by status"""
+        profiler, events, data = self.scrape(error_rate=1.0)
+        self.assertFalse(data)
+        failures = [info for event, info in events if event == 'request_end']
+        self.assertTrue(failures)
+        self.assertTrue(all(info['status'] == 500 and info['error'] == 'HTTPError' for info in failures))
+        self.assertIn('retry_wait', profiler.stages)
+
+    def test_report(self):
+        """Test the text report"""
+        profiler, _, _ = self.scrape()
+        report = profiler.report()
+        self.assertIn('Time by stage', report)
+        self.assertIn('/x/space/wbi/arc/search: 3 requests', report)
+        self.assertIn('HTTP status: 200: 3; API code: 0: 3', report)
+
+    def test_prometheus(self):
+        """Test the Prometheus text exposition"""
+        profiler, _, _ = self.scrape()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = profiler.write_prometheus(os.path.join(tmp, 'metrics', 'billbillbug.prom'),
+                                             {'retries_total': ('Retries', 2)})
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+            self.assertEqual(os.listdir(os.path.dirname(path)), ['billbillbug.prom'])
+
+        self.assertIn('billbillbug_requests_total{endpoint="/x/space/wbi/arc/search",status="200"} 3', text)
+        self.assertIn('billbillbug_api_responses_total{endpoint="/x/space/wbi/arc/search",code="0"} 3', text)
+        self.assertIn('billbillbug_request_duration_seconds_bucket{endpoint="/x/space/wbi/arc/search",le="+Inf"} 3',
+                      text)
+        self.assertIn('billbillbug_request_duration_seconds_count{endpoint="/x/space/wbi/arc/search"} 3', text)
+        self.assertIn('# TYPE billbillbug_request_duration_seconds histogram', text)
+        self.assertIn('billbillbug_retries_total 2', text)
+        sample = re.compile(r'^billbillbug_\w+(\{[^}]*\})? \S+$')
+        for line in text.splitlines():
+            self.assertTrue(line.startswith('# ') or sample.match(line), line)
+
+    def test_export_stage(self):
+        """Test that DataExporter reports its exports"""
+        profiler = Profiler()
+        exporter = DataExporter(hooks=Hooks([profiler]))
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            exporter.export_to_json({'videos': [{'title': 'a'}]}, os.path.join(tmp, 'v.json'))
+            exporter.export_to_csv({'videos': [{'title': 'a'}]}, os.path.join(tmp, 'v.csv'))
+            # Exports through the class or another instance are not reported
+            DataExporter.export_to_json({'videos': [{'title': 'a'}]}, os.path.join(tmp, 'w.json'))
+            DataExporter().export_to_json({'videos': [{'title': 'a'}]}, os.path.join(tmp, 'x.json'))
+        self.assertEqual(profiler.stages['export'][1], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
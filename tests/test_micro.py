@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Tests for the micro-benchmark runner
+"""
+
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench.micro import compare, make_dataset, run_suite
+
+
+class TestMicroBenchmarks(unittest.TestCase):
+    """Test the micro-benchmark runner"""
+
+    def test_make_dataset(self):
+        """Test that datasets hold raw and formatted videos"""
+        dataset = make_dataset(5)
+        self.assertEqual(len(dataset['raw']), 5)
+        self.assertEqual(dataset['data']['total_videos'], 5)
+        self.assertEqual(dataset['data']['videos'][0]['up_name'], '示例UP主')
+
+    def test_run_suite(self):
+        """Test that every selected case reports time and allocations"""
+        with contextlib.redirect_stderr(io.StringIO()):
+            document = run_suite([20], ['format_video_data', 'export_to_csv'], repeat=1)
+
+        self.assertEqual([r['case'] for r in document['results']], ['format_video_data', 'export_to_csv'])
+        for result in document['results']:
+            self.assertGreater(result['min_s'], 0)
+            self.assertGreater(result['peak_alloc_bytes'], 0)
+
+    def test_compare_flags_regressions(self):
+        """Test that slower or hungrier cases are flagged"""
+        def document(seconds, peak):
+            return {'meta': {}, 'results': [
+                {'case': 'export_to_csv', 'size': 10, 'min_s': seconds, 'peak_alloc_bytes': peak},
+            ]}
+
+        self.assertFalse(compare(document(1.0, 100), document(1.05, 100))[0]['regression'])
+        self.assertTrue(compare(document(1.0, 100), document(1.5, 100))[0]['regression'])
+        self.assertTrue(compare(document(1.0, 100), document(1.0, 200))[0]['regression'])
+
+
+if __name__ == '__main__':
+    unittest.main()
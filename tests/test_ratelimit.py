@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the request rate limiters
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.ratelimit import TokenBucket, FileTokenBucket, fcntl
+from billbillbug.scraper import BilibiliScraper
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test the in-process token bucket"""
+
+    def test_burst_then_metered(self):
+        """Test that a full bucket serves a burst and then meters requests"""
+        bucket = TokenBucket(rate=50, capacity=3)
+        waits = [bucket.acquire() for _ in range(5)]
+
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(waits[3], 0.02, delta=0.01)
+        self.assertAlmostEqual(waits[4], 0.02, delta=0.01)
+
+    def test_invalid_arguments(self):
+        """Test argument validation"""
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=1, capacity=0.5)
+
+    def test_scraper_uses_delay_as_default_budget(self):
+        """Test that the scraper turns delay into an equivalent bucket"""
+        scraper = BilibiliScraper(delay=0.5)
+        self.assertIsInstance(scraper.rate_limiter, TokenBucket)
+        self.assertEqual(scraper.rate_limiter.rate, 2.0)
+
+        self.assertIsNone(BilibiliScraper(delay=0).rate_limiter)
+
+        bucket = TokenBucket(rate=10)
+        self.assertIs(BilibiliScraper(rate_limiter=bucket).rate_limiter, bucket)
+
+
+@unittest.skipIf(fcntl is None, "fcntl not available")
+class TestFileTokenBucket(unittest.TestCase):
+    """Test the cross-process token bucket"""
+
+    def test_buckets_share_one_budget(self):
+        """Test that two buckets on the same file draw from one budget"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bucket')
+            first = FileTokenBucket(path, rate=20, capacity=2)
+            second = FileTokenBucket(path, rate=20, capacity=2)
+
+            started = time.monotonic()
+            self.assertEqual(first.acquire(), 0.0)
+            self.assertEqual(second.acquire(), 0.0)
+            self.assertGreater(first.acquire(), 0.0)  # bucket is shared, so now empty
+            self.assertGreaterEqual(time.monotonic() - started, 0.04)
+
+            first.close()
+            second.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
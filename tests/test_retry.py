@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests for request retries and the circuit breaker
+"""
+
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+import unittest
+from email.utils import formatdate
+
+import requests
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench.mock_server import MockBilibiliServer
+from billbillbug.retry import CircuitBreaker, RetryPolicy
+from billbillbug.scraper import BilibiliScraper
+
+
+def http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+def replay(*outcomes):
+    """send() function returning or raising the given outcomes in order"""
+    outcomes = list(outcomes)
+    calls = []
+
+    def send():
+        calls.append(1)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    send.calls = calls
+    return send
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Test RetryPolicy classification, backoff and metrics"""
+
+    def test_classification(self):
+        """Test which failures are retried"""
+        self.assertEqual(RetryPolicy.classify_error(requests.Timeout()), 'timeout')
+        self.assertEqual(RetryPolicy.classify_error(requests.ConnectionError()), 'connection')
+        self.assertEqual(RetryPolicy.classify_error(http_error(503)), 'server_error')
+        self.assertEqual(RetryPolicy.classify_error(http_error(412)), 'throttled')
+        self.assertIsNone(RetryPolicy.classify_error(http_error(404)))
+        self.assertEqual(RetryPolicy.classify_data({'code': -799}), 'throttled')
+        self.assertIsNone(RetryPolicy.classify_data({'code': -404}))
+        self.assertIsNone(RetryPolicy.classify_data({'code': 0}))
+
+    def test_backoff_honours_retry_after(self):
+        """Test jittered backoff bounds and Retry-After parsing"""
+        policy = RetryPolicy(backoff=1.0, max_backoff=4.0)
+        for retry in range(1, 6):
+            self.assertLessEqual(policy.delay(retry), min(4.0, 2 ** (retry - 1)))
+        self.assertEqual(policy.delay(1, retry_after=7.0), 7.0)
+
+        self.assertEqual(RetryPolicy.retry_after(http_error(429, {'Retry-After': '3'})), 3.0)
+        in_a_minute = RetryPolicy.retry_after(http_error(429, {'Retry-After': formatdate(time.time() + 60)}))
+        self.assertTrue(55 <= in_a_minute <= 60)
+        self.assertIsNone(RetryPolicy.retry_after(http_error(503)))
+
+    def test_retries_until_success(self):
+        """Test that transient failures are retried and counted"""
+        policy = RetryPolicy(max_attempts=4, backoff=0)
+        send = replay(requests.Timeout(), {'code': -799}, http_error(502), {'code': 0, 'data': 1})
+
+        self.assertEqual(policy.call(send), {'code': 0, 'data': 1})
+        stats = policy.stats()
+        self.assertEqual(stats['retries'], 3)
+        self.assertEqual(stats['by_reason'], {'timeout': 1, 'throttled': 1, 'server_error': 1})
+        self.assertEqual(stats['retried_requests'], 1)
+        self.assertEqual(stats['gave_up'], 0)
+
+    def test_gives_up(self):
+        """Test that permanent errors fail at once and retries are bounded"""
+        policy = RetryPolicy(max_attempts=3, backoff=0)
+        send = replay(http_error(404))
+        with self.assertRaises(requests.HTTPError):
+            policy.call(send)
+        self.assertEqual(len(send.calls), 1)
+
+        send = replay(*[{'code': -412}] * 3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(policy.call(send), {'code': -412})
+        self.assertEqual(len(send.calls), 3)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(requests.Timeout):
+                policy.call(replay(*[requests.Timeout()] * 3))
+        self.assertEqual(policy.stats()['gave_up'], 2)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test the shared circuit breaker"""
+
+    def test_opens_and_probes(self):
+        """Test that a high throttle rate pauses requests and a failed probe doubles the pause"""
+        breaker = CircuitBreaker(threshold=0.5, window=4, min_requests=4, cooldown=0.05)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for throttled in (False, True, False):
+                breaker.record(throttled)
+            self.assertFalse(breaker.is_open)
+            breaker.record(True)
+            self.assertTrue(breaker.is_open)
+            self.assertEqual(breaker.trips, 1)
+
+            self.assertGreater(breaker.wait(), 0.03)
+            self.assertFalse(breaker.is_open)
+            breaker.record(True)  # Failed probe
+            self.assertEqual(breaker.trips, 2)
+            self.assertGreater(breaker.wait(), 0.08)
+
+            breaker.record(False)  # Successful probe closes it
+            breaker.record(True)
+            self.assertFalse(breaker.is_open)
+
+
+    def test_in_flight_requests_and_single_probe(self):
+        """Test that requests in flight at a trip are ignored and one probe runs at a time"""
+        breaker = CircuitBreaker(threshold=0.5, window=4, min_requests=4, cooldown=0.1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            tickets = [breaker.acquire()[1] for _ in range(8)]
+            for ticket in tickets:
+                breaker.record(True, ticket)  # Eight workers throttled together
+            self.assertEqual(breaker.trips, 1)
+
+            admitted = []
+            lock = threading.Lock()
+
+            def worker():
+                ticket = breaker.acquire()[1]
+                with lock:
+                    admitted.append(ticket)
+
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            time.sleep(0.3)
+            self.assertEqual(len(admitted), 1)  # Only the probe is through
+
+            breaker.record(False, admitted[0])
+            for thread in threads:
+                thread.join(timeout=5)
+            self.assertEqual(len(admitted), 8)
+            self.assertEqual(breaker.trips, 1)
+            self.assertFalse(breaker.is_open)
+
+
+class TestScraperRetries(unittest.TestCase):
+    """Test retries against the mock API"""
+
+    def test_flaky_server_complete_crawl(self):
+        """Test that throttling and server errors no longer truncate a crawl"""
+        policy = RetryPolicy(max_attempts=10, backoff=0)
+        with MockBilibiliServer(throttle_rate=0.3, error_rate=0.1, videos_per_user=260, seed=3) as server:
+            scraper = BilibiliScraper(delay=0, api_base=server.url, retry=policy)
+            with contextlib.redirect_stdout(io.StringIO()):
+                data = scraper.scrape_up_master('42')
+            server_stats = server.stats()
+
+        self.assertEqual(data['total_videos'], 260)
+        stats = policy.stats()
+        self.assertGreater(stats['retries'], 0)
+        self.assertEqual(stats['retries'], server_stats['throttled'] + server_stats['errors'])
+        self.assertEqual(scraper.request_count, server_stats['requests'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the adaptive re-crawl scheduler
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.scheduler import CrawlScheduler
+
+DAY = 86400
+NOW = 1_700_000_000.0
+
+
+def crawl(uploads_per_day: float, fans: int = 0, days: int = 90):
+    """Scrape result of a UP master uploading at a steady rate"""
+    count = int(uploads_per_day * days)
+    videos = [{'bvid': f"BV{i}", 'created': int(NOW - i * DAY / uploads_per_day)} for i in range(count)]
+    return {'user_info': {'mid': 1, 'fans': fans}, 'videos': videos}
+
+
+class TestCrawlScheduler(unittest.TestCase):
+    """Test scheduling decisions and queue statistics"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'schedule.db')
+        self.scheduler = CrawlScheduler(self.path, jitter=0)
+
+    def tearDown(self):
+        self.scheduler.close()
+        self.tmp.cleanup()
+
+    def test_new_uids_are_due(self):
+        """Test that added UIDs are due immediately and only added once"""
+        self.assertEqual(self.scheduler.add(['1', '2', '3'], now=NOW), 3)
+        self.assertEqual(self.scheduler.add(['3', '4'], now=NOW + 1), 1)
+        self.assertEqual(len(self.scheduler), 4)
+        self.assertEqual(self.scheduler.due(now=NOW), ['1', '2', '3'])
+        self.assertEqual(self.scheduler.due(limit=2, now=NOW + 1), ['1', '2'])
+
+    def test_active_accounts_come_due_sooner(self):
+        """Test that the interval follows the upload rate and audience"""
+        self.scheduler.add(['daily', 'weekly', 'dormant', 'popular'], now=NOW)
+        daily = self.scheduler.record('daily', crawl(1.0), now=NOW) - NOW
+        weekly = self.scheduler.record('weekly', crawl(1 / 7, days=365), now=NOW) - NOW
+        dormant = self.scheduler.record('dormant', {'user_info': {'mid': 3}, 'videos': []}, now=NOW) - NOW
+        popular = self.scheduler.record('popular', crawl(1.0, fans=1_000_000), now=NOW) - NOW
+
+        self.assertAlmostEqual(daily, DAY, delta=1)
+        self.assertAlmostEqual(weekly, 7 * DAY, delta=DAY / 5)
+        self.assertEqual(dormant, self.scheduler.max_interval)
+        self.assertAlmostEqual(popular, DAY / 3, delta=1)
+        self.assertEqual(self.scheduler.due(now=NOW + DAY / 2), ['popular'])
+
+    def test_rate_adapts_between_crawls(self):
+        """Test that uploads seen between crawls update the rate estimate"""
+        self.scheduler.add(['1'], now=NOW)
+        data = crawl(1.0)
+        first = self.scheduler.record('1', data, now=NOW) - NOW
+
+        # Ten uploads in the next day: the account became much more active
+        later = NOW + DAY
+        data['videos'] = [{'bvid': f"new{i}", 'created': int(later - i * 3600)} for i in range(10)] + data['videos']
+        second = self.scheduler.record('1', data, now=later) - later
+        self.assertLess(second, first / 4)
+
+    def test_failures_back_off(self):
+        """Test that failed crawls are retried with exponential backoff"""
+        self.scheduler.add(['1'], now=NOW)
+        intervals = [self.scheduler.record('1', None, now=NOW) - NOW for _ in range(3)]
+        self.assertEqual(intervals, [3600, 7200, 14400])
+        self.assertEqual(self.scheduler.stats(now=NOW)['failing'], 1)
+
+        self.scheduler.record('1', crawl(1.0), now=NOW)
+        self.assertEqual(self.scheduler.stats(now=NOW)['failing'], 0)
+
+    def test_stats_and_persistence(self):
+        """Test queue statistics, and that the queue survives reopening"""
+        self.scheduler.add(['1', '2', '3'], now=NOW)
+        self.scheduler.record('1', crawl(1.0), now=NOW)
+        self.scheduler.close()
+
+        self.scheduler = CrawlScheduler(self.path, jitter=0)
+        stats = self.scheduler.stats(now=NOW + 100)
+        self.assertEqual(stats['tracked'], 3)
+        self.assertEqual(stats['due'], 2)
+        self.assertEqual(stats['never_crawled'], 2)
+        self.assertEqual(stats['overdue_seconds'], {'median': 100.0, 'max': 100.0})
+        self.assertEqual(stats['staleness_seconds'], {'mean': 100.0, 'max': 100.0})
+        self.assertAlmostEqual(stats['next_due_seconds'], DAY - 100, delta=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
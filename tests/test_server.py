@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Tests for the scraper daemon
+"""
+
+import contextlib
+import http.client
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.request
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench.mock_server import MockBilibiliServer
+from billbillbug.scraper import BilibiliScraper
+from billbillbug.server import LRUCache, ScraperService, SingleFlight, make_server
+
+
+class TestLRUCache(unittest.TestCase):
+    """Test the in-memory LRU"""
+
+    def test_eviction_order(self):
+        """Test that the least recently used entry is evicted"""
+        cache = LRUCache(max_entries=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_ttl(self):
+        """Test that entries expire"""
+        cache = LRUCache(ttl=0.05)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        time.sleep(0.06)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test call coalescing"""
+
+    def test_concurrent_calls_share_one_result(self):
+        """Test that callers arriving during a call wait for its result"""
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('key', fetch))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        while flight.coalesced < 7:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(flight.do('key', lambda: 'again'), 'again')
+
+    def test_errors_are_shared(self):
+        """Test that the exception of the call is raised"""
+        flight = SingleFlight()
+        with self.assertRaises(KeyError):
+            flight.do('key', lambda: {}['missing'])
+
+
+class TestScraperService(unittest.TestCase):
+    """Test the daemon against the mock Bilibili server"""
+
+    def setUp(self):
+        self.upstream = MockBilibiliServer(videos_per_user=120, latency=0.02)
+        self.upstream.start()
+        scraper = BilibiliScraper(delay=0, api_base=self.upstream.url)
+        self.service = ScraperService(scraper, ttl=60, workers=2)
+        self.quiet = contextlib.redirect_stdout(io.StringIO())
+        self.quiet.__enter__()
+
+    def tearDown(self):
+        self.quiet.__exit__(None, None, None)
+        self.service.close()
+        self.upstream.stop()
+
+    def serve(self, server):
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+    def test_scrape_is_cached(self):
+        """Test that a repeated scrape is answered from memory"""
+        data = self.service.scrape('7')
+        self.assertEqual(data['total_videos'], 120)
+        requests_sent = self.upstream.stats()['requests']
+        self.assertEqual(self.service.scrape('7'), data)
+        self.assertEqual(self.service.scrape('7', 60)['total_videos'], 60)
+        self.assertEqual(self.upstream.stats()['requests'], requests_sent)
+
+    def test_concurrent_pages_coalesce(self):
+        """Test that identical concurrent requests send one upstream request"""
+        self.service.warm_up()
+        before = self.upstream.stats()['requests']
+        threads = [threading.Thread(target=self.service.videos, args=('9', 2)) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.upstream.stats()['requests'] - before, 1)
+        self.assertEqual(self.service.stats()['coalesced'] + self.service.cache.hits, 9)
+
+    def test_http_api_and_jobs(self):
+        """Test the HTTP endpoints"""
+        server = make_server(self.service, port=0)
+        self.serve(server)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        info = json.load(urllib.request.urlopen(f"{base}/users/7"))
+        self.assertEqual(info['name'], 'mock_up_7')
+        page = json.load(urllib.request.urlopen(f"{base}/users/7/videos?page=3"))
+        self.assertEqual(len(page['list']['vlist']), 20)
+
+        request = urllib.request.Request(f"{base}/jobs", data=json.dumps({'uid': 8, 'max_videos': 10}).encode(),
+                                         method='POST')
+        job = json.load(urllib.request.urlopen(request))
+        self.assertEqual(job['status'], 'queued')
+        for _ in range(100):
+            job = json.load(urllib.request.urlopen(f"{base}/jobs/{job['id']}"))
+            if job['status'] in ('done', 'failed'):
+                break
+            time.sleep(0.02)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result']['total_videos'], 10)
+
+        for path, status in [('/users/7/videos?page=0', 400), ('/jobs/999', 404), ('/nothing', 404)]:
+            with self.assertRaises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(base + path)
+            self.assertEqual(error.exception.code, status)
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "Unix sockets are not available")
+    def test_unix_socket(self):
+        """Test serving over a Unix socket"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'billbillbug.sock')
+            server = make_server(self.service, unix_socket=path)
+            self.serve(server)
+
+            connection = http.client.HTTPConnection('localhost')
+            connection.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.sock.connect(path)
+            connection.request('GET', '/users/7/scrape?max_videos=5')
+            response = connection.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertEqual(json.loads(response.read())['total_videos'], 5)
+            connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
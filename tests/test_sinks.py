@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming rows and export sinks
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.exporter import DataExporter
+from billbillbug.scraper import BilibiliScraper
+from billbillbug.sinks import CSVSink, NDJSONSink
+
+
+class TestSinks(unittest.TestCase):
+    """Test the streaming sinks"""
+
+    def test_ndjson_sink(self):
+        """Test NDJSON output with and without a schema"""
+        out = io.StringIO()
+        with NDJSONSink(out) as sink:
+            sink.write({'title': '视频', 'play': 1})
+            sink.write_many([{'title': 'b', 'play': 2}])
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], '{"title": "视频", "play": 1}')
+        self.assertEqual(sink.count, 2)
+
+        out = io.StringIO()
+        with NDJSONSink(out, fields=['play', 'bvid']) as sink:
+            sink.write({'title': 'a', 'play': 1})
+        self.assertEqual(json.loads(out.getvalue()), {'play': 1, 'bvid': ''})
+
+    def test_csv_sink_declared_header(self):
+        """Test that the CSV header comes from the schema, not the rows"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.csv')
+            with CSVSink(path, ['bvid', 'play']) as sink:
+                sink.write({'bvid': 'BV1', 'play': 5, 'extra': 'dropped'})
+
+            with open(path, 'r', encoding='utf-8') as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(rows, [['bvid', 'play'], ['BV1', '5']])
+
+    def test_export_to_ndjson(self):
+        """Test the NDJSON exporter"""
+        data = {'videos': [{'bvid': 'BV1'}, {'bvid': 'BV2'}]}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = DataExporter.export_to_ndjson(data, os.path.join(tmp, 'v.ndjson'))
+            with open(path, 'r', encoding='utf-8') as f:
+                self.assertEqual([json.loads(line)['bvid'] for line in f], ['BV1', 'BV2'])
+
+
+class TestIterUserVideos(unittest.TestCase):
+    """Test the streaming scraper API"""
+
+    def test_pages_are_fetched_lazily(self):
+        """Test that rows are yielded before later pages are requested"""
+        pages = []
+
+        def fake_get_user_videos(scraper, uid, page=1, page_size=50):
+            pages.append(page)
+            count = 50 if page < 3 else 10
+            return {'list': {'vlist': [{'bvid': f'BV{page}_{i}', 'created': 0} for i in range(count)]}}
+
+        with mock.patch.object(BilibiliScraper, 'get_user_videos', fake_get_user_videos):
+            rows = BilibiliScraper(delay=0).iter_user_videos('1', {'name': 'UP'})
+            first = next(rows)
+            self.assertEqual(pages, [1])
+            self.assertEqual(first['up_name'], 'UP')
+            self.assertEqual(list(first), BilibiliScraper.video_fields())
+
+            self.assertEqual(1 + sum(1 for _ in rows), 110)
+            self.assertEqual(pages, [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental crawling
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.async_scraper import AsyncBilibiliScraper
+from billbillbug.scraper import BilibiliScraper
+from billbillbug.state import CrawlState, merge_videos
+
+
+class TestCrawlState(unittest.TestCase):
+    """Test the CrawlState store"""
+
+    def test_record_and_forget(self):
+        """Test recording known videos per UID"""
+        with tempfile.TemporaryDirectory() as tmp:
+            with CrawlState(os.path.join(tmp, 'state.db')) as state:
+                self.assertEqual(state.known_bvids('1'), set())
+                self.assertEqual(state.newest_created('1'), 0)
+
+                state.record_videos('1', [
+                    {'bvid': 'BV1', 'created': 1640995200},
+                    {'bvid': 'BV2', 'created': 1641995200},
+                ])
+                state.record_videos('2', [{'bvid': 'BV3', 'created': '2022-01-01 00:00:00'}])
+
+                self.assertEqual(state.known_bvids('1'), {'BV1', 'BV2'})
+                self.assertEqual(state.newest_created('1'), 1641995200)
+                self.assertEqual(state.known_bvids('2'), {'BV3'})
+
+                state.forget('1')
+                self.assertEqual(state.known_bvids('1'), set())
+                self.assertEqual(state.known_bvids('2'), {'BV3'})
+
+    def test_merge_videos(self):
+        """Test merging new videos into a previous dataset"""
+        previous = [{'bvid': 'BV2', 'play': 1}, {'bvid': 'BV1', 'play': 1}]
+        new = [{'bvid': 'BV3', 'play': 5}, {'bvid': 'BV2', 'play': 9}]
+
+        merged = merge_videos(new, previous)
+        self.assertEqual([v['bvid'] for v in merged], ['BV3', 'BV2', 'BV1'])
+        self.assertEqual(merged[1]['play'], 9)
+
+
+class TestIncrementalPagination(unittest.TestCase):
+    """Test that pagination stops at known videos"""
+
+    def setUp(self):
+        self.videos = [{'bvid': f'BV{i:04d}', 'created': 2000000000 - i} for i in range(500)]
+        self.pages = []
+
+        def fake_get_user_videos(scraper, uid, page=1, page_size=50):
+            self.pages.append(page)
+            start = (page - 1) * 50
+            return {'list': {'vlist': self.videos[start:start + 50]}, 'page': {'count': len(self.videos)}}
+
+        patcher = mock.patch.object(BilibiliScraper, 'get_user_videos', fake_get_user_videos)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sync_stops_at_first_known_video(self):
+        """Test the sync scraper only walks the pages holding new videos"""
+        known = {v['bvid'] for v in self.videos[70:]}
+        result = BilibiliScraper(delay=0).get_all_user_videos('1', known_bvids=known)
+
+        self.assertEqual(result, self.videos[:70])
+        self.assertEqual(self.pages, [1, 2])
+
+    def test_async_stops_at_first_known_video(self):
+        """Test the async scraper does not fan out when known videos are given"""
+        known = {v['bvid'] for v in self.videos[70:]}
+
+        async def run():
+            async with AsyncBilibiliScraper(delay=0) as scraper:
+                return await scraper.get_all_user_videos('1', known_bvids=known)
+
+        self.assertEqual(asyncio.run(run()), self.videos[:70])
+        self.assertEqual(self.pages, [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite storage backend
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.exporter import DataExporter
+from billbillbug.storage import SQLiteExporter
+
+
+class TestSQLiteExporter(unittest.TestCase):
+    """Test the SQLiteExporter functionality"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'bilibili.db')
+        self.data = {
+            'user_info': {'mid': 123456, 'name': 'Test UP Master', 'level': 5, 'fans': 10000},
+            'videos': [
+                {'title': 'Test Video 1', 'bvid': 'BV1test001', 'aid': 1001, 'play': 5000,
+                 'created': '2024-01-01 12:00:00', 'up_name': 'Test UP Master'},
+                {'title': 'Test Video 2', 'bvid': 'BV1test002', 'aid': 1002, 'play': '--',
+                 'created': '2024-01-02 15:30:00', 'up_name': 'Test UP Master'},
+            ],
+            'total_videos': 2,
+            'scrape_time': '2024-01-03 00:00:00'
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def query(self, sql):
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    def test_export_normalized_tables(self):
+        """Test that users and videos land in their own tables"""
+        DataExporter.export_to_sqlite(self.data, self.path)
+
+        self.assertEqual(self.query('SELECT mid, name, fans, total_videos FROM users'),
+                         [(123456, 'Test UP Master', 10000, 2)])
+        self.assertEqual(self.query('SELECT bvid, mid, play FROM videos ORDER BY bvid'),
+                         [('BV1test001', 123456, 5000), ('BV1test002', 123456, None)])
+        self.assertEqual(self.query('PRAGMA journal_mode'), [('wal',)])
+
+        indexes = {row[0] for row in self.query("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertTrue({'idx_videos_mid', 'idx_videos_created', 'idx_videos_play'} <= indexes)
+
+    def test_recrawl_updates_in_place(self):
+        """Test that a second export updates rows instead of duplicating them"""
+        DataExporter.export_to_sqlite(self.data, self.path)
+        self.data['videos'][0]['play'] = 6000
+        self.data['user_info']['fans'] = 20000
+        DataExporter.export_to_sqlite(self.data, self.path)
+
+        self.assertEqual(self.query('SELECT COUNT(*) FROM videos'), [(2,)])
+        self.assertEqual(self.query("SELECT play FROM videos WHERE bvid = 'BV1test001'"), [(6000,)])
+        self.assertEqual(self.query('SELECT fans FROM users'), [(20000,)])
+
+    def test_projected_recrawl_keeps_other_columns(self):
+        """Test that an export projected to some fields only updates those columns"""
+        DataExporter.export_to_sqlite(self.data, self.path)
+        self.data['videos'] = [{'bvid': 'BV1test001', 'play': 7000}, {'bvid': 'BV1test003', 'play': 1}]
+        DataExporter.export_to_sqlite(self.data, self.path, fields=['bvid', 'play', 'up_fans'])
+
+        self.assertEqual(self.query('SELECT bvid, aid, mid, title, play, created FROM videos ORDER BY bvid'), [
+            ('BV1test001', 1001, 123456, 'Test Video 1', 7000, '2024-01-01 12:00:00'),
+            ('BV1test002', 1002, 123456, 'Test Video 2', None, '2024-01-02 15:30:00'),
+            ('BV1test003', None, 123456, None, 1, None),
+        ])
+
+    def test_batched_upsert(self):
+        """Test that rows are consumed from a generator across several batches"""
+        with SQLiteExporter(self.path, batch_size=7) as db:
+            written = db.upsert_videos(({'bvid': f'BV{i}', 'play': i} for i in range(50)), mid=1)
+
+        self.assertEqual(written, 50)
+        self.assertEqual(self.query('SELECT COUNT(*), SUM(play) FROM videos WHERE mid = 1'), [(50, 1225)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for the compact VideoTable
+"""
+
+import csv
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.exporter import DataExporter
+from billbillbug.scraper import BilibiliScraper
+from billbillbug.state import merge_videos
+from billbillbug.table import VideoTable
+
+USER_INFO = {'mid': 42, 'name': 'Test UP Master', 'face': 'face.jpg', 'sign': 'sign', 'level': 6, 'fans': 1000}
+
+
+def make_raw_videos(count):
+    """Build raw API videos"""
+    return [{
+        'title': f'视频 {i}', 'bvid': f'BV{i}', 'aid': i, 'pic': f'{i}.jpg', 'author': 'UP', 'mid': 42,
+        'play': i * 10, 'video_review': i, 'favorites': i, 'created': 1700000000 - i * 3600,
+        'length': '01:00', 'description': '',
+    } for i in range(count)]
+
+
+class TestVideoTable(unittest.TestCase):
+    """Test the VideoTable functionality"""
+
+    def setUp(self):
+        self.scraper = BilibiliScraper(delay=0)
+        self.raw = make_raw_videos(5)
+        self.raw[1]['play'] = '--'  # Hidden counter
+        del self.raw[2]['created']
+
+    def test_rows_match_format_video_data(self):
+        """Test that lazy rows equal the dict-per-video format"""
+        expected = self.scraper.format_video_data(self.raw, USER_INFO)
+        table = self.scraper.format_video_table(self.raw, USER_INFO)
+
+        self.assertEqual(len(table), 5)
+        self.assertEqual(list(table), expected)
+        self.assertEqual(table[-1], expected[-1])
+        self.assertEqual(table[1:3], expected[1:3])
+        self.assertEqual(table.fields, list(expected[0].keys()))
+        self.assertEqual(table.column('play'), [0, '--', 20, 30, 40])
+
+    def test_round_trip_from_rows(self):
+        """Test rebuilding a table from formatted rows"""
+        rows = self.scraper.format_video_data(self.raw, USER_INFO)
+        table = VideoTable.from_rows(rows)
+
+        self.assertEqual(table.to_dicts(), rows)
+        self.assertEqual(table.user_info['name'], 'Test UP Master')
+
+    def test_exporters_accept_tables(self):
+        """Test exporting a table directly and inside a data dictionary"""
+        table = self.scraper.format_video_table(self.raw, USER_INFO)
+        rows = table.to_dicts()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_file = DataExporter.export_to_json({'videos': table}, os.path.join(tmp, 'v.json'))
+            csv_file = DataExporter.export_to_csv(table, os.path.join(tmp, 'v.csv'))
+            summary_file = DataExporter.export_summary_txt(table, os.path.join(tmp, 's.txt'))
+
+            with open(json_file, 'r', encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['videos'], rows)
+            with open(csv_file, 'r', encoding='utf-8') as f:
+                self.assertEqual([row['bvid'] for row in csv.DictReader(f)], [row['bvid'] for row in rows])
+            with open(summary_file, 'r', encoding='utf-8') as f:
+                self.assertIn('Name: Test UP Master', f.read())
+
+    def test_compact_scraper_and_merge(self):
+        """Test that compact scrapers return tables that merge like lists"""
+        scraper = BilibiliScraper(delay=0, compact=True)
+        scraper.get_user_info = lambda uid: USER_INFO
+        scraper.get_all_user_videos = lambda uid, max_videos=None, known_bvids=None, checkpoint=None: self.raw
+
+        data = scraper.scrape_up_master('42')
+        self.assertIsInstance(data['videos'], VideoTable)
+
+        merged = merge_videos(data['videos'], [{'bvid': 'BV0'}, {'bvid': 'old'}])
+        self.assertEqual([video['bvid'] for video in merged], ['BV0', 'BV1', 'BV2', 'BV3', 'BV4', 'old'])
+
+    def test_field_projection(self):
+        """Test that a projection only builds the requested fields, in output order"""
+        scraper = BilibiliScraper(delay=0, fields='up_fans, created,play,length')
+        self.assertEqual(scraper.fields, ['bvid', 'play', 'created', 'length', 'up_fans'])
+
+        rows = scraper.format_video_data(self.raw, USER_INFO)
+        full = self.scraper.format_video_data(self.raw, USER_INFO)
+        self.assertEqual(rows, [{field: row[field] for field in scraper.fields} for row in full])
+        self.assertEqual(list(rows[0]), scraper.fields)
+
+        table = scraper.format_video_table(self.raw, USER_INFO)
+        self.assertEqual(table.fields, scraper.fields)
+        self.assertEqual(list(table), rows)
+        self.assertNotIn('description', table._strs)
+
+        with self.assertRaises(ValueError):
+            BilibiliScraper.resolve_fields(['play', 'likes'])
+
+    def test_raw_passthrough(self):
+        """Test that raw fields keep the API videos, even for compact scrapers"""
+        scraper = BilibiliScraper(delay=0, compact=True, fields=BilibiliScraper.RAW_FIELDS)
+        self.assertEqual(scraper.format_video_table(self.raw, USER_INFO), self.raw)
+        self.assertIsNone(scraper.row_fields())
+
+    def test_exporters_project_rows(self):
+        """Test the fields option of the exporters"""
+        rows = self.scraper.format_video_data(self.raw, USER_INFO)
+        with tempfile.TemporaryDirectory() as tmp:
+            json_file = DataExporter.export_to_json({'videos': rows, 'other': [{'a': 1}]},
+                                                    os.path.join(tmp, 'v.json'), fields=['bvid', 'play'])
+            ndjson_file = DataExporter.export_to_ndjson({'videos': rows}, os.path.join(tmp, 'v.ndjson'),
+                                                        fields=['play', 'bvid'])
+            with open(json_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.assertEqual(data['videos'][1], {'bvid': 'BV1', 'play': '--'})
+            self.assertEqual(data['other'], [{'a': 1}])
+            with open(ndjson_file, 'r', encoding='utf-8') as f:
+                self.assertEqual(json.loads(f.readline()), {'play': 0, 'bvid': 'BV0'})
+
+
+if __name__ == '__main__':
+    unittest.main()
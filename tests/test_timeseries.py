@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the video statistics time-series store
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.timeseries import StatsStore, np
+
+HOUR = 3600
+START = 1_700_000_000
+
+
+def crawl(hour: int, videos: int = 4):
+    """Formatted rows of two UP masters, each video gaining (index + 1) * 10 views per hour"""
+    return [{'bvid': f"BV{i}", 'mid': 1 + i % 2, 'play': 1000 + (i + 1) * 10 * hour,
+             'video_review': hour, 'favorites': '--' if i == 0 else i} for i in range(videos)]
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TestStatsStore(unittest.TestCase):
+    """Test appends, range and rate queries"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = StatsStore(self.tmp.name)
+        for hour in range(25):
+            self.store.append(crawl(hour), timestamp=START + hour * HOUR)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_series(self):
+        """Test the history of one video, with missing counters skipped"""
+        times, values = self.store.series('BV1', start=START + 22 * HOUR)
+        self.assertEqual(times.tolist(), [START + h * HOUR for h in (22, 23, 24)])
+        self.assertEqual(values.tolist(), [1440, 1460, 1480])
+        self.assertEqual(len(self.store.series('BV0', 'favorites')[0]), 0)
+        self.assertEqual(len(self.store.series('unknown')[0]), 0)
+
+    def test_rates(self):
+        """Test views per hour over the last day, for one UID or every video"""
+        now = START + 24 * HOUR
+        self.assertEqual(self.store.rates('2', now=now), {'BV1': 20.0, 'BV3': 40.0})
+        self.assertEqual(self.store.rates(now=now, window=2 * HOUR, per=60),
+                         {'BV0': 10 / 60, 'BV1': 20 / 60, 'BV2': 30 / 60, 'BV3': 40 / 60})
+        self.assertEqual(self.store.rates('1', field='favorites', now=now), {'BV2': 0.0})
+        # A single point in the window has no rate
+        self.assertEqual(self.store.rates(now=now, window=HOUR / 2), {})
+
+    def test_points(self):
+        """Test selecting every point of a UID in a time range"""
+        points = self.store.points('1', start=START + 23 * HOUR, fields=['play'])
+        self.assertEqual(points['bvid'].tolist(), ['BV0', 'BV2', 'BV0', 'BV2'])
+        self.assertEqual(points['timestamp'].tolist(), [START + 23 * HOUR] * 2 + [START + 24 * HOUR] * 2)
+        self.assertEqual(points['play'].tolist(), [1230, 1690, 1240, 1720])
+
+    def test_appends_keep_time_order(self):
+        """Test that appends older than the last one are rejected"""
+        with self.assertRaises(ValueError):
+            self.store.append(crawl(1), timestamp=START)
+        self.assertEqual(self.store.append([{'title': 'no bvid'}], timestamp=START + 30 * HOUR), 0)
+        self.assertEqual(len(self.store), 100)
+
+    def test_reopen_and_repair(self):
+        """Test that the store survives reopening and a crash in the middle of an append"""
+        self.store.close()
+        with open(os.path.join(self.tmp.name, 'play.i8'), 'ab') as f:
+            f.write(b'\x01' * 12)  # A point and a half that never reached the other columns
+        self.store = StatsStore(self.tmp.name)
+        self.assertEqual(len(self.store), 100)
+        self.assertEqual(os.path.getsize(os.path.join(self.tmp.name, 'play.i8')), 800)
+
+        self.store.append(crawl(30), timestamp=START + 30 * HOUR)
+        self.assertEqual(self.store.series('BV3')[1].tolist()[-2:], [1960, 2200])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for the HTTP transports
+"""
+
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+import requests
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench.mock_server import MockBilibiliServer
+from billbillbug.batch import BatchScraper
+from billbillbug.scraper import BilibiliScraper
+from billbillbug.transport import DEFAULT_HEADERS, HttpxTransport, RequestsTransport, httpx
+
+
+class TransportTests:
+    """Tests shared by every transport"""
+
+    def make_transport(self, **kwargs):
+        raise NotImplementedError
+
+    def test_json_and_stats(self):
+        """Test decoding, compression and that keep-alive reuses one connection"""
+        transport = self.make_transport()
+        with MockBilibiliServer(videos_per_user=50) as server:
+            for _ in range(3):
+                data = transport.get_json(f"{server.url}/x/space/acc/info", {'mid': '7'})
+            server_stats = server.stats()
+        transport.close()
+
+        self.assertEqual(data['data']['name'], 'mock_up_7')
+        stats = transport.stats()
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['connections'], 1)
+        self.assertEqual(server_stats['connections'], 1)
+        self.assertEqual(stats['wire_bytes'], server_stats['bytes_sent'])
+        self.assertLess(stats['wire_bytes'], stats['body_bytes'])
+
+    def test_errors_are_requests_exceptions(self):
+        """Test that failures surface as requests exceptions the retry policy understands"""
+        transport = self.make_transport()
+        with MockBilibiliServer(error_rate=1.0) as server:
+            with self.assertRaises(requests.HTTPError) as raised:
+                transport.get_json(f"{server.url}/x/space/acc/info", {'mid': '7'})
+            url = server.url
+        transport.close()
+        self.assertEqual(raised.exception.response.status_code, 500)
+
+        # The server is gone, so a new connection is refused
+        transport = self.make_transport()
+        with self.assertRaises(requests.ConnectionError):
+            transport.get_json(f"{url}/x/space/acc/info", {'mid': '7'}, timeout=2)
+        transport.close()
+
+    def test_scrape(self):
+        """Test a full scrape through the transport"""
+        with MockBilibiliServer(videos_per_user=120) as server:
+            scraper = BilibiliScraper(delay=0, api_base=server.url, transport=self.make_transport())
+            with contextlib.redirect_stdout(io.StringIO()):
+                data = scraper.scrape_up_master('42')
+            scraper.close()
+        self.assertEqual(data['total_videos'], 120)
+
+
+class TestRequestsTransport(TransportTests, unittest.TestCase):
+    """Test the requests transport"""
+
+    def make_transport(self, **kwargs):
+        return RequestsTransport(**kwargs)
+
+    def test_default_headers(self):
+        """Test that the session offers every encoding it can decode"""
+        transport = RequestsTransport()
+        self.assertIn('gzip', transport.session.headers['Accept-Encoding'])
+        self.assertEqual(transport.session.headers['Referer'], DEFAULT_HEADERS['Referer'])
+
+    def test_batch_sizes_pool(self):
+        """Test that a batch keeps one connection per worker instead of churning"""
+        with MockBilibiliServer() as server:
+            scraper = BilibiliScraper(delay=0, api_base=server.url, transport=RequestsTransport(pool_size=1))
+            with contextlib.redirect_stdout(io.StringIO()):
+                report = BatchScraper(scraper, workers=4).run([str(uid) for uid in range(1, 41)])
+            server_stats = server.stats()
+
+        self.assertEqual(scraper.transport.pool_size, 4)
+        self.assertEqual(report['stats']['succeeded'], 40)
+        self.assertLessEqual(server_stats['connections'], 4)
+        self.assertEqual(report['stats']['connections'], server_stats['connections'])
+        self.assertEqual(report['stats']['bytes_received'], server_stats['bytes_sent'])
+
+
+@unittest.skipIf(httpx is None, "httpx is not installed")
+class TestHttpxTransport(TransportTests, unittest.TestCase):
+    """Test the httpx transport"""
+
+    def make_transport(self, **kwargs):
+        try:
+            return HttpxTransport(**kwargs)
+        except ImportError:
+            return HttpxTransport(http2=False, **kwargs)  # h2 is not installed
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the WBI signer
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# Add the package to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from billbillbug.wbi import WbiSigner, get_mixin_key, sign_params
+
+IMG_KEY = "7cd084941338484aae1ad9425b84077c"
+SUB_KEY = "4932caff0ff746eab6f01bf08b70ac45"
+
+
+class CountingFetcher:
+    """Key fetcher that records how often it is called"""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.01)
+        return IMG_KEY, SUB_KEY
+
+
+class TestWbiSigner(unittest.TestCase):
+    """Test the WbiSigner functionality"""
+
+    def test_sign_params_reference_vector(self):
+        """Test signing against the example from the API documentation"""
+        mixin_key = get_mixin_key(IMG_KEY, SUB_KEY)
+        signed = sign_params({'foo': '114', 'bar': '514', 'zab': 1919810}, mixin_key, wts=1702204169)
+
+        self.assertEqual(mixin_key, "ea1db124af3c7062474693fa704f4ff8")
+        self.assertEqual(signed['w_rid'], "8f6f2b5b3d485fe1886cec6a0be8c5d4")
+        self.assertEqual(list(signed), ['bar', 'foo', 'wts', 'zab', 'w_rid'])
+
+    def test_keys_fetched_once_across_threads(self):
+        """Test that concurrent callers share one key fetch"""
+        fetcher = CountingFetcher()
+        signer = WbiSigner(fetcher)
+
+        threads = [threading.Thread(target=signer.sign, args=({'mid': i},)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(fetcher.calls, 1)
+
+    def test_persisted_keys_skip_fetch(self):
+        """Test that a new signer reuses keys persisted by an earlier one"""
+        with tempfile.TemporaryDirectory() as tmp:
+            key_file = os.path.join(tmp, 'keys.json')
+            WbiSigner(CountingFetcher(), key_file=key_file).keys()
+
+            fetcher = CountingFetcher()
+            self.assertEqual(WbiSigner(fetcher, key_file=key_file).keys(), (IMG_KEY, SUB_KEY))
+            self.assertEqual(fetcher.calls, 0)
+
+            # Expired keys on disk are ignored
+            fetcher = CountingFetcher()
+            WbiSigner(fetcher, key_file=key_file, ttl=0).keys()
+            self.assertEqual(fetcher.calls, 1)
+
+    def test_sign_many(self):
+        """Test batch signing"""
+        signer = WbiSigner(CountingFetcher())
+        signed = signer.sign_many([{'mid': 1, 'pn': p} for p in range(1, 4)])
+
+        self.assertEqual([s['pn'] for s in signed], ['1', '2', '3'])
+        self.assertEqual(len({s['wts'] for s in signed}), 1)
+        self.assertEqual(len({s['w_rid'] for s in signed}), 3)
+
+    def test_missing_keys_leave_params_unsigned(self):
+        """Test the fallback when keys cannot be fetched"""
+        signer = WbiSigner(lambda: ('', ''))
+        self.assertEqual(signer.sign({'mid': 1}), {'mid': 1})
+
+    def test_background_refresh(self):
+        """Test that keys are renewed before they expire"""
+        fetcher = CountingFetcher()
+        signer = WbiSigner(fetcher, ttl=0.3, refresh_margin=0.2)
+        signer.keys()
+
+        signer.start_background_refresh()
+        time.sleep(0.35)
+        signer.stop_background_refresh()
+
+        self.assertGreaterEqual(fetcher.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()